@@ -0,0 +1,345 @@
+"""
+HelpDesk Pro - Analyse-Snapshot
+Hält die Ticket-Fakten spaltenweise im Speicher (``array``-Modul, Kategorien
+als Integer-Codes) und beantwortet Pivot-Abfragen ohne ORM-Objekte.
+Der Snapshot wird inkrementell über ``Ticket.updated_at`` aktualisiert.
+Ist NumPy installiert, werden die Spalten ohne Kopie als NumPy-Arrays
+gelesen und per ``bincount`` aggregiert.
+"""
+
+import sys
+import threading
+import time
+from array import array
+from collections import Counter
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import func
+
+from app.models import db, DEFAULT_TENANT, User, Ticket, ArchivedTicket, TicketEvent
+
+try:
+    import numpy as np
+except ImportError:  # optional
+    np = None
+
+EPOCH = date(1970, 1, 1)
+# 1970-01-01 war ein Donnerstag – Versatz auf Montag als Wochenbeginn
+_WEEK_OFFSET = 3
+
+DIMENSIONS = ("status", "priority", "category", "department", "week")
+
+
+class Vocabulary:
+    """Zuordnung Text <-> Integer-Code für eine kategoriale Spalte."""
+
+    def __init__(self, labels=()):
+        self.labels = []
+        self.codes = {}
+        for label in labels:
+            self.code(label)
+
+    def code(self, label):
+        code = self.codes.get(label)
+        if code is None:
+            code = len(self.labels)
+            self.codes[label] = code
+            self.labels.append(label)
+        return code
+
+    def __len__(self):
+        return len(self.labels)
+
+
+def _day_number(dt):
+    return (dt.date() - EPOCH).days if dt else -1
+
+
+def _week_label(week):
+    monday = EPOCH + timedelta(days=week * 7 - _WEEK_OFFSET)
+    year, number, _ = monday.isocalendar()
+    return f"{year}-W{number:02d}"
+
+
+class TicketSnapshot:
+    """Spaltenorientierter Snapshot aller Tickets eines Mandanten."""
+
+    def __init__(self, tenant=DEFAULT_TENANT):
+        self.tenant = tenant
+        self._lock = threading.Lock()
+        self.status_vocab = Vocabulary(Ticket.STATUSES)
+        self.priority_vocab = Vocabulary(Ticket.PRIORITIES)
+        self.category_vocab = Vocabulary(Ticket.CATEGORIES)
+        self.department_vocab = Vocabulary([""])
+
+        self.ids = array("i")
+        self.status = array("h")
+        self.priority = array("h")
+        self.category = array("h")
+        self.creator = array("i")
+        self.created_day = array("i")
+        self.closed_day = array("i")
+
+        # Abteilung je Benutzer-ID (Index = User.id)
+        self.user_department = array("h")
+
+        self.row_of = {}
+        self.high_water = None
+        self.last_event_id = None
+        self.refreshed_at = None
+
+    def __len__(self):
+        return len(self.ids)
+
+    # ── Laden ────────────────────────────────────
+
+    def _load_departments(self):
+        rows = db.session.execute(
+            db.select(User.id, User.department).where(User.tenant == self.tenant)
+        ).all()
+        # Größe nach der höchsten Benutzer-ID insgesamt: Tickets behalten ihren
+        # Ersteller auch, wenn dieser den Mandanten wechselt (ohne Abteilung)
+        size = (db.session.execute(db.select(func.max(User.id))).scalar() or 0) + 1
+        departments = array("h", [0]) * size
+        for uid, department in rows:
+            departments[uid] = self.department_vocab.code(department or "")
+        self.user_department = departments
+
+    def _remove(self, ticket_id):
+        """Entfernt ein Ticket; die letzte Zeile rückt an seine Stelle."""
+        row = self.row_of.pop(ticket_id, None)
+        if row is None:
+            return
+        last = len(self.ids) - 1
+        columns = (self.ids, *self._fact_columns())
+        if row != last:
+            for column in columns:
+                column[row] = column[last]
+            self.row_of[self.ids[row]] = row
+        for column in columns:
+            column.pop()
+
+    def _apply_deletions(self):
+        """Gelöschte Tickets anhand des Verlaufs aus dem Snapshot entfernen."""
+        latest = db.session.execute(
+            db.select(func.coalesce(func.max(TicketEvent.id), 0))
+        ).scalar()
+        if self.last_event_id is not None:
+            deleted = db.session.execute(
+                db.select(TicketEvent.ticket_id).where(
+                    TicketEvent.id > self.last_event_id,
+                    TicketEvent.id <= latest,
+                    TicketEvent.kind == "geloescht",
+                )
+            ).scalars()
+            for ticket_id in deleted:
+                self._remove(ticket_id)
+        # Beim ersten Laden ist die Ticket-Tabelle bereits aktuell
+        self.last_event_id = latest
+
+    def refresh(self):
+        """Übernimmt alle Tickets, die seit dem letzten Lauf geändert wurden."""
+        with self._lock:
+            self._load_departments()
+            self._apply_deletions()
+
+            query = self._facts_query(Ticket)
+            if self.high_water is not None:
+                # ">=" statt ">" – gleiche Zeitstempel werden idempotent überschrieben
+                query = query.where(Ticket.updated_at >= self.high_water)
+            queries = [query]
+            if self.high_water is None:
+                # Archivierte Tickets ändern sich nicht mehr: nur beim ersten Laden
+                queries.append(self._facts_query(ArchivedTicket))
+
+            changed = 0
+            high_water = self.high_water
+            for tid, status, priority, category, creator, created, closed, updated in (
+                row for query in queries for row in db.session.execute(query)
+            ):
+                values = (
+                    self.status_vocab.code(status),
+                    self.priority_vocab.code(priority),
+                    self.category_vocab.code(category),
+                    creator,
+                    _day_number(created),
+                    _day_number(closed),
+                )
+                row = self.row_of.get(tid)
+                if row is None:
+                    self.row_of[tid] = len(self.ids)
+                    self.ids.append(tid)
+                    for column, value in zip(self._fact_columns(), values):
+                        column.append(value)
+                else:
+                    for column, value in zip(self._fact_columns(), values):
+                        column[row] = value
+                changed += 1
+                if updated and (high_water is None or updated > high_water):
+                    high_water = updated
+
+            self.high_water = high_water
+            self.refreshed_at = datetime.utcnow()
+            return changed
+
+    def _facts_query(self, model):
+        return db.select(
+            model.id, model.status, model.priority, model.category,
+            model.created_by_id, model.created_at, model.closed_at,
+            model.updated_at,
+        ).where(model.tenant == self.tenant)
+
+    def _fact_columns(self):
+        return (self.status, self.priority, self.category,
+                self.creator, self.created_day, self.closed_day)
+
+    # ── Speicherbedarf ───────────────────────────
+
+    def memory_bytes(self):
+        """Speicherbedarf der Spalten und des ID-Index in Bytes."""
+        columns = sum(
+            col.buffer_info()[1] * col.itemsize
+            for col in (self.ids, *self._fact_columns(), self.user_department)
+        )
+        return {
+            "columns": columns,
+            "index": sys.getsizeof(self.row_of),
+            "total": columns + sys.getsizeof(self.row_of),
+        }
+
+    # ── Pivot ────────────────────────────────────
+
+    def _codes(self, dimension):
+        """Code-Spalte und Beschriftungen einer Dimension."""
+        if dimension == "status":
+            return self.status, self.status_vocab.labels, 0
+        if dimension == "priority":
+            return self.priority, self.priority_vocab.labels, 0
+        if dimension == "category":
+            return self.category, self.category_vocab.labels, 0
+        if dimension == "department":
+            if np is not None:
+                lookup = np.frombuffer(self.user_department, dtype=np.int16)
+                codes = lookup[np.frombuffer(self.creator, dtype=np.int32)]
+            else:
+                lookup = self.user_department
+                codes = array("h", (lookup[c] for c in self.creator))
+            return codes, self.department_vocab.labels, 0
+        if dimension == "week":
+            if np is not None:
+                weeks = (np.frombuffer(self.created_day, dtype=np.int32) + _WEEK_OFFSET) // 7
+                first, last = (int(weeks.min()), int(weeks.max())) if len(weeks) else (0, -1)
+            else:
+                weeks = array("i", ((d + _WEEK_OFFSET) // 7 for d in self.created_day))
+                first, last = (min(weeks), max(weeks)) if weeks else (0, -1)
+            labels = [_week_label(w) for w in range(first, last + 1)]
+            return weeks, labels, first
+        raise ValueError(f"Unbekannte Dimension: {dimension}")
+
+    def _filter_code(self, dimension, label):
+        vocab = {
+            "status": self.status_vocab,
+            "priority": self.priority_vocab,
+            "category": self.category_vocab,
+            "department": self.department_vocab,
+        }.get(dimension)
+        if vocab is None:
+            raise ValueError(f"Nach {dimension} kann nicht gefiltert werden")
+        return vocab.codes.get(label, -1)
+
+    def pivot(self, rows, cols=None, filters=None):
+        """Anzahl Tickets je Kombination aus ``rows`` × ``cols``.
+
+        ``filters`` bildet Dimensionen auf einen Wert ab (z.B.
+        ``{"status": "offen"}``). Liefert Beschriftungen und eine Matrix.
+        """
+        with self._lock:
+            row_codes, row_labels, row_base = self._codes(rows)
+            if cols:
+                col_codes, col_labels, col_base = self._codes(cols)
+            else:
+                col_codes, col_labels, col_base = None, ["anzahl"], 0
+
+            conditions = [
+                (self._codes(dim)[0], self._filter_code(dim, value))
+                for dim, value in (filters or {}).items()
+            ]
+            n_rows, n_cols = len(row_labels), len(col_labels)
+
+            if np is not None:
+                matrix = self._pivot_numpy(row_codes, row_base, col_codes, col_base,
+                                           conditions, n_rows, n_cols)
+            else:
+                matrix = self._pivot_python(row_codes, row_base, col_codes, col_base,
+                                            conditions, n_rows, n_cols)
+
+        return {"rows": row_labels, "cols": col_labels, "values": matrix}
+
+    def _pivot_numpy(self, row_codes, row_base, col_codes, col_base,
+                     conditions, n_rows, n_cols):
+        def as_np(codes):
+            if isinstance(codes, array):
+                return np.frombuffer(codes, dtype=np.int16 if codes.itemsize == 2 else np.int32)
+            return codes
+
+        key = (as_np(row_codes).astype(np.int64) - row_base) * n_cols
+        if col_codes is not None:
+            key += as_np(col_codes) - col_base
+        if conditions:
+            mask = np.ones(len(key), dtype=bool)
+            for codes, value in conditions:
+                mask &= as_np(codes) == value
+            key = key[mask]
+        counts = np.bincount(key, minlength=n_rows * n_cols)
+        return counts.reshape(n_rows, n_cols).tolist()
+
+    def _pivot_python(self, row_codes, row_base, col_codes, col_base,
+                      conditions, n_rows, n_cols):
+        if col_codes is None:
+            col_codes = array("h", bytes(2 * len(row_codes)))
+        pairs = zip(row_codes, col_codes)
+        if conditions:
+            columns = [codes for codes, _ in conditions]
+            wanted = tuple(value for _, value in conditions)
+            pairs = (
+                pair for pair, values in zip(pairs, zip(*columns))
+                if values == wanted
+            )
+        counts = Counter(pairs)
+        matrix = [[0] * n_cols for _ in range(n_rows)]
+        for (r, c), count in counts.items():
+            matrix[r - row_base][c - col_base] = count
+        return matrix
+
+
+def get_snapshot(app, tenant=DEFAULT_TENANT):
+    """Snapshot eines Mandanten (einmal pro Prozess angelegt)."""
+    snapshots = app.extensions.setdefault("analytics_snapshots", {})
+    snapshot = snapshots.get(tenant)
+    if snapshot is None:
+        snapshot = snapshots[tenant] = TicketSnapshot(tenant)
+    return snapshot
+
+
+def run_pivot(app, rows, cols=None, filters=None, tenant=DEFAULT_TENANT):
+    """Snapshot aktualisieren und Pivot mit Laufzeit und Speicherbedarf liefern."""
+    for dimension in (rows, cols, *(filters or {})):
+        if dimension and dimension not in DIMENSIONS:
+            raise ValueError(f"Unbekannte Dimension: {dimension}")
+
+    snapshot = get_snapshot(app, tenant)
+    started = time.perf_counter()
+    changed = snapshot.refresh()
+    refreshed = time.perf_counter()
+    result = snapshot.pivot(rows, cols, filters)
+    finished = time.perf_counter()
+
+    result.update({
+        "tickets": len(snapshot),
+        "refreshed_rows": changed,
+        "refresh_ms": round((refreshed - started) * 1000, 2),
+        "pivot_ms": round((finished - refreshed) * 1000, 2),
+        "memory_bytes": snapshot.memory_bytes(),
+        "backend": "numpy" if np is not None else "array",
+    })
+    return result
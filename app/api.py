@@ -0,0 +1,144 @@
+"""
+HelpDesk Pro - REST-API v1
+Abfragen und Serialisierung für ``/api/v1/tickets``. Gelesen wird über
+Core-Selects nur der angeforderten Spalten; die JSON-Objekte werden direkt
+aus den Ergebniszeilen gebaut, ohne ORM-Objekte zu laden.
+"""
+
+import hashlib
+
+from sqlalchemy import func
+
+from app.models import db, Ticket
+from app.tenancy import ticket_scope
+
+# Feldname -> Spalte; Reihenfolge = Standard-Reihenfolge der Ausgabe
+FIELDS = {
+    "id": Ticket.id,
+    "title": Ticket.title,
+    "description": Ticket.description,
+    "status": Ticket.status,
+    "priority": Ticket.priority,
+    "category": Ticket.category,
+    "created_by_id": Ticket.created_by_id,
+    "assigned_to_id": Ticket.assigned_to_id,
+    "created_at": Ticket.created_at,
+    "updated_at": Ticket.updated_at,
+    "closed_at": Ticket.closed_at,
+}
+DATETIME_FIELDS = {"created_at", "updated_at", "closed_at"}
+
+MAX_LIMIT = 500
+MAX_BATCH = 500
+
+# Größter Wert einer SQLite-INTEGER-Spalte
+MAX_INTEGER = 2 ** 63 - 1
+
+
+def parse_fields(raw):
+    """``"id,status"`` -> ``["id", "status"]``; wirft ``ValueError``."""
+    if not raw:
+        return list(FIELDS)
+    names = [name.strip() for name in raw.split(",") if name.strip()]
+    unknown = [name for name in names if name not in FIELDS]
+    if unknown:
+        raise ValueError(f"Unbekannte Felder: {', '.join(unknown)}")
+    # Die ID wird immer mitgeliefert
+    if "id" not in names:
+        names.insert(0, "id")
+    return names
+
+
+def parse_int(raw, name, minimum=0, maximum=MAX_INTEGER):
+    """Ganzzahliger Query-Parameter im Bereich; wirft ``ValueError``."""
+    try:
+        value = int(raw)
+    except ValueError:
+        raise ValueError(f"{name} muss eine Zahl sein") from None
+    if not minimum <= value <= maximum:
+        raise ValueError(f"{name} muss zwischen {minimum} und {maximum} liegen")
+    return value
+
+
+def parse_ids(raw):
+    """``"1,2,3"`` -> ``[1, 2, 3]``; wirft ``ValueError``."""
+    ids = [parse_int(part, "ids", 1) for part in raw.split(",") if part.strip()]
+    if len(ids) > MAX_BATCH:
+        raise ValueError(f"Höchstens {MAX_BATCH} IDs pro Anfrage")
+    return ids
+
+
+def serializer(fields):
+    """Baut eine Funktion Zeile -> dict für die gegebenen Felder."""
+    dt_positions = [i for i, name in enumerate(fields) if name in DATETIME_FIELDS]
+    names = tuple(fields)
+
+    if not dt_positions:
+        return lambda row: dict(zip(names, row))
+
+    def serialize(row):
+        values = list(row)
+        for i in dt_positions:
+            if values[i] is not None:
+                values[i] = values[i].isoformat()
+        return dict(zip(names, values))
+
+    return serialize
+
+
+def scoped(stmt, user):
+    """Eigener Mandant; Mitarbeiter sehen nur eigene Tickets."""
+    return stmt.where(*ticket_scope(user))
+
+
+def parse_filters(args):
+    """Listenfilter aus den Query-Parametern, vor jeder Abfrage geprüft."""
+    filters = {
+        name: args[name] for name in ("status", "priority", "category", "q") if args.get(name)
+    }
+    if args.get("assigned_to_id"):
+        filters["assigned_to_id"] = parse_int(args["assigned_to_id"], "assigned_to_id", 1)
+    return filters
+
+
+def apply_filters(stmt, args):
+    """Filter aus ``parse_filters`` anwenden."""
+    for name in ("status", "priority", "category"):
+        value = args.get(name)
+        if value:
+            stmt = stmt.where(FIELDS[name] == value)
+    if args.get("assigned_to_id"):
+        stmt = stmt.where(Ticket.assigned_to_id == args["assigned_to_id"])
+    if args.get("q"):
+        pattern = f"%{args['q']}%"
+        stmt = stmt.where(Ticket.title.ilike(pattern) | Ticket.description.ilike(pattern))
+    return stmt
+
+
+def fetch(fields, user, ids=None, args=None, limit=100, offset=0):
+    """Liest Tickets als Liste von dicts (eine Abfrage)."""
+    stmt = scoped(db.select(*(FIELDS[name] for name in fields)), user)
+    if ids is not None:
+        stmt = stmt.where(Ticket.id.in_(ids)).order_by(Ticket.id)
+    else:
+        stmt = apply_filters(stmt, args or {})
+        stmt = stmt.order_by(Ticket.created_at.desc(), Ticket.id.desc())
+        stmt = stmt.limit(limit).offset(offset)
+    serialize = serializer(fields)
+    return [serialize(row) for row in db.session.execute(stmt)]
+
+
+def list_version(user, ids=None, args=None):
+    """Anzahl und jüngstes ``updated_at`` der Ergebnismenge (für ETags)."""
+    stmt = scoped(db.select(func.count(Ticket.id), func.max(Ticket.updated_at)), user)
+    if ids is not None:
+        stmt = stmt.where(Ticket.id.in_(ids))
+    else:
+        stmt = apply_filters(stmt, args or {})
+    return db.session.execute(stmt).one()
+
+
+def make_etag(*parts):
+    """Starker ETag aus Version und Darstellung (Felder, Parameter)."""
+    raw = "|".join("" if p is None else str(p) for p in parts)
+    return hashlib.sha1(raw.encode()).hexdigest()
@@ -0,0 +1,160 @@
+"""
+HelpDesk Pro - Ticket-Archiv
+Geschlossene Tickets werden nach ``ARCHIVE_AFTER_DAYS`` samt Kommentaren in
+batches in eine eigene Datenbank (Bind ``archive``) verschoben. Verlauf und
+Anhänge bleiben in der Hauptdatenbank. Detailansicht und Suche lesen beide
+Bestände; für die Dashboard-Zahlen werden Summen je Mandant, Ersteller und
+Kategorie mitgeführt.
+"""
+
+import os
+from collections import Counter
+from datetime import datetime, timedelta
+
+from sqlalchemy import func
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from app.models import (
+    db, Ticket, Comment, ArchivedTicket, ArchivedComment, ArchiveCount,
+)
+
+# Höchstzahl archivierter Treffer in der Ticket-Suche
+SEARCH_LIMIT = 200
+
+
+def default_archive_uri(database_uri, instance_path):
+    """Archiv neben der SQLite-Hauptdatenbank (``helpdesk-archive.db``)."""
+    if database_uri.startswith("sqlite:///") and not database_uri.endswith(":memory:"):
+        base, ext = os.path.splitext(database_uri)
+        return f"{base}-archive{ext or '.db'}"
+    if database_uri.endswith(":memory:"):
+        return database_uri
+    return f"sqlite:///{os.path.join(instance_path, 'archive.db')}"
+
+
+def archive_engine():
+    return db.engines["archive"]
+
+
+# ── Verschieben ──────────────────────────────────
+
+def candidates(cutoff, limit):
+    """IDs geschlossener Tickets, die vor ``cutoff`` abgeschlossen wurden.
+
+    ``tickets`` und ``comments`` nutzen ``AUTOINCREMENT``: Archivierte IDs
+    werden im aktiven Bestand nicht erneut vergeben.
+    """
+    stmt = (
+        db.select(Ticket.id)
+        .where(Ticket.status == "geschlossen", Ticket.closed_at < cutoff)
+        .order_by(Ticket.closed_at)
+        .limit(limit)
+    )
+    return list(db.session.execute(stmt).scalars())
+
+
+def _bump_counts(conn, tickets):
+    counts = Counter((t["tenant"], t["created_by_id"], t["category"]) for t in tickets)
+    for (tenant, created_by_id, category), count in counts.items():
+        stmt = sqlite_insert(ArchiveCount.__table__).values(
+            tenant=tenant, created_by_id=created_by_id, category=category, count=count,
+        )
+        conn.execute(stmt.on_conflict_do_update(
+            index_elements=["tenant", "created_by_id", "category"],
+            set_={"count": ArchiveCount.__table__.c.count + count},
+        ))
+
+
+def archive_batch(ids):
+    """Verschiebt die Tickets ``ids`` (nur noch geschlossene) ins Archiv.
+
+    Reihenfolge: Löschen im aktiven Bestand (hält die Schreibsperre, ein
+    gleichzeitig wiedereröffnetes Ticket bleibt erhalten), Schreiben und
+    Commit im Archiv, dann Commit im aktiven Bestand. Bricht der Lauf
+    dazwischen ab, überspringt der nächste Lauf bereits archivierte Tickets.
+    """
+    tickets_table, comments_table = Ticket.__table__, Comment.__table__
+    tickets = [dict(row) for row in db.session.execute(
+        db.delete(tickets_table)
+        .where(tickets_table.c.id.in_(ids), tickets_table.c.status == "geschlossen")
+        .returning(*tickets_table.c)
+    ).mappings()]
+    moved = [t["id"] for t in tickets]
+    comments = [dict(row) for row in db.session.execute(
+        db.delete(comments_table)
+        .where(comments_table.c.ticket_id.in_(moved))
+        .returning(*comments_table.c)
+    ).mappings()] if moved else []
+
+    try:
+        with archive_engine().begin() as conn:
+            existing = set(conn.execute(
+                db.select(ArchivedTicket.__table__.c.id)
+                .where(ArchivedTicket.__table__.c.id.in_(moved))
+            ).scalars())
+            new_tickets = [t for t in tickets if t["id"] not in existing]
+            new_comments = [c for c in comments if c["ticket_id"] not in existing]
+            if new_tickets:
+                conn.execute(db.insert(ArchivedTicket.__table__), new_tickets)
+                _bump_counts(conn, new_tickets)
+            if new_comments:
+                conn.execute(db.insert(ArchivedComment.__table__), new_comments)
+    except Exception:
+        db.session.rollback()
+        raise
+    db.session.commit()
+    return len(tickets), len(comments)
+
+
+def archive_closed(older_than_days, batch_size=500, now=None):
+    """Archiviert alle geschlossenen Tickets, die älter als die Frist sind."""
+    cutoff = (now or datetime.utcnow()) - timedelta(days=older_than_days)
+    stats = {"tickets": 0, "comments": 0, "batches": 0}
+    while True:
+        ids = candidates(cutoff, batch_size)
+        if not ids:
+            return stats
+        tickets, comments = archive_batch(ids)
+        stats["tickets"] += tickets
+        stats["comments"] += comments
+        stats["batches"] += 1
+        if tickets == 0:
+            # Alle Kandidaten wurden zwischenzeitlich wiedereröffnet
+            return stats
+
+
+# ── Lesen ────────────────────────────────────────
+
+def get_ticket(ticket_id):
+    return db.session.get(ArchivedTicket, ticket_id)
+
+
+def attachment_owner(attachment):
+    """Ticket und Kommentar eines Anhangs – aktiv oder archiviert."""
+    ticket = attachment.ticket or get_ticket(attachment.ticket_id)
+    comment = attachment.comment
+    if comment is None and attachment.comment_id is not None:
+        comment = db.session.get(ArchivedComment, attachment.comment_id)
+    return ticket, comment
+
+
+def search(conditions, limit=SEARCH_LIMIT):
+    """Archivierte Tickets zu den gegebenen Bedingungen, neueste zuerst."""
+    return (
+        ArchivedTicket.query.filter(*conditions)
+        .order_by(ArchivedTicket.created_at.desc())
+        .limit(limit)
+        .all()
+    )
+
+
+def counts_by_category(user):
+    """Archivierte Tickets je Kategorie im Sichtbereich von ``user``."""
+    stmt = (
+        db.select(ArchiveCount.category, func.sum(ArchiveCount.count))
+        .where(ArchiveCount.tenant == user.tenant)
+        .group_by(ArchiveCount.category)
+    )
+    if not user.is_techniker:
+        stmt = stmt.where(ArchiveCount.created_by_id == user.id)
+    return dict(db.session.execute(stmt).all())
@@ -0,0 +1,307 @@
+"""
+HelpDesk Pro - ASGI-Betrieb
+Stellt die Flask-Anwendung als ASGI-App bereit (z.B. für uvicorn oder
+hypercorn). Verbindungen hält die Event-Loop; die eigentliche Arbeit der
+synchronen Views – im Wesentlichen das Warten auf SQLite – läuft in einem
+kleinen, festen Thread-Pool (``ASYNC_WORKERS``), wie es auch asynchrone
+SQLite-Treiber intern tun.
+
+Lange offene Dashboard-Verbindungen nutzen Long-Polling: Ein ``GET`` auf
+``/api/stats/overview`` oder ``/api/v1/tickets`` mit ``If-None-Match`` und
+``?wait=<sekunden>`` wartet, bis sich der Datenbestand ändert – ohne Thread
+und ohne eigene Abfragen. Ein gemeinsamer Wächter prüft den Datenstand alle
+``ASYNC_POLL_SECONDS`` mit einer einzigen Abfrage.
+
+Anfrage-Bodies werden in eine ``SpooledTemporaryFile`` geschrieben (große
+Uploads landen auf der Platte statt im Speicher); Bodies über
+``MAX_CONTENT_LENGTH`` werden mit ``413`` abgewiesen, ohne sie zu lesen.
+
+    uvicorn --factory app.asgi:create_asgi_app
+"""
+
+import asyncio
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from urllib.parse import parse_qs
+
+from sqlalchemy import func
+
+from app.models import db, Ticket, TicketEvent
+
+# Endpunkte mit ETag, die Long-Polling unterstützen
+LONG_POLL_PATHS = {"/api/stats/overview", "/api/v1/tickets"}
+MAX_WAIT_SECONDS = 120
+
+# Bodies bis zu dieser Größe bleiben im Speicher, größere gehen auf die Platte
+SPOOL_MAX_MEMORY = 1024 * 1024
+
+
+def data_version():
+    """Ändert sich mit jeder Ticket-Änderung (Verlauf oder ``updated_at``)."""
+    return tuple(db.session.execute(db.select(
+        db.select(func.max(TicketEvent.id)).scalar_subquery(),
+        db.select(func.max(Ticket.updated_at)).scalar_subquery(),
+    )).one())
+
+
+def _wait_seconds(scope):
+    values = parse_qs(scope.get("query_string", b"").decode("latin-1")).get("wait")
+    try:
+        return min(max(float(values[0]), 0.0), MAX_WAIT_SECONDS) if values else 0.0
+    except ValueError:
+        return 0.0
+
+
+def _content_length(scope):
+    """Angekündigte Body-Größe laut ``Content-Length`` oder ``None``."""
+    for name, value in scope.get("headers", []):
+        if name.lower() == b"content-length":
+            try:
+                return int(value)
+            except ValueError:
+                return None
+    return None
+
+
+def _environ(scope, body, length):
+    """WSGI-Environ nach PEP 3333 aus einem ASGI-HTTP-Scope.
+
+    ``body`` ist die (zurückgespulte) Datei mit dem Body, ``length`` seine Größe.
+    """
+    server = scope.get("server") or ("localhost", 80)
+    client = scope.get("client") or ("", 0)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", "").encode("utf-8").decode("latin-1"),
+        "PATH_INFO": scope["path"].encode("utf-8").decode("latin-1"),
+        "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+        "SERVER_NAME": server[0],
+        "SERVER_PORT": str(server[1]),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "REMOTE_ADDR": client[0],
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": body,
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": False,
+        "wsgi.run_once": False,
+        "CONTENT_LENGTH": str(length),
+    }
+    for raw_name, raw_value in scope.get("headers", []):
+        name = raw_name.decode("latin-1").upper().replace("-", "_")
+        value = raw_value.decode("latin-1")
+        if name == "CONTENT_TYPE":
+            environ["CONTENT_TYPE"] = value
+        elif name != "CONTENT_LENGTH":
+            key = f"HTTP_{name}"
+            if key in environ:
+                # Mehrere Cookie-Header werden mit "; " verbunden (RFC 6265)
+                separator = "; " if key == "HTTP_COOKIE" else ","
+                value = f"{environ[key]}{separator}{value}"
+            environ[key] = value
+    return environ
+
+
+class AsgiApp:
+    """ASGI-Anwendung um eine WSGI-App mit Long-Polling für Lese-Endpunkte."""
+
+    def __init__(self, flask_app, workers=8, poll_seconds=1.0):
+        self.flask_app = flask_app
+        self.poll_seconds = poll_seconds
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="helpdesk-io")
+        self._changed = None
+        self._version = None
+        self._waiters = 0
+        self._watcher = None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            raise ValueError(f"Nicht unterstützter ASGI-Typ: {scope['type']}")
+
+        body = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY)
+        try:
+            await self._handle(scope, receive, send, body)
+        finally:
+            body.close()
+
+    async def _handle(self, scope, receive, send, body):
+        length = await self._receive_body(scope, receive, body)
+        if length is None:
+            await _send_status(send, 413)
+            return
+        response = await self._call(scope, body, length)
+        wait = _wait_seconds(scope)
+        if (response[0] == 304 and wait and scope["method"] == "GET"
+                and scope["path"] in LONG_POLL_PATHS):
+            response = await self._long_poll(scope, receive, body, length, wait, response)
+            if response is None:
+                return
+
+        status, headers, chunks = response
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        iterator = iter(chunks)
+        try:
+            while True:
+                chunk = await self._run(next, iterator, None)
+                if chunk is None:
+                    break
+                if chunk:
+                    await send({"type": "http.response.body", "body": chunk, "more_body": True})
+        finally:
+            await self._run(_close, chunks)
+        await send({"type": "http.response.body", "body": b""})
+
+    async def _receive_body(self, scope, receive, body):
+        """Schreibt den Body nach ``body``; ``None`` bei Überschreitung des Limits.
+
+        Geprüft werden ``Content-Length`` vorab und die tatsächlich gelesene
+        Menge – auch bei ``Transfer-Encoding: chunked``.
+        """
+        limit = self.flask_app.config.get("MAX_CONTENT_LENGTH")
+        declared = _content_length(scope)
+        if limit is not None and declared is not None and declared > limit:
+            return None
+        length = 0
+        while True:
+            message = await receive()
+            chunk = message.get("body", b"")
+            length += len(chunk)
+            if limit is not None and length > limit:
+                return None
+            if chunk:
+                body.write(chunk)
+            if not message.get("more_body"):
+                return length
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                self.executor.shutdown(wait=False)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def _run(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+
+    async def _call(self, scope, body, length):
+        """Ruft die WSGI-App im Pool auf: Status, Header und Antwort-Iterable."""
+        body.seek(0)
+        return await self._run(self._call_wsgi, _environ(scope, body, length))
+
+    def _call_wsgi(self, environ):
+        started = {}
+
+        def start_response(status, headers, exc_info=None):
+            started["status"] = int(status.split(" ", 1)[0])
+            started["headers"] = [
+                (name.lower().encode("latin-1"), value.encode("latin-1"))
+                for name, value in headers
+            ]
+
+        result = self.flask_app(environ, start_response)
+        return started["status"], started["headers"], result
+
+    # ── Long-Polling ─────────────────────────────
+
+    async def _long_poll(self, scope, receive, body, length, wait, response):
+        """Wiederholt die Anfrage nach jeder Änderung, bis sie nicht mehr 304 ist.
+
+        Trennt der Client die Verbindung, endet das Warten sofort (``None``).
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + wait
+        disconnected = asyncio.ensure_future(_disconnect(receive))
+        try:
+            while True:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    return response
+                changed = await self._wait_for_change(remaining, disconnected)
+                if disconnected.done():
+                    await self._run(_close, response[2])
+                    return None
+                if not changed:
+                    return response
+                await self._run(_close, response[2])
+                response = await self._call(scope, body, length)
+                if response[0] != 304:
+                    return response
+        finally:
+            disconnected.cancel()
+
+    async def _wait_for_change(self, timeout, disconnected):
+        if self._changed is None:
+            self._changed = asyncio.Event()
+        if self._watcher is None or self._watcher.done():
+            self._watcher = asyncio.create_task(self._watch())
+        changed = asyncio.ensure_future(self._changed.wait())
+        self._waiters += 1
+        try:
+            done, _ = await asyncio.wait(
+                {changed, disconnected}, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+            )
+            return changed in done
+        finally:
+            changed.cancel()
+            self._waiters -= 1
+
+    async def _watch(self):
+        """Eine Abfrage je Intervall für alle wartenden Verbindungen."""
+        while True:
+            current = await self._run(self._data_version)
+            if current != self._version:
+                if self._version is not None:
+                    self._changed.set()
+                    self._changed = asyncio.Event()
+                self._version = current
+            if not self._waiters:
+                return
+            await asyncio.sleep(self.poll_seconds)
+
+    def _data_version(self):
+        with self.flask_app.app_context():
+            return data_version()
+
+
+async def _send_status(send, status):
+    """Kurze Textantwort ohne WSGI-App, z.B. ``413`` vor dem Lesen des Bodys."""
+    body = f"{status} {HTTPStatus(status).phrase}".encode()
+    await send({"type": "http.response.start", "status": status, "headers": [
+        (b"content-type", b"text/plain; charset=utf-8"),
+        (b"content-length", str(len(body)).encode()),
+        (b"connection", b"close"),
+    ]})
+    await send({"type": "http.response.body", "body": body})
+
+
+async def _disconnect(receive):
+    """Wartet auf ``http.disconnect`` (nach dem vollständigen Body)."""
+    while (await receive())["type"] != "http.disconnect":
+        pass
+
+
+def _close(iterable):
+    close = getattr(iterable, "close", None)
+    if close is not None:
+        close()
+
+
+def create_asgi_app(flask_app=None):
+    """ASGI-Anwendung (Factory für ``uvicorn --factory``)."""
+    if flask_app is None:
+        from app.main import create_app
+        flask_app = create_app()
+    return AsgiApp(
+        flask_app,
+        workers=flask_app.config["ASYNC_WORKERS"],
+        poll_seconds=flask_app.config["ASYNC_POLL_SECONDS"],
+    )
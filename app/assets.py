@@ -0,0 +1,189 @@
+"""
+HelpDesk Pro - Statische Assets
+Beim Start werden CSS/JS aus ``static/`` mit ihrem Inhalts-Hash im Namen
+(``style.3f2a9c….css``) in den Asset-Ordner kopiert und vorkomprimiert
+(gzip, Brotli falls installiert). Ausgeliefert wird die passende Variante mit
+``Cache-Control: immutable``; eine Änderung erzeugt einen neuen Namen.
+Dynamische HTML/JSON-Antworten werden ab einer Mindestgröße per gzip
+komprimiert; ihr ETag erhält dann – wie bei den Assets – das Suffix
+``-gzip``, damit jede Darstellung einen eigenen Validator hat.
+"""
+
+import gzip
+import hashlib
+import mimetypes
+import os
+
+from flask import current_app, request, send_file, url_for
+
+try:
+    import brotli
+except ImportError:  # optional
+    brotli = None
+
+# Nur textbasierte Assets lohnen die Vorkompression
+COMPRESSIBLE_EXTENSIONS = {".css", ".js", ".svg", ".json", ".txt", ".map"}
+DYNAMIC_TYPES = {"text/html", "application/json"}
+
+# Content-Encoding -> Dateiendung, in der Reihenfolge der Präferenz
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+ONE_YEAR = 365 * 24 * 3600
+
+# ETag-Suffix der gzip-Variante dynamischer Antworten
+GZIP_ETAG_SUFFIX = "-gzip"
+_GZIP_CONDITION = "helpdesk.gzip_etag"
+
+
+def fingerprint(data):
+    return hashlib.sha256(data).hexdigest()[:12]
+
+
+def _write_once(path, data):
+    # Inhaltsadressiert: existiert die Datei, ist sie bereits aktuell
+    if os.path.exists(path):
+        return
+    tmp = f"{path}.tmp-{os.getpid()}"
+    with open(tmp, "wb") as fh:
+        fh.write(data)
+    os.replace(tmp, path)
+
+
+class AssetManifest:
+    """Logischer Pfad (``css/style.css``) -> Fingerprint-Pfad."""
+
+    def __init__(self, static_dir, out_dir):
+        self.static_dir = static_dir
+        self.out_dir = out_dir
+        self.paths = {}
+        self.served = {}
+
+    def build(self):
+        """Fingerprintet und komprimiert alle Assets (idempotent)."""
+        self.paths.clear()
+        self.served.clear()
+        for dirpath, _, filenames in os.walk(self.static_dir):
+            for filename in sorted(filenames):
+                source = os.path.join(dirpath, filename)
+                logical = os.path.relpath(source, self.static_dir).replace(os.sep, "/")
+                self._add(logical, source)
+        return self
+
+    def _add(self, logical, source):
+        with open(source, "rb") as fh:
+            data = fh.read()
+        digest = fingerprint(data)
+        stem, ext = os.path.splitext(logical)
+        hashed = f"{stem}.{digest}{ext}"
+        target = os.path.join(self.out_dir, *hashed.split("/"))
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+
+        _write_once(target, data)
+        encodings = []
+        if ext in COMPRESSIBLE_EXTENSIONS:
+            if brotli is not None:
+                _write_once(target + ".br", brotli.compress(data, quality=11))
+                encodings.append("br")
+            _write_once(target + ".gz", gzip.compress(data, compresslevel=9, mtime=0))
+            encodings.append("gzip")
+
+        self.paths[logical] = hashed
+        self.served[hashed] = (target, digest, tuple(encodings))
+
+    def url(self, logical):
+        """URL der Fingerprint-Variante; unbekannte Dateien wie bisher über /static."""
+        hashed = self.paths.get(logical)
+        if hashed is None:
+            return url_for("static", filename=logical)
+        return url_for("asset", filename=hashed)
+
+
+def init_assets(app):
+    """Asset-Manifest bauen und in der App ablegen."""
+    manifest = AssetManifest(app.static_folder, app.config["ASSET_DIR"]).build()
+    app.extensions["assets"] = manifest
+    return manifest
+
+
+def asset_url(filename):
+    return current_app.extensions["assets"].url(filename)
+
+
+def serve_asset(filename):
+    """Liefert die beste vorkomprimierte Variante, die der Client akzeptiert."""
+    entry = current_app.extensions["assets"].served.get(filename)
+    if entry is None:
+        return None
+    target, digest, encodings = entry
+
+    path, encoding = target, None
+    for name, suffix in ENCODINGS:
+        if name in encodings and name in request.accept_encodings:
+            path, encoding = target + suffix, name
+            break
+
+    response = send_file(
+        path,
+        mimetype=mimetypes.guess_type(target)[0] or "application/octet-stream",
+        etag=f"{digest}-{encoding}" if encoding else digest,
+        conditional=True,
+        max_age=ONE_YEAR,
+    )
+    if encoding:
+        response.headers["Content-Encoding"] = encoding
+    if encodings:
+        response.vary.add("Accept-Encoding")
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+
+def strip_encoding_etags():
+    """Entfernt ``-gzip`` aus ``If-None-Match``/``If-Match`` (vor den Views).
+
+    Die Views vergleichen mit dem ETag der unkomprimierten Darstellung;
+    ``compress_response`` setzt das Suffix für die Antwort wieder ein.
+    Assets haben eigene ETags je Variante und bleiben unverändert.
+    """
+    if request.endpoint == "asset":
+        return
+    marker = GZIP_ETAG_SUFFIX + '"'
+    for key in ("HTTP_IF_NONE_MATCH", "HTTP_IF_MATCH"):
+        value = request.environ.get(key)
+        if value and marker in value:
+            request.environ[key] = value.replace(marker, '"')
+            request.environ[_GZIP_CONDITION] = True
+
+
+def compress_response(response):
+    """gzip für dynamische HTML/JSON-Antworten ab ``COMPRESS_MIN_BYTES``.
+
+    Antworten mit ETag variieren mit ``Accept-Encoding``; eine ``304`` auf
+    eine bedingte Anfrage mit gzip-ETag trägt wieder den gzip-ETag.
+    """
+    etag, weak = response.get_etag()
+    if etag and not response.direct_passthrough and "Content-Encoding" not in response.headers:
+        response.vary.add("Accept-Encoding")
+        if response.status_code == 304 and request.environ.get(_GZIP_CONDITION):
+            response.set_etag(etag + GZIP_ETAG_SUFFIX, weak)
+
+    if (
+        response.direct_passthrough
+        or response.is_streamed
+        or response.status_code != 200
+        or response.mimetype not in DYNAMIC_TYPES
+        or "Content-Encoding" in response.headers
+        or "gzip" not in request.accept_encodings
+    ):
+        return response
+
+    data = response.get_data()
+    if len(data) < current_app.config["COMPRESS_MIN_BYTES"]:
+        return response
+
+    response.set_data(gzip.compress(data, compresslevel=current_app.config["COMPRESS_LEVEL"]))
+    response.headers["Content-Encoding"] = "gzip"
+    response.vary.add("Accept-Encoding")
+    if etag:
+        response.set_etag(etag + GZIP_ETAG_SUFFIX, weak)
+    return response
@@ -0,0 +1,149 @@
+"""
+HelpDesk Pro - Dateianhänge
+Inhaltsadressierte Ablage auf der Festplatte: Jede Datei liegt genau einmal
+unter ihrem SHA-256-Hash. Uploads werden vom Multipart-Parser blockweise
+direkt in den Ablageordner geschrieben und dabei gehasht – ohne die Datei
+im Speicher zu puffern.
+"""
+
+import hashlib
+import mimetypes
+import os
+import tempfile
+
+from flask import Request, current_app, request
+from sqlalchemy import func
+
+from app.models import db, Attachment
+
+# Inline angezeigte Typen; alles andere wird als Download ausgeliefert
+INLINE_TYPES = {"image/png", "image/jpeg", "image/gif", "image/webp", "application/pdf", "text/plain"}
+
+
+class QuotaExceeded(Exception):
+    """Das Anhang-Kontingent des Tickets ist ausgeschöpft."""
+
+
+def storage_root():
+    return current_app.config["ATTACHMENT_DIR"]
+
+
+def blob_path(sha256, root=None):
+    """Ablagepfad eines Inhalts, z.B. ``ab/cd/abcd…``."""
+    root = root or storage_root()
+    return os.path.join(root, sha256[:2], sha256[2:4], sha256)
+
+
+class HashingSpool:
+    """Upload-Container, der beim Schreiben hasht und Bytes zählt.
+
+    Die Daten landen in einer temporären Datei im Ablageordner, sodass
+    ``commit()`` sie per ``os.replace`` ohne Kopie an den Zielort
+    verschieben kann.
+    """
+
+    def __init__(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        fd, self.path = tempfile.mkstemp(dir=directory, prefix="upload-")
+        self._file = os.fdopen(fd, "w+b")
+        self._hash = hashlib.sha256()
+        self.size = 0
+        self.committed = False
+
+    def write(self, data):
+        self._hash.update(data)
+        self.size += len(data)
+        return self._file.write(data)
+
+    def __getattr__(self, name):
+        return getattr(self._file, name)
+
+    @property
+    def sha256(self):
+        return self._hash.hexdigest()
+
+    def commit(self, root):
+        """Verschiebt die Datei an ihren Hash-Pfad (dedupliziert)."""
+        self._file.close()
+        target = blob_path(self.sha256, root)
+        if os.path.exists(target):
+            os.unlink(self.path)
+        else:
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            os.replace(self.path, target)
+        self.committed = True
+        return target
+
+    def discard(self):
+        if self.committed:
+            return
+        self._file.close()
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+        self.committed = True
+
+
+class HelpdeskRequest(Request):
+    """Request-Klasse, die Datei-Uploads direkt in die Anhang-Ablage streamt."""
+
+    def _get_file_stream(self, total_content_length, content_type,
+                         filename=None, content_length=None):
+        return HashingSpool(os.path.join(storage_root(), "tmp"))
+
+
+def discard_unstored_uploads(exc=None):
+    """Entfernt temporäre Upload-Dateien, die nicht übernommen wurden."""
+    # Nur aufräumen, wenn das Formular bereits geparst wurde
+    if "files" not in request.__dict__:
+        return
+    # Mehrere Dateien unter einem Feldnamen (``attachments``) – alle prüfen
+    for _, upload in request.files.items(multi=True):
+        if isinstance(upload.stream, HashingSpool):
+            upload.stream.discard()
+
+
+def ticket_usage(ticket_id):
+    """Belegter Speicher (logische Größe) aller Anhänge eines Tickets."""
+    return db.session.execute(
+        db.select(func.coalesce(func.sum(Attachment.size), 0))
+        .where(Attachment.ticket_id == ticket_id)
+    ).scalar()
+
+
+def attach_uploads(ticket, uploads, user, comment=None):
+    """Übernimmt hochgeladene Dateien als Anhänge des Tickets.
+
+    Gibt ``(gespeichert, abgelehnt)`` zurück; abgelehnt werden Dateien,
+    die das Kontingent des Tickets überschreiten.
+    """
+    quota = current_app.config["ATTACHMENT_QUOTA_BYTES"]
+    used = ticket_usage(ticket.id)
+    root = storage_root()
+    stored, rejected = [], []
+
+    for upload in uploads:
+        spool = upload.stream
+        if not upload.filename or not isinstance(spool, HashingSpool):
+            continue
+        if used + spool.size > quota:
+            spool.discard()
+            rejected.append(upload.filename)
+            continue
+
+        spool.commit(root)
+        used += spool.size
+        filename = os.path.basename(upload.filename.replace("\\", "/"))[:255]
+        attachment = Attachment(
+            ticket_id=ticket.id,
+            comment_id=comment.id if comment is not None else None,
+            user_id=user.id,
+            filename=filename,
+            content_type=mimetypes.guess_type(filename)[0] or "application/octet-stream",
+            size=spool.size,
+            sha256=spool.sha256,
+        )
+        db.session.add(attachment)
+        stored.append(attachment)
+    return stored, rejected
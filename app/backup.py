@@ -0,0 +1,224 @@
+"""
+HelpDesk Pro - Datensicherung
+Online-Sicherung der SQLite-Datenbanken über die Backup-API von SQLite in
+Seitenschritten. Im WAL-Modus liest die Sicherung aus einem festen Snapshot
+(Zeitpunkt des Starts), Schreibzugriffe laufen ungehindert weiter. Sicherungen
+werden geprüft (``PRAGMA integrity_check``), optional mit gzip komprimiert
+und rotiert; ``restore_database`` spielt eine geprüfte Sicherung zurück.
+"""
+
+import gzip
+import os
+import re
+import shutil
+import sqlite3
+import tempfile
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+from datetime import datetime
+
+BackupResult = namedtuple("BackupResult", "path size pages seconds snapshot")
+
+# Seiten je Schritt (4 KiB-Seiten: 4 MiB) und Pause zwischen den Schritten
+DEFAULT_PAGES = 1024
+DEFAULT_PAUSE = 0.005
+# Ohne WAL startet SQLite die Sicherung bei jedem fremden Schreibzugriff neu;
+# nach so vielen Neustarts wird in einem Durchgang mit Lesesperre gesichert.
+MAX_RESTARTS = 3
+
+_STAMP_FORMAT = "%Y%m%d-%H%M%S"
+
+
+class _Restarted(Exception):
+    pass
+
+
+def is_sqlite_file(engine):
+    return engine.dialect.name == "sqlite" and engine.url.database not in (None, "", ":memory:")
+
+
+def database_path(engine):
+    """Dateipfad einer SQLite-Engine; andere Datenbanken werden abgelehnt."""
+    if not is_sqlite_file(engine):
+        raise ValueError(f"Keine SQLite-Datei: {engine.url}")
+    return engine.url.database
+
+
+def enable_wal(engine):
+    """Schaltet eine SQLite-Datei dauerhaft in den WAL-Modus.
+
+    Leser (auch eine laufende Sicherung) blockieren dann keine Schreiber.
+    """
+    if not is_sqlite_file(engine):
+        return None
+    with engine.connect() as conn:
+        return conn.exec_driver_sql("PRAGMA journal_mode=WAL").scalar()
+
+
+def _copy(source, target, pages, pause, progress=None, max_restarts=None):
+    restarts = 0
+    done = [0]
+
+    def step(status, remaining, total):
+        nonlocal restarts
+        copied = total - remaining
+        if copied < done[0]:
+            restarts += 1
+            if max_restarts is not None and restarts > max_restarts:
+                raise _Restarted()
+        done[0] = copied
+        if progress is not None:
+            progress(copied, total)
+        if pause and remaining:
+            time.sleep(pause)
+
+    source.backup(target, pages=pages, progress=step)
+
+
+def backup_database(source_path, target_dir, pages=DEFAULT_PAGES, pause=DEFAULT_PAUSE,
+                    compress=False, now=None, progress=None):
+    """Sichert ``source_path`` nach ``target_dir/<name>-<zeitstempel>.db[.gz]``.
+
+    Die Sicherung entsteht zunächst als ``.part``-Datei und wird erst nach
+    erfolgreicher Prüfung umbenannt – eine abgebrochene Sicherung hinterlässt
+    nie eine gültig aussehende Datei.
+    """
+    os.makedirs(target_dir, exist_ok=True)
+    stem = os.path.splitext(os.path.basename(source_path))[0]
+    stamp = (now or datetime.now()).strftime(_STAMP_FORMAT)
+    final = os.path.join(target_dir, f"{stem}-{stamp}.db" + (".gz" if compress else ""))
+    if os.path.exists(final):
+        raise ValueError(f"Sicherung existiert bereits: {final}")
+    part = os.path.join(target_dir, f".{stem}-{stamp}.db.part")
+
+    started = time.perf_counter()
+    source = sqlite3.connect(source_path, timeout=30)
+    target = sqlite3.connect(part)
+    try:
+        snapshot = source.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        if snapshot:
+            # Offene Lesetransaktion: alle Schritte lesen denselben Stand
+            source.execute("BEGIN")
+            source.execute("SELECT count(*) FROM sqlite_master").fetchone()
+            _copy(source, target, pages, pause, progress)
+        else:
+            try:
+                _copy(source, target, pages, pause, progress, max_restarts=MAX_RESTARTS)
+            except _Restarted:
+                _copy(source, target, -1, 0, progress)
+        # Die Kopie übernimmt den WAL-Modus; als Einzeldatei ablegen
+        target.execute("PRAGMA journal_mode=DELETE")
+        page_count = target.execute("PRAGMA page_count").fetchone()[0]
+    except BaseException:
+        target.close()
+        if os.path.exists(part):
+            os.remove(part)
+        raise
+    finally:
+        source.close()
+    target.close()
+
+    try:
+        _check(part)
+        if compress:
+            with open(part, "rb") as src, gzip.open(part + ".gz", "wb", compresslevel=6) as dst:
+                shutil.copyfileobj(src, dst, 1024 * 1024)
+            os.remove(part)
+            part += ".gz"
+        os.replace(part, final)
+    finally:
+        if os.path.exists(part):
+            os.remove(part)
+
+    return BackupResult(
+        path=final,
+        size=os.path.getsize(final),
+        pages=page_count,
+        seconds=round(time.perf_counter() - started, 3),
+        snapshot=snapshot,
+    )
+
+
+def _check(path):
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        result = [row[0] for row in conn.execute("PRAGMA integrity_check")]
+        if result != ["ok"]:
+            raise ValueError(f"Integritätsprüfung fehlgeschlagen: {'; '.join(result[:5])}")
+        tables = [row[0] for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' "
+            "AND name NOT LIKE 'sqlite_%' ORDER BY name"
+        )]
+        return {table: conn.execute(f'SELECT count(*) FROM "{table}"').fetchone()[0]
+                for table in tables}
+    except sqlite3.DatabaseError as exc:
+        raise ValueError(f"Keine gültige SQLite-Datenbank: {exc}") from exc
+    finally:
+        conn.close()
+
+
+@contextmanager
+def _opened(backup_path):
+    """Pfad einer lesbaren Datenbankdatei – ``.gz`` wird temporär entpackt."""
+    if not backup_path.endswith(".gz"):
+        yield backup_path
+        return
+    fd, path = tempfile.mkstemp(suffix=".db")
+    try:
+        with os.fdopen(fd, "wb") as dst, gzip.open(backup_path, "rb") as src:
+            shutil.copyfileobj(src, dst, 1024 * 1024)
+        yield path
+    except (OSError, EOFError) as exc:
+        raise ValueError(f"Sicherung nicht lesbar: {exc}") from exc
+    finally:
+        os.remove(path)
+
+
+def verify_backup(backup_path):
+    """Prüft eine Sicherung; gibt die Zeilen je Tabelle zurück."""
+    with _opened(backup_path) as path:
+        return _check(path)
+
+
+def restore_database(backup_path, target_path, pages=DEFAULT_PAGES):
+    """Spielt eine Sicherung in die (auch laufende) Datenbank ``target_path`` zurück.
+
+    Die Sicherung wird vorher geprüft. SQLite ersetzt den Inhalt seitenweise
+    unter Schreibsperre; andere Verbindungen sehen danach den neuen Stand.
+    """
+    with _opened(backup_path) as path:
+        tables = _check(path)
+        source = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        target = sqlite3.connect(target_path, timeout=30)
+        try:
+            _copy(source, target, pages, 0)
+        finally:
+            source.close()
+            target.close()
+    return tables
+
+
+def list_backups(target_dir, stem):
+    """Sicherungen einer Datenbank, älteste zuerst."""
+    pattern = re.compile(rf"^{re.escape(stem)}-\d{{8}}-\d{{6}}\.db(\.gz)?$")
+    if not os.path.isdir(target_dir):
+        return []
+    return sorted(
+        os.path.join(target_dir, name)
+        for name in os.listdir(target_dir) if pattern.match(name)
+    )
+
+
+def rotate(target_dir, stem, keep):
+    """Löscht alle bis auf die ``keep`` neuesten Sicherungen; gibt sie zurück.
+
+    ``keep`` 0 bewahrt alle Sicherungen auf.
+    """
+    if keep < 1:
+        return []
+    backups = list_backups(target_dir, stem)
+    removed = backups[:-keep]
+    for path in removed:
+        os.remove(path)
+    return removed
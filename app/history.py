@@ -0,0 +1,113 @@
+"""
+HelpDesk Pro - Ticket-Verlauf
+Schreibt Verlaufseinträge in derselben Transaktion wie die Ticket-Änderung
+und wertet die Zeitleiste eines Tickets aus.
+"""
+
+from datetime import datetime
+
+from app.models import db, Ticket, TicketEvent
+
+# Felder, deren Änderungen im Verlauf festgehalten werden
+TRACKED_FIELDS = ("status", "priority", "assigned_to_id")
+
+
+def snapshot(ticket):
+    """Aktuelle Werte der verfolgten Felder eines Tickets."""
+    return {field: getattr(ticket, field) for field in TRACKED_FIELDS}
+
+
+def record_event(ticket, kind, changes=None, user=None, created_at=None):
+    """Fügt einen Verlaufseintrag zur laufenden Session hinzu.
+
+    Der Aufrufer committet – Ticket-Änderung und Verlauf landen so in
+    derselben Transaktion. Neue Tickets müssen bereits geflusht sein.
+    """
+    entry = TicketEvent(
+        ticket_id=ticket.id,
+        user_id=user.id if user is not None else None,
+        kind=kind,
+        changes=TicketEvent.encode_changes(changes or {}),
+        created_at=created_at or datetime.utcnow(),
+    )
+    db.session.add(entry)
+    return entry
+
+
+def record_creation(ticket, user=None):
+    """Verlaufseintrag für ein neu angelegtes Ticket."""
+    changes = {
+        field: (None, value)
+        for field, value in snapshot(ticket).items()
+        if value is not None
+    }
+    return record_event(
+        ticket, "erstellt", changes, user=user, created_at=ticket.created_at
+    )
+
+
+def record_update(ticket, before, user=None):
+    """Vergleicht mit ``before`` und protokolliert nur geänderte Felder.
+
+    Gibt ``None`` zurück, wenn sich nichts geändert hat.
+    """
+    changes = {}
+    for field, old in before.items():
+        new = getattr(ticket, field)
+        if old != new:
+            changes[field] = (old, new)
+    if not changes:
+        return None
+    return record_event(ticket, "geaendert", changes, user=user)
+
+
+def record_comment(ticket, comment, user=None):
+    """Verlaufseintrag für einen neuen Kommentar."""
+    changes = {"comment_id": comment.id}
+    if comment.is_internal:
+        changes["is_internal"] = 1
+    return record_event(
+        ticket, "kommentar", changes, user=user, created_at=comment.created_at
+    )
+
+
+def record_deletion(ticket, user=None):
+    """Verlaufseintrag für ein gelöschtes Ticket (bleibt im Audit-Log)."""
+    return record_event(ticket, "geloescht", user=user)
+
+
+def ticket_timeline(ticket_id):
+    """Alle Verlaufseinträge eines Tickets – eine Abfrage über den Index."""
+    return (
+        TicketEvent.query
+        .filter_by(ticket_id=ticket_id)
+        .order_by(TicketEvent.created_at, TicketEvent.id)
+        .all()
+    )
+
+
+def status_durations(events, until=None):
+    """Verweildauer in Sekunden je Status, berechnet aus der Zeitleiste.
+
+    Die Einträge müssen chronologisch sortiert sein. Für geschlossene
+    Tickets wird nur bis zum letzten Statuswechsel gezählt.
+    """
+    until = until or datetime.utcnow()
+    durations = {status: 0.0 for status in Ticket.STATUSES}
+    current, since = None, None
+
+    for entry in events:
+        change = entry.change_dict.get("status")
+        if not change:
+            continue
+        if current is not None:
+            durations[current] = durations.get(current, 0.0) + (
+                entry.created_at - since
+            ).total_seconds()
+        current, since = change[1], entry.created_at
+
+    if current is not None and current != "geschlossen":
+        durations[current] = durations.get(current, 0.0) + (
+            until - since
+        ).total_seconds()
+    return durations
@@ -0,0 +1,266 @@
+"""
+HelpDesk Pro - E-Mail-Eingang
+Liest Nachrichten aus einem lokalen Maildir- oder mbox-Spool, parst sie in
+einem Prozess-Pool und legt daraus Tickets bzw. Kommentare an. Antworten mit
+Ticket-Kennung im Betreff (z.B. ``[#123]``) werden dem Ticket als Kommentar
+zugeordnet. Geschrieben wird in Batches mit einem Commit pro Batch; die
+``Message-ID`` jeder Nachricht wird im selben Commit vermerkt, so dass eine
+erneut gelesene mbox keine doppelten Tickets erzeugt.
+"""
+
+import email
+import hashlib
+import mailbox
+import os
+import re
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from email import policy
+from email.utils import parseaddr
+from itertools import islice
+
+from app.models import db, User, Ticket, Comment, ProcessedMail
+from app import history, reports
+
+# Höchstens 18 Stellen: passt immer in SQLite-INTEGER; längere Tags gelten
+# als normaler Betreff
+TICKET_TAG = re.compile(r"\[#(\d{1,18})\]")
+REPLY_PREFIX = re.compile(r"^\s*((re|aw|wg|fwd?)\s*:\s*)+", re.IGNORECASE)
+HTML_TAG = re.compile(r"<[^>]+>")
+
+MAX_TITLE = 200
+MAX_BODY = 20000
+
+ParsedMail = namedtuple("ParsedMail", "key message_id sender subject body ticket_ref")
+Sender = namedtuple("Sender", "id role tenant")
+
+
+# ── Spool lesen ──────────────────────────────────
+
+def read_spool(path):
+    """Liefert ``(key, raw_bytes)`` für alle neuen Nachrichten im Spool.
+
+    Bei einem Maildir werden nur Nachrichten aus ``new/`` gelesen; ``key``
+    ist der Dateiname. Eine mbox wird vollständig gelesen; bereits
+    verarbeitete Nachrichten überspringt ``ingest`` anhand der ``Message-ID``.
+    """
+    if os.path.isdir(path):
+        new_dir = os.path.join(path, "new")
+        for name in sorted(os.listdir(new_dir)):
+            if name.startswith("."):
+                continue
+            with open(os.path.join(new_dir, name), "rb") as fh:
+                yield name, fh.read()
+    else:
+        box = mailbox.mbox(path, create=False)
+        try:
+            for key in box.keys():
+                yield key, box.get_bytes(key)
+        finally:
+            box.close()
+
+
+def mark_processed(path, keys):
+    """Verschiebt verarbeitete Maildir-Nachrichten nach ``cur/`` (gelesen)."""
+    if not os.path.isdir(path):
+        return
+    for name in keys:
+        os.rename(
+            os.path.join(path, "new", name),
+            os.path.join(path, "cur", f"{name}:2,S"),
+        )
+
+
+# ── Parsen (läuft im Prozess-Pool) ───────────────
+
+def _text_body(message):
+    part = message.get_body(preferencelist=("plain", "html"))
+    if part is None:
+        return ""
+    try:
+        text = part.get_content()
+    except (LookupError, UnicodeError):
+        text = part.get_payload(decode=True).decode("utf-8", "replace")
+    if part.get_content_type() == "text/html":
+        text = HTML_TAG.sub("", text)
+    # Zitierte Zeilen der Vorgänger-Nachricht weglassen
+    lines = [line for line in text.splitlines() if not line.startswith(">")]
+    return "\n".join(lines).strip()[:MAX_BODY]
+
+
+def _message_id(message, raw):
+    """``Message-ID`` der Nachricht; ohne (oder zu lang) der SHA-256 des Inhalts."""
+    message_id = str(message.get("Message-ID", "") or "").strip()
+    if not message_id or len(message_id) > 255:
+        message_id = f"sha256:{hashlib.sha256(raw).hexdigest()}"
+    return message_id
+
+
+def parse_message(item):
+    """Wandelt ``(key, raw_bytes)`` in eine ``ParsedMail`` um."""
+    key, raw = item
+    message = email.message_from_bytes(raw, policy=policy.default)
+    subject = str(message.get("Subject", "") or "").strip()
+    tag = TICKET_TAG.search(subject)
+    return ParsedMail(
+        key=key,
+        message_id=_message_id(message, raw),
+        sender=parseaddr(str(message.get("From", "")))[1].lower(),
+        subject=subject,
+        body=_text_body(message),
+        ticket_ref=int(tag.group(1)) if tag else None,
+    )
+
+
+def _parallel_parse(pool, items, window):
+    """Parst im Pool, aber höchstens ``window`` Rohnachrichten gleichzeitig.
+
+    ``Executor.map`` würde den gesamten Spool vorab einlesen.
+    """
+    while True:
+        chunk = list(islice(items, window))
+        if not chunk:
+            return
+        yield from pool.map(parse_message, chunk, chunksize=64)
+
+
+def clean_subject(subject):
+    subject = TICKET_TAG.sub("", subject)
+    subject = REPLY_PREFIX.sub("", subject).strip()
+    return (subject or "(ohne Betreff)")[:MAX_TITLE]
+
+
+# ── Zuordnung und Schreiben ──────────────────────
+
+class SenderDirectory:
+    """Zwischenspeicher E-Mail-Adresse -> Benutzer (eine Abfrage pro Lauf)."""
+
+    def __init__(self):
+        rows = db.session.execute(
+            db.select(User.email, User.id, User.role, User.tenant)
+            .where(User.is_active.isnot(False))
+        )
+        self._by_email = {
+            addr.lower(): Sender(uid, role, tenant) for addr, uid, role, tenant in rows
+        }
+
+    def lookup(self, address):
+        return self._by_email.get(address)
+
+
+def _apply_batch(batch, senders, stats):
+    """Schreibt einen Batch geparster Nachrichten in einer Transaktion."""
+    seen = set(db.session.execute(
+        db.select(ProcessedMail.message_id)
+        .where(ProcessedMail.message_id.in_({mail.message_id for mail in batch}))
+    ).scalars())
+    fresh = []
+    for mail in batch:
+        if mail.message_id in seen:
+            stats["duplicates"] += 1
+            continue
+        seen.add(mail.message_id)
+        fresh.append(mail)
+    batch = fresh
+    db.session.add_all(ProcessedMail(message_id=mail.message_id) for mail in batch)
+
+    refs = {mail.ticket_ref for mail in batch if mail.ticket_ref}
+    tickets = {}
+    if refs:
+        tickets = {
+            t.id: t for t in Ticket.query.filter(Ticket.id.in_(refs))
+        }
+
+    now = datetime.utcnow()
+    new_comments, new_tickets = [], []
+    for mail in batch:
+        sender = senders.lookup(mail.sender)
+        if sender is None:
+            stats["rejected"] += 1
+            continue
+
+        ticket = tickets.get(mail.ticket_ref)
+        may_reply = ticket is not None and ticket.tenant == sender.tenant and (
+            sender.role in ("admin", "techniker") or ticket.created_by_id == sender.id
+        )
+
+        if may_reply and ticket.status != "geschlossen":
+            comment = Comment(
+                content=mail.body or "(leere Nachricht)",
+                ticket_id=ticket.id,
+                user_id=sender.id,
+                created_at=now,
+            )
+            db.session.add(comment)
+            new_comments.append((ticket, comment, sender))
+            continue
+
+        # Antworten auf geschlossene oder fremde Tickets werden neue Tickets
+        description = mail.body or "(leere Nachricht)"
+        if may_reply:
+            description = f"Bezug: Ticket #{ticket.id} (geschlossen)\n\n{description}"
+        new_ticket = Ticket(
+            tenant=sender.tenant,
+            title=clean_subject(mail.subject),
+            description=description,
+            priority="mittel",
+            category="sonstiges",
+            created_by_id=sender.id,
+            created_at=now,
+        )
+        db.session.add(new_ticket)
+        new_tickets.append((new_ticket, sender))
+
+    # Ein Flush für den ganzen Batch vergibt alle IDs
+    db.session.flush()
+
+    for ticket, comment, sender in new_comments:
+        history.record_comment(ticket, comment, user=sender)
+        ticket.updated_at = now
+    for ticket, sender in new_tickets:
+        history.record_creation(ticket, user=sender)
+        reports.record_creation(ticket)
+
+    stats["comments"] += len(new_comments)
+    stats["tickets"] += len(new_tickets)
+    db.session.commit()
+
+
+def ingest(path, batch_size=200, workers=None, mark=True):
+    """Verarbeitet alle neuen Nachrichten im Spool ``path``.
+
+    ``workers=0`` parst im aktuellen Prozess (z.B. für Tests). Gibt eine
+    Statistik mit Anzahl, Laufzeit und Durchsatz (Nachrichten/Minute) zurück.
+    """
+    started = time.perf_counter()
+    stats = {"messages": 0, "tickets": 0, "comments": 0, "rejected": 0, "duplicates": 0}
+    senders = SenderDirectory()
+
+    def process(parsed):
+        batch, keys = [], []
+        for mail in parsed:
+            batch.append(mail)
+            keys.append(mail.key)
+            stats["messages"] += 1
+            if len(batch) >= batch_size:
+                _apply_batch(batch, senders, stats)
+                if mark:
+                    mark_processed(path, keys)
+                batch, keys = [], []
+        if batch:
+            _apply_batch(batch, senders, stats)
+            if mark:
+                mark_processed(path, keys)
+
+    if workers == 0:
+        process(map(parse_message, read_spool(path)))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            process(_parallel_parse(pool, read_spool(path), window=batch_size * 4))
+
+    elapsed = time.perf_counter() - started
+    stats["seconds"] = round(elapsed, 3)
+    stats["per_minute"] = round(stats["messages"] / elapsed * 60) if elapsed else 0
+    return stats
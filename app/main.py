@@ -4,20 +4,35 @@ Flask-Server mit Authentifizierung, Ticket-Verwaltung und Dashboard.
 """
 
 import os
-from datetime import datetime
+from datetime import datetime, timedelta
 from functools import wraps
 
+import click
+from sqlalchemy import func
+
 from flask import (
     Flask, render_template, redirect, url_for, request,
-    flash, jsonify, abort
+    flash, jsonify, abort, send_file, Response
 )
 from flask_login import (
     LoginManager, login_user, logout_user,
     login_required, current_user
 )
 
-from app.models import db, User, Ticket, Comment
+from app.models import (
+    db, User, Ticket, Comment, Attachment, ApiToken, SavedView, ArchivedTicket
+)
 from app.seed import seed_database
+from app.migrations import upgrade_schema
+from app import (
+    analytics, api, archive, backup, history, mailgate, reports, saved_views, tenancy, tokens
+)
+from app.assets import (
+    asset_url, compress_response, init_assets, serve_asset, strip_encoding_etags
+)
+from app.attachments import (
+    HelpdeskRequest, INLINE_TYPES, attach_uploads, blob_path, discard_unstored_uploads
+)
 
 
 def techniker_required(f):
@@ -42,6 +57,22 @@ def admin_required(f):
     return decorated
 
 
+def api_login_required(f):
+    """Dekorator: Anmeldung für JSON-Endpunkte (401 statt Weiterleitung).
+
+    Lese-Tokens sind auf GET/HEAD beschränkt.
+    """
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        if not current_user.is_authenticated:
+            return jsonify({"error": "Anmeldung erforderlich"}), 401
+        if (getattr(current_user, "token_scope", None) == "read"
+                and request.method not in ("GET", "HEAD", "OPTIONS")):
+            return jsonify({"error": "Token hat keinen Schreibzugriff"}), 403
+        return f(*args, **kwargs)
+    return decorated
+
+
 def create_app():
     """Flask-Anwendung erstellen und konfigurieren."""
     app = Flask(
@@ -52,9 +83,68 @@ def create_app():
 
     basedir = os.path.abspath(os.path.dirname(os.path.dirname(__file__)))
     app.config["SECRET_KEY"] = os.environ.get("SECRET_KEY", "helpdesk-dev-key-change-in-prod")
-    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{os.path.join(basedir, 'helpdesk.db')}"
+
+    # Optional: Instanz für genau einen Mandanten mit eigener SQLite-Datei
+    app.config["TENANT"] = os.environ.get("HELPDESK_TENANT") or None
+    if app.config["TENANT"]:
+        default_db = tenancy.tenant_database_path(app.instance_path, app.config["TENANT"])
+        os.makedirs(os.path.dirname(default_db), exist_ok=True)
+    else:
+        default_db = os.path.join(basedir, "helpdesk.db")
+    app.config["SQLALCHEMY_DATABASE_URI"] = os.environ.get(
+        "HELPDESK_DATABASE_URI", f"sqlite:///{default_db}"
+    )
     app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
 
+    # Archiv für alte geschlossene Tickets (eigene Datenbank)
+    app.config["SQLALCHEMY_BINDS"] = {
+        "archive": os.environ.get("HELPDESK_ARCHIVE_URI") or archive.default_archive_uri(
+            app.config["SQLALCHEMY_DATABASE_URI"], app.instance_path
+        ),
+    }
+    app.config["ARCHIVE_AFTER_DAYS"] = int(os.environ.get("HELPDESK_ARCHIVE_AFTER_DAYS", 365))
+
+    # SQLite im WAL-Modus (Online-Sicherung ohne Schreibsperre) und Sicherungen
+    app.config["SQLITE_WAL"] = os.environ.get("HELPDESK_SQLITE_WAL", "true").lower() == "true"
+    app.config["BACKUP_DIR"] = os.environ.get(
+        "HELPDESK_BACKUP_DIR", os.path.join(app.instance_path, "backups")
+    )
+    app.config["BACKUP_KEEP"] = int(os.environ.get("HELPDESK_BACKUP_KEEP", 7))
+
+    # ASGI-Betrieb (app/asgi.py): Thread-Pool für Views und Long-Polling-Intervall
+    app.config["ASYNC_WORKERS"] = int(os.environ.get("HELPDESK_ASYNC_WORKERS", 8))
+    app.config["ASYNC_POLL_SECONDS"] = float(os.environ.get("HELPDESK_ASYNC_POLL_SECONDS", 1.0))
+
+    # Dateianhänge
+    app.request_class = HelpdeskRequest
+    app.config["ATTACHMENT_DIR"] = os.environ.get(
+        "HELPDESK_ATTACHMENT_DIR", os.path.join(app.instance_path, "attachments")
+    )
+    app.config["ATTACHMENT_QUOTA_BYTES"] = int(
+        os.environ.get("HELPDESK_ATTACHMENT_QUOTA_MB", 200)
+    ) * 1024 * 1024
+    app.config["MAX_CONTENT_LENGTH"] = int(
+        os.environ.get("HELPDESK_MAX_UPLOAD_MB", 100)
+    ) * 1024 * 1024
+    app.config["USE_X_SENDFILE"] = os.environ.get("HELPDESK_X_SENDFILE", "false").lower() == "true"
+    app.teardown_request(discard_unstored_uploads)
+
+    # Statische Assets und Kompression
+    app.config["ASSET_DIR"] = os.environ.get(
+        "HELPDESK_ASSET_DIR", os.path.join(app.instance_path, "assets")
+    )
+    app.config["COMPRESS_MIN_BYTES"] = int(os.environ.get("HELPDESK_COMPRESS_MIN_BYTES", 1024))
+    app.config["COMPRESS_LEVEL"] = 6
+    init_assets(app)
+    app.add_template_global(asset_url)
+    app.before_request(strip_encoding_etags)
+    app.after_request(compress_response)
+
+    # API-Tokens
+    app.config["API_TOKEN_CACHE_SECONDS"] = int(
+        os.environ.get("HELPDESK_TOKEN_CACHE_SECONDS", 60)
+    )
+
     # Erweiterungen initialisieren
     db.init_app(app)
     login_manager = LoginManager(app)
@@ -65,10 +155,24 @@ def create_app():
     def load_user(user_id):
         return User.query.get(int(user_id))
 
+    @login_manager.request_loader
+    def load_user_from_token(req):
+        # Tokens nur für die API – ohne Session und ohne Passwort-Hashing
+        if not req.path.startswith("/api/"):
+            return None
+        token = tokens.bearer_token(req)
+        if token is None:
+            return None
+        return tokens.get_cache(app).authenticate(token)
+
     # Datenbank und Demodaten erstellen
     with app.app_context():
         db.create_all()
+        upgrade_schema()
         seed_database()
+        if app.config["SQLITE_WAL"]:
+            for engine in db.engines.values():
+                backup.enable_wal(engine)
 
     # ── Authentifizierung ────────────────────────────
 
@@ -99,51 +203,60 @@ def create_app():
 
     # ── Dashboard ────────────────────────────────────
 
+    def _ticket_counts(user):
+        """Sichtbare Tickets je Status, offene je Priorität und je Kategorie.
+
+        Archivierte Tickets sind geschlossen und kommen aus den Archiv-Summen.
+        """
+        by_status = dict.fromkeys(Ticket.STATUSES, 0)
+        open_by_priority = dict.fromkeys(Ticket.PRIORITIES, 0)
+        by_category = dict.fromkeys(Ticket.CATEGORIES, 0)
+        rows = db.session.execute(
+            db.select(Ticket.status, Ticket.priority, Ticket.category, func.count())
+            .where(*tenancy.ticket_scope(user))
+            .group_by(Ticket.status, Ticket.priority, Ticket.category)
+        )
+        for status, priority, category, count in rows:
+            by_status[status] = by_status.get(status, 0) + count
+            by_category[category] = by_category.get(category, 0) + count
+            if status != "geschlossen":
+                open_by_priority[priority] = open_by_priority.get(priority, 0) + count
+        for category, count in archive.counts_by_category(user).items():
+            by_status["geschlossen"] += count
+            by_category[category] = by_category.get(category, 0) + count
+        return {
+            "total": sum(by_status.values()),
+            "by_status": by_status,
+            "open_by_priority": open_by_priority,
+            "by_category": by_category,
+        }
+
     @app.route("/")
     @login_required
     def dashboard():
-        # Statistiken berechnen
-        if current_user.is_techniker:
-            tickets = Ticket.query
-        else:
-            tickets = Ticket.query.filter_by(created_by_id=current_user.id)
-
-        total = tickets.count()
-        offen = tickets.filter_by(status="offen").count()
-        in_bearbeitung = tickets.filter_by(status="in_bearbeitung").count()
-        wartend = tickets.filter_by(status="wartend").count()
-        geschlossen = tickets.filter_by(status="geschlossen").count()
+        # Statistiken berechnen (eine Abfrage im Bereich des Mandanten)
+        counts = _ticket_counts(current_user)
+        tickets = tenancy.visible_tickets(current_user)
 
         # Tiketi po prioritetu
-        kritisch = tickets.filter_by(priority="kritisch").filter(Ticket.status != "geschlossen").count()
-        hoch = tickets.filter_by(priority="hoch").filter(Ticket.status != "geschlossen").count()
-
-        # Tiketi po kategoriji
-        categories = {}
-        for cat in Ticket.CATEGORIES:
-            categories[cat] = tickets.filter_by(category=cat).count()
+        kritisch = counts["open_by_priority"]["kritisch"]
+        hoch = counts["open_by_priority"]["hoch"]
 
         # Poslednji tiketi
+        recent = tickets.order_by(Ticket.created_at.desc()).limit(5).all()
         if current_user.is_techniker:
-            recent = Ticket.query.order_by(Ticket.created_at.desc()).limit(5).all()
-            my_assigned = Ticket.query.filter_by(
+            my_assigned = tickets.filter_by(
                 assigned_to_id=current_user.id
             ).filter(Ticket.status != "geschlossen").order_by(Ticket.priority.desc()).all()
         else:
-            recent = Ticket.query.filter_by(
-                created_by_id=current_user.id
-            ).order_by(Ticket.created_at.desc()).limit(5).all()
             my_assigned = []
 
         stats = {
-            "total": total,
-            "offen": offen,
-            "in_bearbeitung": in_bearbeitung,
-            "wartend": wartend,
-            "geschlossen": geschlossen,
+            "total": counts["total"],
+            **counts["by_status"],
             "kritisch": kritisch,
             "hoch": hoch,
-            "categories": categories,
+            "categories": counts["by_category"],
         }
 
         return render_template(
@@ -163,25 +276,28 @@ def create_app():
         category_filter = request.args.get("category", "alle")
         search = request.args.get("q", "").strip()
 
-        query = Ticket.query
-
+        filters = saved_views.normalize_filters(request.args)
         # Mitarbeiter sehen nur eigene Tickets
-        if not current_user.is_techniker:
-            query = query.filter_by(created_by_id=current_user.id)
-
-        if status_filter != "alle":
-            query = query.filter_by(status=status_filter)
-        if priority_filter != "alle":
-            query = query.filter_by(priority=priority_filter)
-        if category_filter != "alle":
-            query = query.filter_by(category=category_filter)
-        if search:
-            query = query.filter(
-                Ticket.title.ilike(f"%{search}%") | Ticket.description.ilike(f"%{search}%")
-            )
-
+        query = Ticket.query.filter(
+            *tenancy.ticket_scope(current_user), *saved_views.conditions(**filters)
+        )
         tickets = query.order_by(Ticket.created_at.desc()).all()
 
+        # Suchen reichen ins Archiv (dort ist jedes Ticket geschlossen)
+        if saved_views.reads_archive(filters):
+            archived = archive.search([
+                *tenancy.ticket_scope(current_user, ArchivedTicket),
+                *saved_views.conditions(**filters, model=ArchivedTicket),
+            ])
+            tickets = sorted(tickets + archived, key=lambda t: t.created_at, reverse=True)
+
+        # Ansicht, die genau den aktuellen Filtern entspricht
+        active_view = next(
+            (view for view in SavedView.query.filter_by(user_id=current_user.id)
+             if view.filters == filters),
+            None,
+        )
+
         return render_template(
             "tickets.html",
             tickets=tickets,
@@ -189,8 +305,37 @@ def create_app():
             priority_filter=priority_filter,
             category_filter=category_filter,
             search=search,
+            has_filters=any(filters.values()),
+            active_view=active_view,
         )
 
+    @app.route("/views", methods=["POST"])
+    @login_required
+    def view_create():
+        name = request.form.get("name", "").strip()[:80]
+        filters = saved_views.normalize_filters(request.form)
+        if not name:
+            flash("Bitte einen Namen für die Ansicht angeben.", "error")
+        else:
+            db.session.add(SavedView(user_id=current_user.id, name=name, **filters))
+            db.session.commit()
+            saved_views.get_cache(app).invalidate(current_user.id)
+            flash(f"Ansicht \"{name}\" wurde gespeichert.", "success")
+        args = {k: v for k, v in request.form.items() if k in ("status", "priority", "category", "q")}
+        return redirect(url_for("ticket_list", **args))
+
+    @app.route("/views/<int:view_id>/delete", methods=["POST"])
+    @login_required
+    def view_delete(view_id):
+        view = SavedView.query.get_or_404(view_id)
+        if view.user_id != current_user.id:
+            abort(403)
+        db.session.delete(view)
+        db.session.commit()
+        saved_views.get_cache(app).invalidate(current_user.id)
+        flash(f"Ansicht \"{view.name}\" wurde gelöscht.", "success")
+        return redirect(url_for("ticket_list"))
+
     @app.route("/tickets/new", methods=["GET", "POST"])
     @login_required
     def ticket_new():
@@ -204,7 +349,12 @@ def create_app():
                 flash("Titel und Beschreibung sind erforderlich.", "error")
                 return render_template("ticket_form.html", edit=False)
 
+            if priority not in Ticket.PRIORITIES or category not in Ticket.CATEGORIES:
+                flash("Ungültige Priorität oder Kategorie.", "error")
+                return render_template("ticket_form.html", edit=False)
+
             ticket = Ticket(
+                tenant=current_user.tenant,
                 title=title,
                 description=description,
                 priority=priority,
@@ -212,6 +362,10 @@ def create_app():
                 created_by_id=current_user.id,
             )
             db.session.add(ticket)
+            db.session.flush()
+            history.record_creation(ticket, user=current_user)
+            reports.record_creation(ticket)
+            _store_attachments(ticket)
             db.session.commit()
 
             flash(f"Ticket #{ticket.id} wurde erstellt.", "success")
@@ -222,48 +376,66 @@ def create_app():
     @app.route("/tickets/<int:ticket_id>")
     @login_required
     def ticket_detail(ticket_id):
-        ticket = Ticket.query.get_or_404(ticket_id)
+        ticket = tenancy.get_ticket_or_404(ticket_id, current_user, include_archived=True)
 
         # Zugriffskontrolle
         if not current_user.is_techniker and ticket.created_by_id != current_user.id:
             abort(403)
 
-        technikers = User.query.filter(User.role.in_(["admin", "techniker"])).all()
+        technikers = tenancy.colleagues(current_user).filter(
+            User.role.in_(["admin", "techniker"])
+        ).all()
+
+        timeline = history.ticket_timeline(ticket.id)
+        if not current_user.is_techniker:
+            timeline = [e for e in timeline if not e.is_internal]
 
         return render_template(
             "ticket_detail.html",
             ticket=ticket,
             technikers=technikers,
+            timeline=timeline,
+            user_names={u.id: u.full_name for u in technikers},
+            status_durations=history.status_durations(timeline, until=ticket.closed_at),
         )
 
     @app.route("/tickets/<int:ticket_id>/update", methods=["POST"])
     @login_required
     def ticket_update(ticket_id):
-        ticket = Ticket.query.get_or_404(ticket_id)
+        ticket = tenancy.get_ticket_or_404(ticket_id, current_user)
 
         if not current_user.is_techniker and ticket.created_by_id != current_user.id:
             abort(403)
 
+        # Zuweisung prüfen: nur Techniker desselben Mandanten
+        assigned_to = request.form.get("assigned_to_id")
+        assignee = None
+        if assigned_to and current_user.is_techniker:
+            if assigned_to.isdigit():
+                assignee = tenancy.find_assignee(int(assigned_to), ticket)
+            if assignee is None:
+                flash("Ungültige Zuweisung.", "error")
+                return redirect(url_for("ticket_detail", ticket_id=ticket.id))
+
+        before = history.snapshot(ticket)
+        previous_closed_at = ticket.closed_at
+
         # Status ändern (nur Techniker)
         new_status = request.form.get("status")
         if new_status and current_user.is_techniker and new_status in Ticket.STATUSES:
-            old_status = ticket.status
-            ticket.status = new_status
-            if new_status == "geschlossen" and not ticket.closed_at:
-                ticket.closed_at = datetime.utcnow()
-            elif new_status != "geschlossen":
-                ticket.closed_at = None
+            ticket.set_status(new_status)
 
         # Zuweisung ändern (nur Techniker)
-        assigned_to = request.form.get("assigned_to_id")
         if assigned_to is not None and current_user.is_techniker:
-            ticket.assigned_to_id = int(assigned_to) if assigned_to else None
+            ticket.assigned_to_id = assignee.id if assignee else None
 
         # Priorität ändern (nur Techniker)
         new_priority = request.form.get("priority")
         if new_priority and current_user.is_techniker and new_priority in Ticket.PRIORITIES:
             ticket.priority = new_priority
 
+        history.record_update(ticket, before, user=current_user)
+        reports.record_update(ticket, before, previous_closed_at)
         ticket.updated_at = datetime.utcnow()
         db.session.commit()
         flash("Ticket wurde aktualisiert.", "success")
@@ -272,7 +444,7 @@ def create_app():
     @app.route("/tickets/<int:ticket_id>/comment", methods=["POST"])
     @login_required
     def ticket_comment(ticket_id):
-        ticket = Ticket.query.get_or_404(ticket_id)
+        ticket = tenancy.get_ticket_or_404(ticket_id, current_user)
 
         if not current_user.is_techniker and ticket.created_by_id != current_user.id:
             abort(403)
@@ -291,18 +463,71 @@ def create_app():
             user_id=current_user.id,
         )
         db.session.add(comment)
+        db.session.flush()
+        history.record_comment(ticket, comment, user=current_user)
+        _store_attachments(ticket, comment)
         ticket.updated_at = datetime.utcnow()
         db.session.commit()
 
         flash("Kommentar hinzugefügt.", "success")
         return redirect(url_for("ticket_detail", ticket_id=ticket.id))
 
+    def _store_attachments(ticket, comment=None):
+        """Hochgeladene Dateien übernehmen und Ablehnungen melden."""
+        _, rejected = attach_uploads(
+            ticket, request.files.getlist("attachments"), current_user, comment
+        )
+        if rejected:
+            flash(
+                "Anhang-Kontingent überschritten, nicht gespeichert: " + ", ".join(rejected),
+                "error",
+            )
+
+    @app.route("/attachments/<int:attachment_id>/<path:filename>")
+    @login_required
+    def attachment_download(attachment_id, filename):
+        attachment = Attachment.query.get_or_404(attachment_id)
+        ticket, comment = archive.attachment_owner(attachment)
+        if ticket is None or ticket.tenant != current_user.tenant:
+            abort(404)
+
+        if not current_user.is_techniker:
+            if ticket.created_by_id != current_user.id:
+                abort(403)
+            if comment is not None and comment.is_internal:
+                abort(403)
+
+        # Inhaltsadressiert: Der Inhalt unter dieser URL ändert sich nie.
+        # send_file liefert Range-Anfragen (206), ETag-Prüfung (304) und
+        # nutzt wsgi.file_wrapper bzw. X-Sendfile für die Übertragung.
+        response = send_file(
+            blob_path(attachment.sha256),
+            mimetype=attachment.content_type,
+            as_attachment=attachment.content_type not in INLINE_TYPES,
+            download_name=attachment.filename,
+            etag=attachment.sha256,
+            conditional=True,
+            max_age=365 * 24 * 3600,
+        )
+        response.cache_control.private = True
+        response.cache_control.public = False
+        response.cache_control.immutable = True
+        response.headers["X-Content-Type-Options"] = "nosniff"
+        return response
+
+    @app.route("/assets/<path:filename>")
+    def asset(filename):
+        response = serve_asset(filename)
+        if response is None:
+            abort(404)
+        return response
+
     # ── Benutzerverwaltung (nur Admin) ───────────────
 
     @app.route("/users")
     @admin_required
     def user_list():
-        users = User.query.order_by(User.role, User.full_name).all()
+        users = tenancy.colleagues(current_user).order_by(User.role, User.full_name).all()
         return render_template("users.html", users=users)
 
     # ── API-Endpunkte für Dashboard-Diagramme ────────
@@ -310,29 +535,494 @@ def create_app():
     @app.route("/api/stats/overview")
     @login_required
     def api_stats_overview():
-        if current_user.is_techniker:
-            base = Ticket.query
+        counts = _ticket_counts(current_user)
+        response = jsonify({
+            "by_status": counts["by_status"],
+            "by_priority": counts["open_by_priority"],
+            "by_category": counts["by_category"],
+        })
+        # ETag aus dem Inhalt: Dashboards pollen mit If-None-Match (ASGI: Long-Polling)
+        response.add_etag()
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+        return response.make_conditional(request)
+
+    # ── REST-API v1: Tickets ─────────────────────────
+
+    def _api_error(message, status):
+        return jsonify({"error": message}), status
+
+    def _json_object():
+        """JSON-Body als dict; ``None``, wenn er kein Objekt ist."""
+        payload = request.get_json(silent=True)
+        if payload is None:
+            return {}
+        return payload if isinstance(payload, dict) else None
+
+    def _not_modified(etag):
+        response = Response(status=304)
+        response.set_etag(etag)
+        return response
+
+    def _ticket_version(ticket_id):
+        """``updated_at`` eines sichtbaren Tickets oder ``None``."""
+        stmt = api.scoped(
+            db.select(Ticket.updated_at).where(Ticket.id == ticket_id), current_user
+        )
+        return db.session.execute(stmt).first()
+
+    def _ticket_response(ticket_id, fields, status=200):
+        row = _ticket_version(ticket_id)
+        if row is None:
+            return _api_error("Ticket nicht gefunden", 404)
+        etag = api.make_etag(ticket_id, row.updated_at, ",".join(fields))
+        if status == 200 and request.if_none_match.contains(etag):
+            return _not_modified(etag)
+
+        response = jsonify(api.fetch(fields, current_user, ids=[ticket_id])[0])
+        response.status_code = status
+        response.set_etag(etag)
+        response.last_modified = row.updated_at
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+        return response
+
+    def _validate_choice(payload, field, choices):
+        value = payload.get(field)
+        if value is not None and value not in choices:
+            raise ValueError(f"Ungültiger Wert für {field}: {value}")
+        return value
+
+    @app.route("/api/v1/tickets", methods=["GET"])
+    @api_login_required
+    def api_v1_ticket_list():
+        try:
+            fields = api.parse_fields(request.args.get("fields"))
+            ids = api.parse_ids(request.args["ids"]) if request.args.get("ids") else None
+            filters = api.parse_filters(request.args)
+            limit = min(api.parse_int(request.args.get("limit", 100), "limit", 1), api.MAX_LIMIT)
+            offset = api.parse_int(request.args.get("offset", 0), "offset")
+        except ValueError as exc:
+            return _api_error(str(exc), 400)
+
+        count, latest = api.list_version(current_user, ids, filters)
+        etag = api.make_etag(
+            current_user.id, count, latest, request.query_string.decode()
+        )
+        if request.if_none_match.contains(etag):
+            return _not_modified(etag)
+
+        tickets = api.fetch(fields, current_user, ids=ids, args=filters,
+                            limit=limit, offset=offset)
+        payload = {"tickets": tickets}
+        if ids is not None:
+            found = {t["id"] for t in tickets}
+            payload["missing"] = [i for i in ids if i not in found]
         else:
-            base = Ticket.query.filter_by(created_by_id=current_user.id)
+            payload.update({"total": count, "limit": limit, "offset": offset})
+
+        response = jsonify(payload)
+        response.set_etag(etag)
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+        return response
+
+    @app.route("/api/v1/tickets/<int:ticket_id>", methods=["GET"])
+    @api_login_required
+    def api_v1_ticket_get(ticket_id):
+        try:
+            fields = api.parse_fields(request.args.get("fields"))
+        except ValueError as exc:
+            return _api_error(str(exc), 400)
+        return _ticket_response(ticket_id, fields)
+
+    @app.route("/api/v1/tickets", methods=["POST"])
+    @api_login_required
+    def api_v1_ticket_create():
+        payload = _json_object()
+        if payload is None:
+            return _api_error("JSON-Objekt erwartet", 400)
+        title = str(payload.get("title", "")).strip()
+        description = str(payload.get("description", "")).strip()
+        if not title or not description:
+            return _api_error("title und description sind erforderlich", 400)
+        try:
+            priority = _validate_choice(payload, "priority", Ticket.PRIORITIES) or "mittel"
+            category = _validate_choice(payload, "category", Ticket.CATEGORIES) or "software"
+        except ValueError as exc:
+            return _api_error(str(exc), 400)
+
+        ticket = Ticket(
+            tenant=current_user.tenant,
+            title=title[:200],
+            description=description,
+            priority=priority,
+            category=category,
+            created_by_id=current_user.id,
+        )
+        db.session.add(ticket)
+        db.session.flush()
+        history.record_creation(ticket, user=current_user)
+        reports.record_creation(ticket)
+        db.session.commit()
+
+        response = _ticket_response(ticket.id, list(api.FIELDS), status=201)
+        response.headers["Location"] = url_for("api_v1_ticket_get", ticket_id=ticket.id)
+        return response
+
+    @app.route("/api/v1/tickets/<int:ticket_id>", methods=["PATCH"])
+    @api_login_required
+    def api_v1_ticket_update(ticket_id):
+        ticket = db.session.get(Ticket, ticket_id)
+        if ticket is None or ticket.tenant != current_user.tenant or (
+            not current_user.is_techniker and ticket.created_by_id != current_user.id
+        ):
+            return _api_error("Ticket nicht gefunden", 404)
+
+        # Optimistische Sperre: If-Match muss zur aktuellen Version passen
+        if request.if_match:
+            etag = api.make_etag(ticket.id, ticket.updated_at, ",".join(api.FIELDS))
+            if not request.if_match.contains(etag):
+                return _api_error("Ticket wurde zwischenzeitlich geändert", 412)
+
+        payload = _json_object()
+        if payload is None:
+            return _api_error("JSON-Objekt erwartet", 400)
+        restricted = {"status", "priority", "assigned_to_id"} & set(payload)
+        if restricted and not current_user.is_techniker:
+            return _api_error("Nur Techniker dürfen " + ", ".join(sorted(restricted)) + " ändern", 403)
+        unknown = set(payload) - {"title", "description", "status", "priority", "assigned_to_id"}
+        if unknown:
+            return _api_error("Nicht änderbare Felder: " + ", ".join(sorted(unknown)), 400)
+
+        try:
+            status = _validate_choice(payload, "status", Ticket.STATUSES)
+            priority = _validate_choice(payload, "priority", Ticket.PRIORITIES)
+        except ValueError as exc:
+            return _api_error(str(exc), 400)
+        if "assigned_to_id" in payload and payload["assigned_to_id"] is not None:
+            if type(payload["assigned_to_id"]) is not int:
+                return _api_error("assigned_to_id muss eine Zahl sein", 400)
+            if tenancy.find_assignee(payload["assigned_to_id"], ticket) is None:
+                return _api_error("assigned_to_id muss ein Techniker sein", 400)
+
+        before = history.snapshot(ticket)
+        previous_closed_at = ticket.closed_at
+        if payload.get("title"):
+            ticket.title = str(payload["title"]).strip()[:200]
+        if payload.get("description"):
+            ticket.description = str(payload["description"]).strip()
+        if status:
+            ticket.set_status(status)
+        if priority:
+            ticket.priority = priority
+        if "assigned_to_id" in payload:
+            ticket.assigned_to_id = payload["assigned_to_id"]
+
+        history.record_update(ticket, before, user=current_user)
+        reports.record_update(ticket, before, previous_closed_at)
+        ticket.updated_at = datetime.utcnow()
+        db.session.commit()
+        return _ticket_response(ticket.id, list(api.FIELDS))
 
+    @app.route("/api/v1/tickets/<int:ticket_id>", methods=["DELETE"])
+    @api_login_required
+    def api_v1_ticket_delete(ticket_id):
+        if not current_user.is_admin:
+            return _api_error("Nur Administratoren dürfen Tickets löschen", 403)
+        ticket = db.session.get(Ticket, ticket_id)
+        if ticket is None or ticket.tenant != current_user.tenant:
+            return _api_error("Ticket nicht gefunden", 404)
+
+        # Der Verlauf bleibt als Audit-Log erhalten, Anhang-Inhalte in der Ablage
+        Attachment.query.filter_by(ticket_id=ticket.id).delete()
+        Comment.query.filter_by(ticket_id=ticket.id).delete()
+        history.record_deletion(ticket, user=current_user)
+        reports.record_deletion(ticket)
+        db.session.delete(ticket)
+        db.session.commit()
+        return "", 204
+
+    # ── REST-API v1: Tokens ──────────────────────────
+
+    def _token_json(token):
+        return {
+            "id": token.id,
+            "name": token.name,
+            "prefix": token.prefix,
+            "scope": token.scope,
+            "created_at": token.created_at.isoformat() if token.created_at else None,
+            "revoked_at": token.revoked_at.isoformat() if token.revoked_at else None,
+        }
+
+    @app.route("/api/v1/tokens", methods=["GET"])
+    @api_login_required
+    def api_v1_token_list():
+        own = ApiToken.query.filter_by(user_id=current_user.id).order_by(ApiToken.id)
+        return jsonify({"tokens": [_token_json(t) for t in own]})
+
+    @app.route("/api/v1/tokens", methods=["POST"])
+    @api_login_required
+    def api_v1_token_create():
+        # Neue Tokens nur aus einer angemeldeten Sitzung, nicht per Token
+        if getattr(current_user, "token_scope", None) is not None:
+            return _api_error("Tokens können nur nach Anmeldung erstellt werden", 403)
+        payload = _json_object()
+        if payload is None:
+            return _api_error("JSON-Objekt erwartet", 400)
+        name, scope = payload.get("name", ""), payload.get("scope", "read")
+        if not isinstance(name, str) or not isinstance(scope, str):
+            return _api_error("name und scope müssen Texte sein", 400)
+        try:
+            token, plaintext = tokens.issue_token(current_user, name, scope)
+        except ValueError as exc:
+            return _api_error(str(exc), 400)
+        db.session.commit()
+        data = _token_json(token)
+        data["token"] = plaintext
+        return jsonify(data), 201
+
+    @app.route("/api/v1/tokens/<int:token_id>", methods=["DELETE"])
+    @api_login_required
+    def api_v1_token_revoke(token_id):
+        token = db.session.get(ApiToken, token_id)
+        if token is None or (token.user_id != current_user.id and not (
+            current_user.is_admin and token.user.tenant == current_user.tenant
+        )):
+            return _api_error("Token nicht gefunden", 404)
+        tokens.revoke(token, tokens.get_cache(app))
+        db.session.commit()
+        return "", 204
+
+    @app.cli.command("tenant-export")
+    @click.argument("tenant")
+    @click.argument("target", required=False)
+    def tenant_export(tenant, target):
+        """Daten eines Mandanten in eine eigene SQLite-Datei kopieren."""
+        if target is None:
+            target = tenancy.tenant_database_path(app.instance_path, tenant)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+        target_uri = f"sqlite:///{os.path.abspath(target)}"
+        archive_uri = archive.default_archive_uri(target_uri, app.instance_path)
+        try:
+            copied = tenancy.export_tenant(tenant, target_uri, archive_uri=archive_uri)
+        except ValueError as exc:
+            raise click.ClickException(str(exc))
+        for table, count in copied.items():
+            click.echo(f"{table}: {count}")
+        click.echo(f"Start mit HELPDESK_TENANT={tenant} HELPDESK_DATABASE_URI={target_uri}")
+
+    @app.cli.command("user-tenant")
+    @click.argument("username")
+    @click.argument("tenant")
+    def user_tenant(username, tenant):
+        """Benutzer einem Mandanten zuordnen (z.B. vor ``tenant-export``)."""
+        user = User.query.filter_by(username=username).first()
+        if user is None:
+            raise click.ClickException(f"Benutzer {username} nicht gefunden")
+        user.tenant = tenant
+        db.session.commit()
+        click.echo(f"{username} -> {tenant}")
+
+    @app.cli.command("assets-build")
+    def assets_build():
+        """Assets fingerprinten und vorkomprimieren (z.B. beim Deployment)."""
+        manifest = init_assets(app)
+        for logical, hashed in sorted(manifest.paths.items()):
+            click.echo(f"{logical} -> {hashed}")
+
+    @app.cli.command("create-token")
+    @click.argument("username")
+    @click.option("--scope", type=click.Choice(ApiToken.SCOPES), default="read", show_default=True)
+    @click.option("--name", default="", help="Bezeichnung, z.B. Name der Integration")
+    def create_token(username, scope, name):
+        """API-Token für einen Benutzer erstellen."""
+        user = User.query.filter_by(username=username).first()
+        if user is None:
+            raise click.ClickException(f"Benutzer {username} nicht gefunden")
+        _, plaintext = tokens.issue_token(user, name, scope)
+        db.session.commit()
+        click.echo(plaintext)
+
+    # ── Reporting-API (liest nur die Tages-Rollups) ──
+
+    def _report_request():
+        start, end = reports.parse_range(request.args)
+        filters = {"tenant": current_user.tenant}
+        for field in ("category", "priority"):
+            if request.args.get(field):
+                filters[field] = request.args[field]
+        if request.args.get("assignee_id"):
+            filters["assignee_id"] = int(request.args["assignee_id"])
+        return start, end, filters
+
+    @app.route("/api/reports/volume")
+    @techniker_required
+    def api_reports_volume():
+        try:
+            start, end, filters = _report_request()
+        except ValueError as exc:
+            return jsonify({"error": str(exc)}), 400
+        return jsonify({
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "days": reports.volume(start, end, **filters),
+        })
+
+    @app.route("/api/reports/backlog")
+    @techniker_required
+    def api_reports_backlog():
+        try:
+            start, end, filters = _report_request()
+        except ValueError as exc:
+            return jsonify({"error": str(exc)}), 400
         return jsonify({
-            "by_status": {
-                "offen": base.filter_by(status="offen").count(),
-                "in_bearbeitung": base.filter_by(status="in_bearbeitung").count(),
-                "wartend": base.filter_by(status="wartend").count(),
-                "geschlossen": base.filter_by(status="geschlossen").count(),
-            },
-            "by_priority": {
-                "niedrig": base.filter(Ticket.status != "geschlossen").filter_by(priority="niedrig").count(),
-                "mittel": base.filter(Ticket.status != "geschlossen").filter_by(priority="mittel").count(),
-                "hoch": base.filter(Ticket.status != "geschlossen").filter_by(priority="hoch").count(),
-                "kritisch": base.filter(Ticket.status != "geschlossen").filter_by(priority="kritisch").count(),
-            },
-            "by_category": {
-                cat: base.filter_by(category=cat).count() for cat in Ticket.CATEGORIES
-            },
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "days": reports.backlog(start, end, **filters),
         })
 
+    @app.route("/api/reports/resolution")
+    @techniker_required
+    def api_reports_resolution():
+        try:
+            start, end, filters = _report_request()
+        except ValueError as exc:
+            return jsonify({"error": str(exc)}), 400
+        group_by = request.args.get("group", "category")
+        if group_by not in ("category", "priority", "assignee_id"):
+            return jsonify({"error": "group muss category, priority oder assignee_id sein"}), 400
+        return jsonify({
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "group": group_by,
+            "groups": reports.resolution(start, end, group_by=group_by, **filters),
+        })
+
+    # ── Analyse-Snapshot (nur Admin) ─────────────────
+
+    @app.route("/api/analytics/pivot")
+    @admin_required
+    def api_analytics_pivot():
+        rows = request.args.get("rows", "category")
+        cols = request.args.get("cols") or None
+        filters = {
+            dim: request.args[dim]
+            for dim in analytics.DIMENSIONS
+            if dim not in ("week",) and request.args.get(dim)
+        }
+        try:
+            result = analytics.run_pivot(app, rows, cols, filters, tenant=current_user.tenant)
+        except ValueError as exc:
+            return jsonify({"error": str(exc)}), 400
+        return jsonify(result)
+
+    @app.cli.command("reports-rebuild")
+    @click.option("--days", default=2, show_default=True,
+                  help="Anzahl der zurückliegenden Tage (0 = gesamter Bestand)")
+    def reports_rebuild(days):
+        """Tages-Rollups neu aufbauen (z.B. nächtlich per Cron)."""
+        if days > 0:
+            end = datetime.utcnow().date()
+            count = reports.rebuild(end - timedelta(days=days - 1), end)
+        else:
+            count = reports.rebuild()
+        click.echo(f"{count} Rollup-Buckets geschrieben.")
+
+    @app.cli.command("archive")
+    @click.option("--days", default=None, type=int,
+                  help="Mindestalter seit dem Schließen (Standard: ARCHIVE_AFTER_DAYS)")
+    @click.option("--batch-size", default=500, show_default=True,
+                  help="Tickets pro Transaktion")
+    def archive_tickets(days, batch_size):
+        """Alte geschlossene Tickets ins Archiv verschieben (z.B. nächtlich per Cron)."""
+        if days is None:
+            days = app.config["ARCHIVE_AFTER_DAYS"]
+        stats = archive.archive_closed(days, batch_size=batch_size)
+        click.echo(
+            f"{stats['tickets']} Tickets und {stats['comments']} Kommentare "
+            f"in {stats['batches']} Batches archiviert."
+        )
+
+    def _bind_engines(bind):
+        engines = {"main" if key is None else key: engine for key, engine in db.engines.items()}
+        if bind is not None:
+            if bind not in engines:
+                raise click.ClickException(f"Unbekannte Datenbank: {bind}")
+            engines = {bind: engines[bind]}
+        return engines
+
+    @app.cli.command("backup")
+    @click.option("--dir", "target_dir", default=None,
+                  help="Zielordner (Standard: BACKUP_DIR)")
+    @click.option("--keep", default=None, type=click.IntRange(min=0),
+                  help="Anzahl aufbewahrter Sicherungen je Datenbank, 0 = alle "
+                       "(Standard: BACKUP_KEEP)")
+    @click.option("--gzip/--no-gzip", "compress", default=False, show_default=True,
+                  help="Sicherung komprimieren")
+    @click.option("--pages", default=backup.DEFAULT_PAGES, show_default=True,
+                  help="Seiten je Kopierschritt")
+    @click.option("--bind", default=None, help="Nur diese Datenbank (main, archive)")
+    def backup_create(target_dir, keep, compress, pages, bind):
+        """Online-Sicherung der SQLite-Datenbanken (z.B. nächtlich per Cron)."""
+        target_dir = target_dir or app.config["BACKUP_DIR"]
+        keep = app.config["BACKUP_KEEP"] if keep is None else keep
+        for name, engine in _bind_engines(bind).items():
+            try:
+                source = backup.database_path(engine)
+                result = backup.backup_database(source, target_dir, pages=pages, compress=compress)
+            except ValueError as exc:
+                raise click.ClickException(str(exc))
+            mode = "Snapshot" if result.snapshot else "ohne WAL"
+            click.echo(f"{name}: {result.path} ({result.size} Bytes, "
+                       f"{result.pages} Seiten, {result.seconds} s, {mode})")
+            stem = os.path.splitext(os.path.basename(source))[0]
+            for path in backup.rotate(target_dir, stem, keep):
+                click.echo(f"  entfernt: {path}")
+
+    @app.cli.command("backup-verify")
+    @click.argument("path", type=click.Path(exists=True, dir_okay=False))
+    def backup_verify(path):
+        """Sicherung prüfen (Integrität und Zeilen je Tabelle)."""
+        try:
+            tables = backup.verify_backup(path)
+        except ValueError as exc:
+            raise click.ClickException(str(exc))
+        for table, count in tables.items():
+            click.echo(f"{table}: {count}")
+        click.echo("Integrität: ok")
+
+    @app.cli.command("restore")
+    @click.argument("path", type=click.Path(exists=True, dir_okay=False))
+    @click.option("--bind", default="main", show_default=True,
+                  help="Zieldatenbank (main, archive)")
+    @click.confirmation_option(prompt="Aktuellen Datenbestand durch die Sicherung ersetzen?")
+    def backup_restore(path, bind):
+        """Geprüfte Sicherung in die laufende Datenbank zurückspielen."""
+        engine = _bind_engines(bind)[bind]
+        try:
+            tables = backup.restore_database(path, backup.database_path(engine))
+        except ValueError as exc:
+            raise click.ClickException(str(exc))
+        engine.dispose()
+        click.echo(f"{sum(tables.values())} Zeilen in {len(tables)} Tabellen wiederhergestellt.")
+
+    @app.cli.command("mail-ingest")
+    @click.argument("spool", type=click.Path(exists=True))
+    @click.option("--batch-size", default=200, show_default=True,
+                  help="Nachrichten pro Commit")
+    @click.option("--workers", default=None, type=int,
+                  help="Parser-Prozesse (Standard: CPU-Anzahl, 0 = ohne Pool)")
+    def mail_ingest(spool, batch_size, workers):
+        """E-Mails aus einem Maildir/mbox-Spool als Tickets übernehmen."""
+        stats = mailgate.ingest(spool, batch_size=batch_size, workers=workers)
+        click.echo(
+            f"{stats['messages']} Nachrichten in {stats['seconds']} s "
+            f"({stats['per_minute']}/min): {stats['tickets']} Tickets, "
+            f"{stats['comments']} Kommentare, {stats['rejected']} abgelehnt, "
+            f"{stats['duplicates']} bereits verarbeitet"
+        )
+
     @app.route("/api/health")
     def api_health():
         return jsonify({"status": "ok", "service": "HelpDesk Pro", "version": "1.0.0"})
@@ -349,6 +1039,13 @@ def create_app():
 
     # ── Template-Filter ──────────────────────────────
 
+    @app.context_processor
+    def inject_saved_views():
+        # Sidebar-Anzahlen: eine Versionsabfrage, Zählung nur nach Änderungen
+        if not current_user.is_authenticated:
+            return {}
+        return {"my_views": saved_views.get_cache(app).entries(current_user)}
+
     @app.template_filter("timeago")
     def timeago_filter(dt):
         if not dt:
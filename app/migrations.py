@@ -0,0 +1,213 @@
+"""
+HelpDesk Pro - Schema-Aktualisierung
+Ergänzt bestehende Datenbanken um Indizes und Spalten, die ``db.create_all()``
+für bereits vorhandene Tabellen nicht nachträglich anlegt, stellt
+Text-Spalten für Status, Priorität und Kategorie auf Integer-Codes um und
+ergänzt ``AUTOINCREMENT`` für Tabellen, deren IDs im Archiv weiterleben.
+"""
+
+from sqlalchemy import func, inspect
+from sqlalchemy.schema import CreateColumn
+from sqlalchemy.types import String
+
+from app.models import (
+    db, EnumCode, ReportBucket, Ticket, Comment, ArchivedTicket, ArchivedComment,
+)
+from app import reports
+
+# Abgeleitete Tabellen: bei Schemaänderungen neu anlegen und neu berechnen;
+# leer trotz Quelldaten (z.B. nach dem Update einer alten Datenbank) füllen
+DERIVED_TABLES = {ReportBucket.__table__: (reports.rebuild, (Ticket, ArchivedTicket))}
+
+# Tabellen mit ``EnumCode``-Spalten und ihr Bind
+ENUM_TABLES = {Ticket.__table__: None, ArchivedTicket.__table__: "archive"}
+
+# Tabellen mit AUTOINCREMENT und ihr Gegenstück im Archiv
+SEQUENCE_TABLES = {
+    Ticket.__table__: ArchivedTicket.__table__,
+    Comment.__table__: ArchivedComment.__table__,
+}
+
+# Ersatz für Altwerte, die in keiner Werteliste vorkommen
+ENUM_FALLBACKS = {"status": "offen", "priority": "mittel", "category": "sonstiges"}
+
+
+def _add_missing_columns(skip=()):
+    """Fügt neue Spalten per ``ALTER TABLE … ADD COLUMN`` hinzu.
+
+    Neue Pflichtspalten brauchen einen ``server_default``, damit bestehende
+    Zeilen einen Wert erhalten.
+    """
+    engine = db.engine
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+
+    with engine.begin() as conn:
+        for table in db.metadata.sorted_tables:
+            if table.name not in existing_tables or table in skip:
+                continue
+            existing = {col["name"] for col in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    ddl = CreateColumn(column).compile(dialect=engine.dialect)
+                    conn.exec_driver_sql(f"ALTER TABLE {table.name} ADD COLUMN {ddl}")
+
+
+def _recreate_derived_tables():
+    """Legt veraltete abgeleitete Tabellen neu an und berechnet sie neu.
+
+    Eine leere abgeleitete Tabelle wird ebenfalls berechnet, sobald ihre
+    Quellen Zeilen enthalten – ``db.create_all()`` legt sie sonst beim
+    Update einer bestehenden Datenbank ohne Inhalt an.
+    """
+    engine = db.engine
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+
+    for table, (rebuild, sources) in DERIVED_TABLES.items():
+        if table.name not in existing_tables:
+            continue
+        existing = {col["name"] for col in inspector.get_columns(table.name)}
+        if existing != set(table.columns.keys()):
+            table.drop(bind=engine)
+            table.create(bind=engine)
+        elif _has_rows(table.c.id) or not any(_has_rows(model.id) for model in sources):
+            continue
+        rebuild()
+
+
+def _has_rows(column):
+    return db.session.execute(db.select(column).limit(1)).first() is not None
+
+
+def _enum_case(name, type_):
+    """SQL-Ausdruck Text -> Code für eine Spalte der alten Tabelle."""
+    whens = " ".join(f"WHEN '{value}' THEN {code}" for code, value in enumerate(type_.values))
+    fallback = type_.values.index(ENUM_FALLBACKS[name])
+    return f"CASE lower(trim({name})) {whens} ELSE {fallback} END"
+
+
+def _rebuild_table(table, engine, columns, select):
+    """Legt ``table`` neu an und übernimmt die Zeilen der alten Tabelle.
+
+    SQLite kann Spaltentypen und Constraints nicht ändern: Die alte Tabelle
+    wird umbenannt, die neue samt Indizes angelegt und in einer Anweisung
+    gefüllt (``select`` je Spalte aus ``columns``) – alles in einer Transaktion.
+    """
+    old = f"_{table.name}_old"
+    indexes = inspect(engine).get_indexes(table.name)
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+        try:
+            # Verweise anderer Tabellen (Fremdschlüssel) nicht mit umbenennen
+            conn.exec_driver_sql("PRAGMA legacy_alter_table = ON")
+            conn.exec_driver_sql(f"ALTER TABLE {table.name} RENAME TO {old}")
+            for index in indexes:
+                conn.exec_driver_sql(f"DROP INDEX {index['name']}")
+            table.create(bind=conn)
+            conn.exec_driver_sql(
+                f"INSERT INTO {table.name} ({', '.join(columns)}) "
+                f"SELECT {', '.join(select)} FROM {old}"
+            )
+            conn.exec_driver_sql(f"DROP TABLE {old}")
+            conn.exec_driver_sql("COMMIT")
+        except Exception:
+            conn.exec_driver_sql("ROLLBACK")
+            raise
+        finally:
+            conn.exec_driver_sql("PRAGMA legacy_alter_table = OFF")
+
+
+def _convert_enum_columns(table, engine):
+    """Baut ``table`` neu auf, falls Enum-Spalten noch als Text gespeichert sind.
+
+    Die Werte werden beim Kopieren per ``CASE`` in ihre Codes umgerechnet.
+    """
+    inspector = inspect(engine)
+    if table.name not in inspector.get_table_names():
+        return False
+    existing = {col["name"]: col["type"] for col in inspector.get_columns(table.name)}
+    enum_columns = {
+        column.name: column.type for column in table.columns
+        if isinstance(column.type, EnumCode)
+    }
+    if not any(isinstance(existing.get(name), String) for name in enum_columns):
+        return False
+
+    columns = [column.name for column in table.columns if column.name in existing]
+    select = [
+        _enum_case(name, enum_columns[name])
+        if name in enum_columns and isinstance(existing[name], String) else name
+        for name in columns
+    ]
+    _rebuild_table(table, engine, columns, select)
+    return True
+
+
+def _add_autoincrement(table, engine):
+    """Baut ``table`` neu auf, falls ``AUTOINCREMENT`` noch fehlt.
+
+    Ohne ``AUTOINCREMENT`` vergibt SQLite nach dem Löschen der höchsten
+    Zeile deren ID erneut – archivierte IDs wären dann nicht mehr eindeutig.
+    """
+    with engine.connect() as conn:
+        sql = conn.exec_driver_sql(
+            "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table.name,)
+        ).scalar()
+    if sql is None or "AUTOINCREMENT" in sql.upper():
+        return False
+    existing = {col["name"] for col in inspect(engine).get_columns(table.name)}
+    columns = [column.name for column in table.columns if column.name in existing]
+    _rebuild_table(table, engine, columns, columns)
+    return True
+
+
+def _seed_sequences():
+    """Hebt ``sqlite_sequence`` auf die höchste aktive oder archivierte ID.
+
+    Das Archiv liegt in einer eigenen Datenbank; neue Tickets und Kommentare
+    erhalten so nie die ID eines archivierten Eintrags.
+    """
+    for table, archived in SEQUENCE_TABLES.items():
+        with db.engines["archive"].connect() as conn:
+            highest = conn.execute(db.select(func.max(archived.c.id))).scalar() or 0
+        with db.engine.begin() as conn:
+            highest = max(highest, conn.execute(db.select(func.max(table.c.id))).scalar() or 0)
+            current = conn.exec_driver_sql(
+                "SELECT seq FROM sqlite_sequence WHERE name = ?", (table.name,)
+            ).scalar()
+            if current is None and highest:
+                conn.exec_driver_sql(
+                    "INSERT INTO sqlite_sequence (name, seq) VALUES (?, ?)", (table.name, highest)
+                )
+            elif current is not None and current < highest:
+                conn.exec_driver_sql(
+                    "UPDATE sqlite_sequence SET seq = ? WHERE name = ?", (highest, table.name)
+                )
+
+
+def _create_missing_indexes():
+    """Legt alle im Modell deklarierten Indizes an, die noch fehlen."""
+    engine = db.engine
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+
+    for table in db.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing = {ix["name"] for ix in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(bind=engine, checkfirst=True)
+
+
+def upgrade_schema():
+    """Bringt eine bestehende Datenbank auf den aktuellen Stand."""
+    for table, bind_key in ENUM_TABLES.items():
+        _convert_enum_columns(table, db.engines[bind_key])
+    for table in SEQUENCE_TABLES:
+        _add_autoincrement(table, db.engine)
+    _seed_sequences()
+    _add_missing_columns(skip=DERIVED_TABLES)
+    _recreate_derived_tables()
+    _create_missing_indexes()
@@ -1,15 +1,63 @@
 """
 HelpDesk Pro - Datenbankmodelle
-Definiert Benutzer, Tickets und Kommentare mit SQLAlchemy ORM.
+Definiert Benutzer, Tickets, Kommentare, Anhänge, den Ticket-Verlauf,
+Report-Rollups und das Ticket-Archiv mit SQLAlchemy ORM.
+Status, Priorität und Kategorie der Tickets werden als kleine Integer-Codes
+gespeichert (``EnumCode``); im Code und in Templates bleiben es Texte.
 """
 
+import json
 from datetime import datetime
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
+from sqlalchemy.types import SmallInteger, TypeDecorator
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
 
 db = SQLAlchemy()
 
+# Mandant für Bestandsdaten und Installationen mit nur einer Gesellschaft
+DEFAULT_TENANT = "default"
+
+
+class EnumCode(TypeDecorator):
+    """Wert aus einer festen Liste, gespeichert als Listenposition.
+
+    Filter, Gruppierungen und Ergebniszeilen arbeiten weiter mit den Texten;
+    die Umsetzung erfolgt beim Binden bzw. Lesen. Unbekannte Texte werden zu
+    ``-1``: Filter finden nichts, und der ``CHECK`` der Spalte verhindert das
+    Speichern. Die Codes sind Positionen – neue Werte nur hinten anhängen.
+    """
+    impl = SmallInteger
+    cache_ok = True
+
+    def __init__(self, values):
+        super().__init__()
+        self.values = tuple(values)
+        self._codes = {value: code for code, value in enumerate(self.values)}
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return self._codes.get(value, -1)
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return self.values[value]
+
+    def check(self, column):
+        """``CHECK``-Ausdruck für gültige Codes der Spalte."""
+        return f"{column} BETWEEN 0 AND {len(self.values) - 1}"
+
+
+def enum_checks(prefix, columns):
+    """Benannte ``CHECK``-Constraints für ``{spalte: EnumCode}``."""
+    return tuple(
+        db.CheckConstraint(type_.check(name), name=f"ck_{prefix}_{name}")
+        for name, type_ in columns.items()
+    )
+
 
 class User(UserMixin, db.Model):
     """Benutzer mit Rollen: admin, techniker, mitarbeiter."""
@@ -22,6 +70,10 @@ class User(UserMixin, db.Model):
     full_name = db.Column(db.String(120), nullable=False)
     role = db.Column(db.String(20), nullable=False, default="mitarbeiter")
     department = db.Column(db.String(80), default="")
+    tenant = db.Column(
+        db.String(40), nullable=False, default=DEFAULT_TENANT,
+        server_default=DEFAULT_TENANT, index=True,
+    )
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     is_active = db.Column(db.Boolean, default=True)
 
@@ -52,28 +104,72 @@ class User(UserMixin, db.Model):
         return f"<User {self.username} ({self.role})>"
 
 
-class Ticket(db.Model):
-    """Support-Ticket mit Status, Priorität und Kategorie."""
-    __tablename__ = "tickets"
+class ApiToken(db.Model):
+    """API-Token eines Benutzers für Maschinen-Clients.
+
+    Gespeichert werden nur ein kurzes, indiziertes Präfix zum Nachschlagen
+    und der SHA-256-Hash des vollständigen Tokens.
+    """
+    __tablename__ = "api_tokens"
 
     id = db.Column(db.Integer, primary_key=True)
-    title = db.Column(db.String(200), nullable=False)
-    description = db.Column(db.Text, nullable=False)
-    status = db.Column(db.String(20), nullable=False, default="offen")
-    priority = db.Column(db.String(20), nullable=False, default="mittel")
-    category = db.Column(db.String(50), nullable=False, default="software")
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False, index=True)
+    name = db.Column(db.String(80), nullable=False, default="")
+    prefix = db.Column(db.String(16), unique=True, nullable=False)
+    token_hash = db.Column(db.String(64), nullable=False)
+    scope = db.Column(db.String(10), nullable=False, default="read")
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    revoked_at = db.Column(db.DateTime, nullable=True)
 
-    created_by_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
-    assigned_to_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=True)
+    user = db.relationship("User", backref=db.backref("api_tokens", lazy=True))
 
+    SCOPES = ["read", "write"]
+
+    @property
+    def is_revoked(self):
+        return self.revoked_at is not None
+
+    def __repr__(self):
+        return f"<ApiToken {self.prefix} ({self.scope}) for User #{self.user_id}>"
+
+
+class SavedView(db.Model):
+    """Gespeicherte Filterkombination der Ticket-Liste ("Meine Ansichten")."""
+    __tablename__ = "saved_views"
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False, index=True)
+    name = db.Column(db.String(80), nullable=False)
+    status = db.Column(db.String(20), nullable=True)
+    priority = db.Column(db.String(20), nullable=True)
+    category = db.Column(db.String(50), nullable=True)
+    search = db.Column(db.String(200), nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
-    closed_at = db.Column(db.DateTime, nullable=True)
 
-    # Beziehungen
-    comments = db.relationship(
-        "Comment", backref="ticket", lazy=True, order_by="Comment.created_at"
-    )
+    user = db.relationship("User", backref=db.backref("saved_views", lazy=True))
+
+    FILTER_FIELDS = ("status", "priority", "category", "search")
+
+    @property
+    def filters(self):
+        return {field: getattr(self, field) for field in self.FILTER_FIELDS}
+
+    @property
+    def query_args(self):
+        """Parameter für ``url_for('ticket_list', ...)`` (nur gesetzte Filter)."""
+        args = {field: value for field, value in self.filters.items() if value}
+        if "search" in args:
+            args["q"] = args.pop("search")
+        return args
+
+    def __repr__(self):
+        return f"<SavedView {self.name} for User #{self.user_id}>"
+
+
+class TicketMixin:
+    """Konstanten und Anzeige-Eigenschaften aktiver und archivierter Tickets."""
+
+    is_archived = False
 
     STATUSES = ["offen", "in_bearbeitung", "wartend", "geschlossen"]
     PRIORITIES = ["niedrig", "mittel", "hoch", "kritisch"]
@@ -118,6 +214,67 @@ class Ticket(db.Model):
         delta = datetime.utcnow() - self.created_at
         return round(delta.total_seconds() / 3600, 1)
 
+
+# Spaltentypen für Status, Priorität und Kategorie (aktiv und archiviert)
+TICKET_ENUMS = {
+    "status": EnumCode(TicketMixin.STATUSES),
+    "priority": EnumCode(TicketMixin.PRIORITIES),
+    "category": EnumCode(TicketMixin.CATEGORIES),
+}
+
+
+class Ticket(TicketMixin, db.Model):
+    """Support-Ticket mit Status, Priorität und Kategorie.
+
+    Die zusammengesetzten Indizes beginnen mit ``tenant``: Jede Abfrage ist
+    auf einen Mandanten beschränkt und liest nur dessen Indexbereich.
+    """
+    __tablename__ = "tickets"
+    __table_args__ = (
+        db.Index("ix_tickets_tenant_status", "tenant", "status"),
+        db.Index("ix_tickets_tenant_created_at", "tenant", "created_at"),
+        db.Index("ix_tickets_tenant_updated_at", "tenant", "updated_at"),
+        db.Index("ix_tickets_tenant_assigned", "tenant", "assigned_to_id"),
+        *enum_checks("tickets", TICKET_ENUMS),
+        # IDs archivierter Tickets nie erneut vergeben
+        {"sqlite_autoincrement": True},
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    tenant = db.Column(
+        db.String(40), nullable=False, default=DEFAULT_TENANT, server_default=DEFAULT_TENANT
+    )
+    title = db.Column(db.String(200), nullable=False)
+    description = db.Column(db.Text, nullable=False)
+    status = db.Column(TICKET_ENUMS["status"], nullable=False, default="offen")
+    priority = db.Column(TICKET_ENUMS["priority"], nullable=False, default="mittel")
+    category = db.Column(TICKET_ENUMS["category"], nullable=False, default="software")
+
+    created_by_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
+    assigned_to_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=True)
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    updated_at = db.Column(
+        db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True
+    )
+    closed_at = db.Column(db.DateTime, nullable=True, index=True)
+
+    # Beziehungen
+    comments = db.relationship(
+        "Comment", backref="ticket", lazy=True, order_by="Comment.created_at"
+    )
+    attachments = db.relationship(
+        "Attachment", backref="ticket", lazy=True, order_by="Attachment.created_at"
+    )
+
+    def set_status(self, status):
+        """Status setzen und ``closed_at`` passend pflegen."""
+        self.status = status
+        if status == "geschlossen" and not self.closed_at:
+            self.closed_at = datetime.utcnow()
+        elif status != "geschlossen":
+            self.closed_at = None
+
     def __repr__(self):
         return f"<Ticket #{self.id}: {self.title}>"
 
@@ -125,6 +282,7 @@ class Ticket(db.Model):
 class Comment(db.Model):
     """Kommentar zu einem Ticket."""
     __tablename__ = "comments"
+    __table_args__ = {"sqlite_autoincrement": True}
 
     id = db.Column(db.Integer, primary_key=True)
     content = db.Column(db.Text, nullable=False)
@@ -135,5 +293,294 @@ class Comment(db.Model):
 
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    attachments = db.relationship("Attachment", backref="comment", lazy=True)
+
     def __repr__(self):
         return f"<Comment #{self.id} on Ticket #{self.ticket_id}>"
+
+
+class Attachment(db.Model):
+    """Dateianhang zu einem Ticket oder Kommentar.
+
+    Der Inhalt liegt inhaltsadressiert unter ``sha256`` in der Ablage;
+    identische Dateien werden nur einmal gespeichert.
+    """
+    __tablename__ = "attachments"
+
+    id = db.Column(db.Integer, primary_key=True)
+    ticket_id = db.Column(db.Integer, db.ForeignKey("tickets.id"), nullable=False, index=True)
+    comment_id = db.Column(db.Integer, db.ForeignKey("comments.id"), nullable=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
+
+    filename = db.Column(db.String(255), nullable=False)
+    content_type = db.Column(db.String(120), nullable=False)
+    size = db.Column(db.Integer, nullable=False)
+    sha256 = db.Column(db.String(64), nullable=False, index=True)
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    uploader = db.relationship("User")
+
+    @property
+    def size_label(self):
+        size = float(self.size)
+        for unit in ("B", "KB", "MB"):
+            if size < 1024:
+                return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+            size /= 1024
+        return f"{size:.1f} GB"
+
+    def __repr__(self):
+        return f"<Attachment #{self.id} {self.filename} on Ticket #{self.ticket_id}>"
+
+
+class TicketEvent(db.Model):
+    """Eintrag im Ticket-Verlauf (append-only).
+
+    Feldänderungen werden kompakt als JSON mit Kurzschlüsseln gespeichert,
+    z.B. ``{"s":["offen","wartend"]}`` für einen Statuswechsel.
+    """
+    __tablename__ = "ticket_events"
+    __table_args__ = (
+        db.Index("ix_ticket_events_ticket_time", "ticket_id", "created_at"),
+        db.Index("ix_ticket_events_created_at", "created_at"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    ticket_id = db.Column(db.Integer, db.ForeignKey("tickets.id"), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=True)
+    kind = db.Column(db.String(20), nullable=False)
+    changes = db.Column(db.Text, nullable=False, default="{}")
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    actor = db.relationship("User", lazy="joined")
+
+    KINDS = ["erstellt", "geaendert", "kommentar", "geloescht"]
+
+    # Feldname -> Kurzschlüssel im gespeicherten JSON
+    FIELD_KEYS = {
+        "status": "s",
+        "priority": "p",
+        "assigned_to_id": "a",
+        "comment_id": "c",
+        "is_internal": "i",
+    }
+    KEY_FIELDS = {v: k for k, v in FIELD_KEYS.items()}
+
+    @classmethod
+    def encode_changes(cls, changes):
+        """Wandelt ``{"status": (alt, neu)}`` in kompaktes JSON um."""
+        compact = {}
+        for field, value in changes.items():
+            if isinstance(value, tuple):
+                value = list(value)
+            compact[cls.FIELD_KEYS[field]] = value
+        return json.dumps(compact, separators=(",", ":"))
+
+    @property
+    def change_dict(self):
+        """Dekodierte Änderungen mit vollen Feldnamen."""
+        raw = json.loads(self.changes or "{}")
+        return {self.KEY_FIELDS.get(k, k): v for k, v in raw.items()}
+
+    @property
+    def is_internal(self):
+        return bool(self.change_dict.get("is_internal"))
+
+    def describe(self, user_names=None):
+        """Lesbare Beschreibung der Änderungen für die Zeitleiste."""
+        user_names = user_names or {}
+        changes = self.change_dict
+
+        if self.kind == "kommentar":
+            if changes.get("is_internal"):
+                return ["Interner Kommentar hinzugefügt"]
+            return ["Kommentar hinzugefügt"]
+
+        if self.kind == "geloescht":
+            return ["Ticket gelöscht"]
+
+        lines = []
+        if self.kind == "erstellt":
+            lines.append("Ticket erstellt")
+
+        if "status" in changes:
+            old, new = changes["status"]
+            if old is None:
+                lines.append(f"Status: {Ticket.STATUS_LABELS.get(new, new)}")
+            else:
+                lines.append(
+                    f"Status: {Ticket.STATUS_LABELS.get(old, old)} → "
+                    f"{Ticket.STATUS_LABELS.get(new, new)}"
+                )
+        if "priority" in changes:
+            old, new = changes["priority"]
+            if old is None:
+                lines.append(f"Priorität: {Ticket.PRIORITY_LABELS.get(new, new)}")
+            else:
+                lines.append(
+                    f"Priorität: {Ticket.PRIORITY_LABELS.get(old, old)} → "
+                    f"{Ticket.PRIORITY_LABELS.get(new, new)}"
+                )
+        if "assigned_to_id" in changes:
+            old, new = changes["assigned_to_id"]
+            old_name = user_names.get(old, f"#{old}") if old else "Nicht zugewiesen"
+            new_name = user_names.get(new, f"#{new}") if new else "Nicht zugewiesen"
+            lines.append(f"Zuweisung: {old_name} → {new_name}")
+        return lines
+
+    def __repr__(self):
+        return f"<TicketEvent #{self.id} {self.kind} on Ticket #{self.ticket_id}>"
+
+
+@event.listens_for(TicketEvent, "before_update")
+@event.listens_for(TicketEvent, "before_delete")
+def _ticket_event_is_append_only(mapper, connection, target):
+    raise ValueError("Ticket-Verlauf ist unveränderlich (append-only).")
+
+
+class ReportBucket(db.Model):
+    """Tägliche Kennzahlen je Mandant, Kategorie, Priorität und Bearbeiter (Rollup).
+
+    ``assignee_id`` ist 0 für nicht zugewiesene Tickets, damit der
+    Unique-Index auch ohne Bearbeiter greift. ``sketch`` enthält das
+    Histogramm der Lösungszeiten (siehe ``app.reports.QuantileSketch``).
+    """
+    __tablename__ = "report_buckets"
+    __table_args__ = (
+        db.UniqueConstraint(
+            "tenant", "day", "category", "priority", "assignee_id",
+            name="uq_report_buckets_key",
+        ),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    tenant = db.Column(db.String(40), nullable=False, default=DEFAULT_TENANT)
+    day = db.Column(db.Date, nullable=False, index=True)
+    category = db.Column(db.String(50), nullable=False)
+    priority = db.Column(db.String(20), nullable=False)
+    assignee_id = db.Column(db.Integer, nullable=False, default=0)
+
+    opened = db.Column(db.Integer, nullable=False, default=0)
+    closed = db.Column(db.Integer, nullable=False, default=0)
+    close_seconds = db.Column(db.Float, nullable=False, default=0.0)
+    sketch = db.Column(db.Text, nullable=False, default="{}")
+
+    def __repr__(self):
+        return (f"<ReportBucket {self.tenant} {self.day} "
+                f"{self.category}/{self.priority}/{self.assignee_id}>")
+
+
+class ProcessedMail(db.Model):
+    """Bereits übernommene E-Mail (``Message-ID`` bzw. Hash der Nachricht).
+
+    Eine mbox bleibt beim Einlesen unverändert; über diese Tabelle wird
+    jede Nachricht nur einmal verarbeitet.
+    """
+    __tablename__ = "processed_mails"
+
+    id = db.Column(db.Integer, primary_key=True)
+    message_id = db.Column(db.String(255), nullable=False, unique=True)
+    processed_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<ProcessedMail {self.message_id}>"
+
+
+# ── Archiv (eigene Datenbank, Bind "archive") ────
+
+class ArchivedTicket(TicketMixin, db.Model):
+    """Archiviertes (geschlossenes) Ticket – gleiche Spalten wie ``Ticket``.
+
+    Benutzer und Anhänge liegen in der Hauptdatenbank; die Beziehungen
+    dorthin sind daher ohne Fremdschlüssel und nur lesend.
+    """
+    __bind_key__ = "archive"
+    __tablename__ = "archived_tickets"
+    __table_args__ = (
+        db.Index("ix_archived_tickets_tenant_created_at", "tenant", "created_at"),
+        db.Index("ix_archived_tickets_created_by", "created_by_id"),
+        *enum_checks("archived_tickets", TICKET_ENUMS),
+    )
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    tenant = db.Column(db.String(40), nullable=False, default=DEFAULT_TENANT)
+    title = db.Column(db.String(200), nullable=False)
+    description = db.Column(db.Text, nullable=False)
+    status = db.Column(TICKET_ENUMS["status"], nullable=False)
+    priority = db.Column(TICKET_ENUMS["priority"], nullable=False)
+    category = db.Column(TICKET_ENUMS["category"], nullable=False)
+    created_by_id = db.Column(db.Integer, nullable=False)
+    assigned_to_id = db.Column(db.Integer, nullable=True)
+    created_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime)
+    closed_at = db.Column(db.DateTime)
+
+    is_archived = True
+
+    creator = db.relationship(
+        "User", primaryjoin="foreign(ArchivedTicket.created_by_id) == User.id", viewonly=True
+    )
+    assignee = db.relationship(
+        "User", primaryjoin="foreign(ArchivedTicket.assigned_to_id) == User.id", viewonly=True
+    )
+    comments = db.relationship(
+        "ArchivedComment", lazy=True, order_by="ArchivedComment.created_at", viewonly=True
+    )
+    attachments = db.relationship(
+        "Attachment", primaryjoin="foreign(Attachment.ticket_id) == ArchivedTicket.id",
+        order_by="Attachment.created_at", viewonly=True,
+    )
+
+    def __repr__(self):
+        return f"<ArchivedTicket #{self.id}: {self.title}>"
+
+
+class ArchivedComment(db.Model):
+    """Kommentar eines archivierten Tickets."""
+    __bind_key__ = "archive"
+    __tablename__ = "archived_comments"
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    content = db.Column(db.Text, nullable=False)
+    is_internal = db.Column(db.Boolean, default=False)
+    ticket_id = db.Column(
+        db.Integer, db.ForeignKey("archived_tickets.id"), nullable=False, index=True
+    )
+    user_id = db.Column(db.Integer, nullable=False)
+    created_at = db.Column(db.DateTime)
+
+    author = db.relationship(
+        "User", primaryjoin="foreign(ArchivedComment.user_id) == User.id", viewonly=True
+    )
+    attachments = db.relationship(
+        "Attachment", primaryjoin="foreign(Attachment.comment_id) == ArchivedComment.id",
+        viewonly=True,
+    )
+
+    def __repr__(self):
+        return f"<ArchivedComment #{self.id} on Ticket #{self.ticket_id}>"
+
+
+class ArchiveCount(db.Model):
+    """Anzahl archivierter Tickets je Mandant, Ersteller und Kategorie.
+
+    Archivierte Tickets sind immer geschlossen; die Summen ergänzen die
+    Dashboard-Zahlen, ohne das Archiv zu durchsuchen.
+    """
+    __bind_key__ = "archive"
+    __tablename__ = "archive_counts"
+    __table_args__ = (
+        db.UniqueConstraint(
+            "tenant", "created_by_id", "category", name="uq_archive_counts_key"
+        ),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    tenant = db.Column(db.String(40), nullable=False)
+    created_by_id = db.Column(db.Integer, nullable=False)
+    category = db.Column(db.String(50), nullable=False)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<ArchiveCount {self.tenant}/{self.created_by_id}/{self.category}: {self.count}>"
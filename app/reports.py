@@ -0,0 +1,336 @@
+"""
+HelpDesk Pro - Reporting
+Tägliche Rollups (eröffnet/geschlossen/Lösungszeit) je Mandant, Kategorie,
+Priorität und Bearbeiter. Die Rollups werden beim Schreiben eines Tickets fortgeschrieben
+und können für einen Zeitraum aus der Ticket-Tabelle neu aufgebaut werden.
+Die Report-Abfragen lesen ausschließlich die Rollups.
+"""
+
+import json
+import math
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import func
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from app.models import db, Ticket, ArchivedTicket, ReportBucket
+
+# Relativer Fehler der Quantil-Schätzung (1 %)
+SKETCH_ALPHA = 0.01
+
+
+class QuantileSketch:
+    """Streaming-Quantilschätzer mit logarithmischen Klassen.
+
+    Jeder Wert landet in der Klasse ``ceil(log_gamma(x))``; gespeichert wird
+    nur die Anzahl je Klasse. Sketche lassen sich durch Addition der Zähler
+    zusammenführen (Tage → Zeitraum) und Werte können wieder entfernt werden
+    (wiedereröffnete Tickets). Quantile haben höchstens ``SKETCH_ALPHA``
+    relativen Fehler, unabhängig von der Anzahl der Werte.
+    """
+
+    def __init__(self, bins=None, alpha=SKETCH_ALPHA):
+        self.gamma = (1 + alpha) / (1 - alpha)
+        self._log_gamma = math.log(self.gamma)
+        self.bins = defaultdict(int)
+        for key, count in (bins or {}).items():
+            self.bins[int(key)] += count
+
+    @classmethod
+    def from_json(cls, raw):
+        return cls(json.loads(raw or "{}"))
+
+    def to_json(self):
+        return json.dumps(
+            {str(k): c for k, c in sorted(self.bins.items()) if c},
+            separators=(",", ":"),
+        )
+
+    def _key(self, value):
+        return math.ceil(math.log(max(value, 1.0)) / self._log_gamma)
+
+    def add(self, value, count=1):
+        key = self._key(value)
+        self.bins[key] += count
+        if self.bins[key] <= 0:
+            del self.bins[key]
+
+    def merge(self, other):
+        for key, count in other.bins.items():
+            self.bins[key] += count
+        return self
+
+    @property
+    def count(self):
+        return sum(self.bins.values())
+
+    def quantile(self, q):
+        """Schätzwert für das Quantil ``q`` (0..1) oder ``None``."""
+        total = self.count
+        if total <= 0:
+            return None
+        rank = q * (total - 1)
+        seen = 0
+        for key in sorted(self.bins):
+            seen += self.bins[key]
+            if seen > rank:
+                return 2 * self.gamma ** key / (self.gamma + 1)
+        return None
+
+
+# ── Fortschreiben beim Schreiben ─────────────────
+
+def _bump(tenant, day, category, priority, assignee_id, opened=0, closed=0, seconds=None):
+    """Erhöht die Zähler eines Buckets (Upsert) und pflegt den Sketch."""
+    key = {
+        "tenant": tenant,
+        "day": day,
+        "category": category,
+        "priority": priority,
+        "assignee_id": assignee_id or 0,
+    }
+    close_seconds = seconds * closed if seconds is not None else 0.0
+    stmt = sqlite_insert(ReportBucket).values(
+        **key, opened=opened, closed=closed,
+        close_seconds=close_seconds, sketch="{}",
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=list(key),
+        set_={
+            "opened": ReportBucket.opened + opened,
+            "closed": ReportBucket.closed + closed,
+            "close_seconds": ReportBucket.close_seconds + close_seconds,
+        },
+    )
+    db.session.execute(stmt)
+
+    if seconds is not None and closed:
+        # Der Upsert hält bereits die Schreibsperre – Lesen und
+        # Zurückschreiben des Sketches ist damit serialisiert.
+        bucket = (
+            ReportBucket.query.filter_by(**key)
+            .populate_existing()
+            .one()
+        )
+        sketch = QuantileSketch.from_json(bucket.sketch)
+        sketch.add(seconds, closed)
+        bucket.sketch = sketch.to_json()
+
+
+def _resolution_seconds(ticket, closed_at):
+    return max((closed_at - ticket.created_at).total_seconds(), 0.0)
+
+
+def record_creation(ticket):
+    """Rollup für ein neu angelegtes Ticket fortschreiben."""
+    _bump(ticket.tenant, ticket.created_at.date(), ticket.category, ticket.priority,
+          ticket.assigned_to_id, opened=1)
+    if ticket.status == "geschlossen" and ticket.closed_at:
+        _bump(ticket.tenant, ticket.closed_at.date(), ticket.category, ticket.priority,
+              ticket.assigned_to_id, closed=1,
+              seconds=_resolution_seconds(ticket, ticket.closed_at))
+
+
+def record_update(ticket, before, previous_closed_at=None):
+    """Rollup nach einer Ticket-Änderung fortschreiben.
+
+    ``before`` ist der Stand vor der Änderung (``history.snapshot``).
+    Wie ``rebuild()`` zählen Eröffnung und Abschluss unter der aktuellen
+    Priorität und dem aktuellen Bearbeiter: Ändern sich diese, wandern die
+    Einträge vom alten in den neuen Bucket. Beim Wiedereröffnen wird der
+    frühere Abschluss wieder abgezogen.
+    """
+    was_closed = before["status"] == "geschlossen"
+    is_closed = ticket.status == "geschlossen"
+    old = (ticket.category, before["priority"], before["assigned_to_id"])
+    new = (ticket.category, ticket.priority, ticket.assigned_to_id)
+    moved = (old[1], old[2] or 0) != (new[1], new[2] or 0)
+    created_day = ticket.created_at.date()
+
+    if moved:
+        _bump(ticket.tenant, created_day, *old, opened=-1)
+        _bump(ticket.tenant, created_day, *new, opened=1)
+
+    if was_closed and previous_closed_at and (moved or not is_closed):
+        # Früheren Abschluss aus dem alten Bucket entfernen
+        _bump(ticket.tenant, previous_closed_at.date(), *old, closed=-1,
+              seconds=_resolution_seconds(ticket, previous_closed_at))
+    if is_closed and ticket.closed_at and (moved or not was_closed):
+        _bump(ticket.tenant, ticket.closed_at.date(), *new, closed=1,
+              seconds=_resolution_seconds(ticket, ticket.closed_at))
+
+
+def record_deletion(ticket):
+    """Zieht ein gelöschtes Ticket wieder aus seinen Buckets ab."""
+    key = (ticket.category, ticket.priority, ticket.assigned_to_id)
+    _bump(ticket.tenant, ticket.created_at.date(), *key, opened=-1)
+    if ticket.status == "geschlossen" and ticket.closed_at:
+        _bump(ticket.tenant, ticket.closed_at.date(), *key, closed=-1,
+              seconds=_resolution_seconds(ticket, ticket.closed_at))
+
+
+# ── Neuaufbau (nächtlicher Job) ──────────────────
+
+def rebuild(start=None, end=None):
+    """Baut die Rollups für ``start``..``end`` (inklusive) neu auf.
+
+    Ohne Angaben wird der gesamte Bestand neu berechnet. Gelesen werden nur
+    Tickets, deren ``created_at`` oder ``closed_at`` im Zeitraum liegt.
+    """
+    lo = datetime.combine(start, datetime.min.time()) if start else None
+    hi = datetime.combine(end + timedelta(days=1), datetime.min.time()) if end else None
+
+    def in_range(column):
+        conditions = []
+        if lo is not None:
+            conditions.append(column >= lo)
+        if hi is not None:
+            conditions.append(column < hi)
+        return conditions
+
+    buckets = defaultdict(lambda: {
+        "opened": 0, "closed": 0, "close_seconds": 0.0, "sketch": QuantileSketch(),
+    })
+
+    # Archivierte Tickets zählen weiter in ihren Tagen
+    for model in (Ticket, ArchivedTicket):
+        columns = (model.tenant, model.category, model.priority, model.assigned_to_id)
+        for tenant, category, priority, assignee, created_at in db.session.execute(
+            db.select(*columns, model.created_at)
+            .where(model.created_at.isnot(None), *in_range(model.created_at))
+        ):
+            buckets[(tenant, created_at.date(), category, priority, assignee or 0)]["opened"] += 1
+
+        for tenant, category, priority, assignee, created_at, closed_at in db.session.execute(
+            db.select(*columns, model.created_at, model.closed_at)
+            .where(model.status == "geschlossen", model.closed_at.isnot(None),
+                   model.created_at.isnot(None), *in_range(model.closed_at))
+        ):
+            bucket = buckets[(tenant, closed_at.date(), category, priority, assignee or 0)]
+            seconds = max((closed_at - created_at).total_seconds(), 0.0)
+            bucket["closed"] += 1
+            bucket["close_seconds"] += seconds
+            bucket["sketch"].add(seconds)
+
+    delete = db.delete(ReportBucket)
+    if start:
+        delete = delete.where(ReportBucket.day >= start)
+    if end:
+        delete = delete.where(ReportBucket.day <= end)
+    db.session.execute(delete)
+
+    db.session.add_all(
+        ReportBucket(
+            tenant=tenant, day=day, category=category, priority=priority, assignee_id=assignee,
+            opened=values["opened"], closed=values["closed"],
+            close_seconds=values["close_seconds"],
+            sketch=values["sketch"].to_json(),
+        )
+        for (tenant, day, category, priority, assignee), values in buckets.items()
+    )
+    db.session.commit()
+    return len(buckets)
+
+
+# ── Abfragen (nur Rollups) ───────────────────────
+
+def _filtered(query, filters):
+    for field in ("tenant", "category", "priority", "assignee_id"):
+        value = filters.get(field)
+        if value is not None:
+            query = query.where(getattr(ReportBucket, field) == value)
+    return query
+
+
+def _days(start, end):
+    day = start
+    while day <= end:
+        yield day
+        day += timedelta(days=1)
+
+
+def volume(start, end, **filters):
+    """Eröffnete und geschlossene Tickets je Tag."""
+    rows = db.session.execute(_filtered(
+        db.select(ReportBucket.day,
+                  func.sum(ReportBucket.opened), func.sum(ReportBucket.closed))
+        .where(ReportBucket.day >= start, ReportBucket.day <= end)
+        .group_by(ReportBucket.day),
+        filters,
+    ))
+    per_day = {day: (opened, closed) for day, opened, closed in rows}
+    return [
+        {
+            "day": day.isoformat(),
+            "opened": per_day.get(day, (0, 0))[0],
+            "closed": per_day.get(day, (0, 0))[1],
+        }
+        for day in _days(start, end)
+    ]
+
+
+def backlog(start, end, **filters):
+    """Offener Bestand am Ende jedes Tages."""
+    before = db.session.execute(_filtered(
+        db.select(func.coalesce(func.sum(ReportBucket.opened - ReportBucket.closed), 0))
+        .where(ReportBucket.day < start),
+        filters,
+    )).scalar()
+
+    running = before
+    result = []
+    for entry in volume(start, end, **filters):
+        running += entry["opened"] - entry["closed"]
+        result.append({"day": entry["day"], "backlog": running})
+    return result
+
+
+def resolution(start, end, group_by="category", quantiles=(0.5, 0.9, 0.95), **filters):
+    """Mittlere Lösungszeit und Quantile (in Stunden) je Gruppe."""
+    group_column = getattr(ReportBucket, group_by)
+    rows = db.session.execute(_filtered(
+        db.select(group_column, ReportBucket.closed,
+                  ReportBucket.close_seconds, ReportBucket.sketch)
+        .where(ReportBucket.day >= start, ReportBucket.day <= end,
+               ReportBucket.closed != 0),
+        filters,
+    ))
+
+    groups = defaultdict(lambda: {"closed": 0, "seconds": 0.0, "sketch": QuantileSketch()})
+    for key, closed, seconds, sketch in rows:
+        group = groups[key]
+        group["closed"] += closed
+        group["seconds"] += seconds
+        group["sketch"].merge(QuantileSketch.from_json(sketch))
+
+    result = {}
+    for key, group in groups.items():
+        if group["closed"] <= 0:
+            continue
+        entry = {
+            "closed": group["closed"],
+            "mean_hours": round(group["seconds"] / group["closed"] / 3600, 2),
+        }
+        for q in quantiles:
+            value = group["sketch"].quantile(q)
+            entry[f"p{int(q * 100)}_hours"] = round(value / 3600, 2) if value else None
+        result[key] = entry
+    return result
+
+
+def parse_range(args, default_days=30, max_days=3 * 366):
+    """Liest ``start``/``end`` (YYYY-MM-DD) aus den Query-Parametern.
+
+    Wirft ``ValueError`` bei ungültigen Angaben.
+    """
+    end = date.fromisoformat(args["end"]) if args.get("end") else datetime.utcnow().date()
+    if args.get("start"):
+        start = date.fromisoformat(args["start"])
+    else:
+        start = end - timedelta(days=default_days - 1)
+    if start > end:
+        raise ValueError("start liegt nach end")
+    if (end - start).days >= max_days:
+        raise ValueError(f"Zeitraum größer als {max_days} Tage")
+    return start, end
@@ -0,0 +1,157 @@
+"""
+HelpDesk Pro - Gespeicherte Ansichten
+Filter der Ticket-Liste und "Meine Ansichten" in der Sidebar. Die Anzahlen
+aller Ansichten eines Benutzers werden in einer einzigen Abfrage gezählt
+(ein ``COUNT(CASE …)`` je Ansicht, dazu eine für das Archiv) und pro Prozess
+zwischengespeichert, bis sich Tickets, das Archiv oder die Ansichten des
+Benutzers ändern.
+"""
+
+import threading
+from collections import namedtuple
+
+from sqlalchemy import and_, case, func
+
+from app.models import db, ArchiveCount, ArchivedTicket, SavedView, Ticket, TicketEvent
+from app.tenancy import ticket_scope
+from app import archive
+
+# Eintrag für die Sidebar – bewusst ohne ORM-Objekt, damit er Sessions überlebt
+ViewEntry = namedtuple("ViewEntry", "id name args count")
+
+_Cached = namedtuple("_Cached", "version entries")
+
+
+def normalize_filters(args):
+    """Request-Parameter -> Filter-dict; ``"alle"`` und Leerwerte werden ``None``."""
+    filters = {}
+    for field in ("status", "priority", "category"):
+        value = (args.get(field) or "").strip()
+        filters[field] = value if value and value != "alle" else None
+    filters["search"] = (args.get("q") or "").strip() or None
+    return filters
+
+
+def conditions(status=None, priority=None, category=None, search=None, model=Ticket):
+    """Filter als Liste von SQL-Bedingungen (ohne Sichtbarkeits-Einschränkung).
+
+    ``model`` ist ``Ticket`` oder ``ArchivedTicket``.
+    """
+    result = []
+    if status:
+        result.append(model.status == status)
+    if priority:
+        result.append(model.priority == priority)
+    if category:
+        result.append(model.category == category)
+    if search:
+        pattern = f"%{search}%"
+        result.append(model.title.ilike(pattern) | model.description.ilike(pattern))
+    return result
+
+
+def reads_archive(filters):
+    """Ob die Ticket-Liste für diese Filter auch das Archiv durchsucht.
+
+    Nur Suchen reichen ins Archiv (dort ist jedes Ticket geschlossen).
+    """
+    return bool(filters["search"]) and filters["status"] in (None, "geschlossen")
+
+
+def _count_columns(views, model):
+    columns = []
+    for view in views:
+        conds = conditions(**view.filters, model=model)
+        if conds:
+            columns.append(func.count(case((and_(*conds), 1))))
+        else:
+            columns.append(func.count(model.id))
+    return columns
+
+
+def count_views(user, views):
+    """Trefferzahl je Ansicht – eine Abfrage für beliebig viele Ansichten.
+
+    Gezählt wird wie in der Ticket-Liste: Suchen schließen archivierte
+    Tickets ein (höchstens ``archive.SEARCH_LIMIT``).
+    """
+    if not views:
+        return {}
+    stmt = db.select(*_count_columns(views, Ticket)).select_from(Ticket).where(
+        *ticket_scope(user)
+    )
+    counts = dict(zip((view.id for view in views), db.session.execute(stmt).one()))
+
+    archived_views = [view for view in views if reads_archive(view.filters)]
+    if archived_views:
+        stmt = db.select(*_count_columns(archived_views, ArchivedTicket)).select_from(
+            ArchivedTicket
+        ).where(*ticket_scope(user, ArchivedTicket))
+        for view, count in zip(archived_views, db.session.execute(stmt).one()):
+            counts[view.id] += min(count, archive.SEARCH_LIMIT)
+    return counts
+
+
+def data_version(user):
+    """Ändert sich bei jeder Ticket-Änderung und jeder Änderung der Ansichten.
+
+    Jeder Schreibpfad für Tickets erzeugt einen Verlaufseintrag oder setzt
+    ``updated_at``; beide Maxima kommen aus einem Index (``updated_at`` aus
+    dem Bereich des eigenen Mandanten). Ein Archivlauf ändert keinen der
+    beiden Werte – dafür zählt die Anzahl archivierter Tickets des Mandanten
+    (eigene Datenbank, daher eine zweite Abfrage).
+    """
+    own_views = db.select(func.count(SavedView.id), func.max(SavedView.id)).where(
+        SavedView.user_id == user.id
+    ).subquery()
+    stmt = db.select(
+        db.select(func.max(TicketEvent.id)).scalar_subquery(),
+        db.select(func.max(Ticket.updated_at))
+        .where(Ticket.tenant == user.tenant).scalar_subquery(),
+        own_views.c[0],
+        own_views.c[1],
+    )
+    archived = db.session.execute(
+        db.select(func.coalesce(func.sum(ArchiveCount.count), 0))
+        .where(ArchiveCount.tenant == user.tenant)
+    ).scalar()
+    return (*db.session.execute(stmt).one(), archived)
+
+
+class ViewCountCache:
+    """Prozesslokaler Cache Benutzer -> (Datenversion, Sidebar-Einträge)."""
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def entries(self, user):
+        version = data_version(user)
+        cached = self._entries.get(user.id)
+        if cached is not None and cached.version == version:
+            return cached.entries
+
+        views = (
+            SavedView.query.filter_by(user_id=user.id)
+            .order_by(SavedView.name, SavedView.id)
+            .all()
+        )
+        counts = count_views(user, views)
+        entries = [
+            ViewEntry(view.id, view.name, view.query_args, counts[view.id])
+            for view in views
+        ]
+        with self._lock:
+            self._entries[user.id] = _Cached(version, entries)
+        return entries
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+
+def get_cache(app):
+    cache = app.extensions.get("saved_views")
+    if cache is None:
+        cache = app.extensions["saved_views"] = ViewCountCache()
+    return cache
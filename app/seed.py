@@ -6,6 +6,8 @@ Erstellt Beispiel-Benutzer und Tickets für die erste Nutzung.
 from datetime import datetime, timedelta
 import random
 from app.models import db, User, Ticket, Comment
+from app import history, reports
+from app.tenancy import default_tenant
 
 
 def seed_database():
@@ -69,6 +71,9 @@ def seed_database():
     user3.set_password("user123")
 
     users = [admin, tech1, tech2, user1, user2, user3]
+    tenant = default_tenant()
+    for user in users:
+        user.tenant = tenant
     db.session.add_all(users)
     db.session.flush()
 
@@ -161,12 +166,15 @@ def seed_database():
 
     tickets = []
     for td in tickets_data:
-        ticket = Ticket(**td)
+        ticket = Ticket(tenant=tenant, **td)
         tickets.append(ticket)
         db.session.add(ticket)
 
     db.session.flush()
 
+    for ticket in tickets:
+        history.record_creation(ticket)
+
     # ── Kommentare erstellen ────────────────────────
     comments_data = [
         {
@@ -211,6 +219,9 @@ def seed_database():
     for cd in comments_data:
         comment = Comment(**cd)
         db.session.add(comment)
+        db.session.flush()
+        history.record_comment(comment.ticket, comment, user=comment.author)
 
     db.session.commit()
+    reports.rebuild()
     print("Demodaten erfolgreich erstellt!")
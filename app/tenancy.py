@@ -0,0 +1,152 @@
+"""
+HelpDesk Pro - Mandanten
+Jeder Benutzer und jedes Ticket gehört genau einem Mandanten (z.B. einer
+Tochtergesellschaft). Ticket-Abfragen werden über ``ticket_scope`` auf den
+Mandanten des Benutzers beschränkt; die Indizes der Ticket-Tabelle beginnen
+mit ``tenant``, sodass nur der Indexbereich dieses Mandanten gelesen wird.
+Optional bedient eine Instanz genau einen Mandanten aus einer eigenen
+SQLite-Datei (``HELPDESK_TENANT``), die ``export_tenant`` erzeugt.
+"""
+
+import os
+
+from flask import abort, current_app
+from sqlalchemy import create_engine, or_
+
+from app.models import (
+    db, DEFAULT_TENANT, User, ApiToken, SavedView, Ticket, Comment,
+    Attachment, TicketEvent, ReportBucket, ArchivedTicket, ArchivedComment, ArchiveCount,
+)
+
+# IDs je ``IN``-Liste: SQLite begrenzt die Zahl gebundener Parameter
+ID_BATCH_SIZE = 500
+
+
+def default_tenant():
+    """Mandant der Instanz: der fest eingestellte oder ``default``."""
+    return current_app.config.get("TENANT") or DEFAULT_TENANT
+
+
+def tenant_database_path(instance_path, tenant):
+    """Ablageort der SQLite-Datei eines Mandanten."""
+    return os.path.join(instance_path, "tenants", f"{tenant}.db")
+
+
+def ticket_scope(user, model=Ticket):
+    """Bedingungen für alle Tickets, die ``user`` sehen darf.
+
+    Mitarbeiter sehen zusätzlich nur eigene Tickets. ``model`` ist ``Ticket``
+    oder ``ArchivedTicket``.
+    """
+    conditions = [model.tenant == user.tenant]
+    if not user.is_techniker:
+        conditions.append(model.created_by_id == user.id)
+    return conditions
+
+
+def visible_tickets(user):
+    return Ticket.query.filter(*ticket_scope(user))
+
+
+def get_ticket_or_404(ticket_id, user, include_archived=False):
+    """Ticket des eigenen Mandanten – fremde Mandanten erhalten 404 statt 403.
+
+    Mit ``include_archived`` wird ein fehlendes Ticket im Archiv gesucht.
+    """
+    ticket = db.session.get(Ticket, ticket_id)
+    if ticket is None and include_archived:
+        ticket = db.session.get(ArchivedTicket, ticket_id)
+    if ticket is None or ticket.tenant != user.tenant:
+        abort(404)
+    return ticket
+
+
+def colleagues(user):
+    """Benutzer desselben Mandanten."""
+    return User.query.filter(User.tenant == user.tenant)
+
+
+def find_assignee(user_id, ticket):
+    """Techniker ``user_id`` aus dem Mandanten von ``ticket`` oder ``None``."""
+    assignee = db.session.get(User, user_id)
+    if assignee is None or not assignee.is_techniker or assignee.tenant != ticket.tenant:
+        return None
+    return assignee
+
+
+def export_tenant(tenant, target_uri, chunk_size=1000, archive_uri=None):
+    """Kopiert alle Daten eines Mandanten in eine eigene Datenbank.
+
+    Die Zieldatenbank erhält das vollständige Schema; Anhang-Inhalte bleiben
+    in der (gemeinsam nutzbaren) Anhang-Ablage. Mit ``archive_uri`` wird auch
+    das Archiv des Mandanten kopiert. Gibt die Zeilen je Tabelle zurück.
+    """
+    users = db.select(User.id).where(User.tenant == tenant)
+    tickets = db.select(Ticket.id).where(Ticket.tenant == tenant)
+    # Archiv liegt in einer anderen Datenbank: IDs vorab lesen und blockweise
+    # abfragen. Archivierte IDs kommen im aktiven Bestand nicht vor, die
+    # Bedingungen je Tabelle überschneiden sich also nicht.
+    archived = list(db.session.execute(
+        db.select(ArchivedTicket.id).where(ArchivedTicket.tenant == tenant)
+    ).scalars())
+    batches = [
+        archived[start:start + ID_BATCH_SIZE]
+        for start in range(0, len(archived), ID_BATCH_SIZE)
+    ]
+    foreign_user = or_(TicketEvent.user_id.is_(None), TicketEvent.user_id.not_in(users))
+    plan = [
+        (User.__table__, User.tenant == tenant),
+        (ApiToken.__table__, ApiToken.user_id.in_(users)),
+        (SavedView.__table__, SavedView.user_id.in_(users)),
+        (Ticket.__table__, Ticket.tenant == tenant),
+        (Comment.__table__, Comment.ticket_id.in_(tickets)),
+        (Attachment.__table__, [
+            Attachment.ticket_id.in_(tickets),
+            *(Attachment.ticket_id.in_(batch) for batch in batches),
+        ]),
+        # Auch Löscheinträge bereits entfernter Tickets gehören zum Audit-Log
+        (TicketEvent.__table__, [
+            TicketEvent.ticket_id.in_(tickets) | TicketEvent.user_id.in_(users),
+            *(TicketEvent.ticket_id.in_(batch) & foreign_user for batch in batches),
+        ]),
+        (ReportBucket.__table__, ReportBucket.tenant == tenant),
+    ]
+    copied = _copy_tables(plan, db.metadata, target_uri, chunk_size)
+
+    if archive_uri is not None:
+        archive_plan = [
+            (ArchivedTicket.__table__, ArchivedTicket.tenant == tenant),
+            (ArchivedComment.__table__, ArchivedComment.ticket_id.in_(
+                db.select(ArchivedTicket.id).where(ArchivedTicket.tenant == tenant)
+            )),
+            (ArchiveCount.__table__, ArchiveCount.tenant == tenant),
+        ]
+        copied.update(_copy_tables(
+            archive_plan, ArchivedTicket.metadata, archive_uri, chunk_size
+        ))
+    return copied
+
+
+def _copy_tables(plan, metadata, target_uri, chunk_size):
+    """Kopiert je Tabelle die Zeilen zu einer oder mehreren disjunkten Bedingungen."""
+    engine = create_engine(target_uri)
+    copied = {}
+    try:
+        metadata.create_all(engine)
+        with engine.begin() as target:
+            for table, condition in plan:
+                if target.execute(db.select(table.c.id).limit(1)).first() is not None:
+                    raise ValueError(f"Zieldatenbank enthält bereits Daten in {table.name}")
+                copied[table.name] = 0
+                conditions = condition if isinstance(condition, list) else [condition]
+                for part in conditions:
+                    result = db.session.execute(
+                        db.select(table).where(part).order_by(table.c.id),
+                        execution_options={"yield_per": chunk_size},
+                    )
+                    for rows in result.mappings().partitions():
+                        target.execute(table.insert(), [dict(row) for row in rows])
+                        copied[table.name] += len(rows)
+    finally:
+        engine.dispose()
+    return copied
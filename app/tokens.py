@@ -0,0 +1,151 @@
+"""
+HelpDesk Pro - API-Tokens
+Bearer-Tokens für Maschinen-Clients auf ``/api/*``. Ein Token hat die Form
+``hdp_<präfix>_<geheimnis>``; das Präfix ist indiziert, gespeichert wird nur
+der SHA-256-Hash. Geprüfte Tokens werden samt Benutzer-Snapshot im Speicher
+gehalten, sodass wiederholte Aufrufe weder Passwort-Hashing noch eine
+Benutzer-Abfrage kosten. Widerrufe greifen im eigenen Prozess sofort, in
+anderen Prozessen nach Ablauf der Cache-Dauer.
+"""
+
+import hashlib
+import hmac
+import secrets
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+
+from flask_login import UserMixin
+
+from app.models import db, ApiToken, User
+
+TOKEN_PREFIX = "hdp"
+
+_CacheEntry = namedtuple("_CacheEntry", "token_hash principal loaded_at")
+
+
+def hash_token(token):
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def split_token(token):
+    """``hdp_<präfix>_<geheimnis>`` -> Präfix oder ``None``."""
+    parts = token.split("_", 2)
+    if len(parts) != 3 or parts[0] != TOKEN_PREFIX or not parts[1] or not parts[2]:
+        return None
+    return parts[1]
+
+
+class TokenPrincipal(UserMixin):
+    """Schlanker Benutzer-Snapshot für Token-Anfragen (ohne ORM-Objekt)."""
+
+    def __init__(self, user, token):
+        self.id = user.id
+        self.username = user.username
+        self.full_name = user.full_name
+        self.role = user.role
+        self.department = user.department
+        self.tenant = user.tenant
+        self.token_id = token.id
+        self.token_scope = token.scope
+
+    @property
+    def is_admin(self):
+        return self.role == "admin"
+
+    @property
+    def is_techniker(self):
+        return self.role in ("admin", "techniker")
+
+    def __repr__(self):
+        return f"<TokenPrincipal {self.username} ({self.token_scope})>"
+
+
+def issue_token(user, name="", scope="read"):
+    """Legt ein Token an; der Klartext wird nur hier einmal zurückgegeben."""
+    if scope not in ApiToken.SCOPES:
+        raise ValueError(f"Ungültiger Scope: {scope}")
+    prefix = secrets.token_hex(6)
+    plaintext = f"{TOKEN_PREFIX}_{prefix}_{secrets.token_urlsafe(32)}"
+    token = ApiToken(
+        user_id=user.id,
+        name=name[:80],
+        prefix=prefix,
+        token_hash=hash_token(plaintext),
+        scope=scope,
+    )
+    db.session.add(token)
+    return token, plaintext
+
+
+class TokenCache:
+    """Prozesslokaler Cache Präfix -> (Hash, Benutzer-Snapshot)."""
+
+    def __init__(self, ttl=60):
+        self.ttl = ttl
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def _load(self, prefix):
+        row = db.session.execute(
+            db.select(ApiToken, User)
+            .join(User, User.id == ApiToken.user_id)
+            .where(ApiToken.prefix == prefix)
+        ).first()
+        if row is None:
+            return None
+        token, user = row
+        if token.is_revoked or user.is_active is False:
+            principal = None
+        else:
+            principal = TokenPrincipal(user, token)
+        return _CacheEntry(token.token_hash, principal, time.monotonic())
+
+    def authenticate(self, plaintext):
+        """Prüft ein Token; gibt den ``TokenPrincipal`` oder ``None`` zurück."""
+        prefix = split_token(plaintext)
+        if prefix is None:
+            return None
+
+        entry = self._entries.get(prefix)
+        if entry is None or time.monotonic() - entry.loaded_at > self.ttl:
+            entry = self._load(prefix)
+            if entry is None:
+                return None
+            with self._lock:
+                self._entries[prefix] = entry
+
+        if not hmac.compare_digest(entry.token_hash, hash_token(plaintext)):
+            return None
+        return entry.principal
+
+    def invalidate(self, prefix):
+        with self._lock:
+            self._entries.pop(prefix, None)
+
+
+def revoke(token, cache=None):
+    """Widerruft ein Token und entfernt es aus dem Cache."""
+    if token.revoked_at is None:
+        token.revoked_at = datetime.utcnow()
+    if cache is not None:
+        cache.invalidate(token.prefix)
+
+
+def get_cache(app):
+    cache = app.extensions.get("api_tokens")
+    if cache is None:
+        cache = app.extensions["api_tokens"] = TokenCache(
+            ttl=app.config["API_TOKEN_CACHE_SECONDS"]
+        )
+    return cache
+
+
+def bearer_token(request):
+    """Token aus ``Authorization: Bearer …`` oder ``None``."""
+    header = request.headers.get("Authorization", "")
+    scheme, _, value = header.partition(" ")
+    if scheme.lower() != "bearer" or not value.strip():
+        return None
+    return value.strip()
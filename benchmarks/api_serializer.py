@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+HelpDesk Pro - Benchmark: Ticket-Serialisierung
+Vergleicht die Serialisierung über ORM-Objekte mit dem Core-Serializer der
+API v1 (Zeilen-Tupel -> dict) und misst ``GET /api/v1/tickets`` über den
+Test-Client, jeweils in serialisierten Tickets pro Sekunde.
+
+    python benchmarks/api_serializer.py --tickets 50000
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def populate(count):
+    from app.models import db, Ticket, User
+
+    creators = [uid for (uid,) in db.session.execute(db.select(User.id))]
+    rng = random.Random(1)
+    now = datetime.utcnow()
+    rows = []
+    for i in range(count):
+        created = now - timedelta(minutes=rng.randint(0, 500000))
+        rows.append({
+            "title": f"Ticket {i}",
+            "description": "Beschreibung " * 10,
+            "status": rng.choice(Ticket.STATUSES),
+            "priority": rng.choice(Ticket.PRIORITIES),
+            "category": rng.choice(Ticket.CATEGORIES),
+            "created_by_id": rng.choice(creators),
+            "created_at": created,
+            "updated_at": created,
+        })
+    db.session.execute(db.insert(Ticket), rows)
+    db.session.commit()
+
+
+def orm_serialize():
+    from app.models import Ticket
+
+    result = []
+    for t in Ticket.query.order_by(Ticket.created_at.desc()).all():
+        result.append({
+            "id": t.id, "title": t.title, "description": t.description,
+            "status": t.status, "priority": t.priority, "category": t.category,
+            "created_by_id": t.created_by_id, "assigned_to_id": t.assigned_to_id,
+            "created_at": t.created_at.isoformat() if t.created_at else None,
+            "updated_at": t.updated_at.isoformat() if t.updated_at else None,
+            "closed_at": t.closed_at.isoformat() if t.closed_at else None,
+        })
+    return result
+
+
+def core_serialize(fields, user):
+    from app import api
+    return api.fetch(fields, user, args={}, limit=10 ** 9)
+
+
+def rate(label, func, repeat=3):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        count = len(func())
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    print(f"{label:<40} {count / best:>12,.0f} Tickets/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[2])
+    parser.add_argument("--tickets", type=int, default=50000)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="helpdesk-api-")
+    os.environ["HELPDESK_DATABASE_URI"] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    try:
+        from app.main import create_app
+        from app.models import db, User
+        from app import api
+
+        app = create_app()
+        with app.app_context():
+            populate(args.tickets)
+            admin = User.query.filter_by(username="admin").one()
+
+            rate("ORM-Objekte -> dict", orm_serialize)
+            db.session.expunge_all()
+            rate("Core-Zeilen -> dict (alle Felder)",
+                 lambda: core_serialize(list(api.FIELDS), admin))
+            rate("Core-Zeilen -> dict (id,status,priority)",
+                 lambda: core_serialize(["id", "status", "priority"], admin))
+
+        client = app.test_client()
+        client.post("/login", data={"username": "admin", "password": "admin123"})
+
+        def via_http(fields=""):
+            total = 0
+            offset = 0
+            while True:
+                data = client.get(
+                    f"/api/v1/tickets?limit=500&offset={offset}{fields}"
+                ).get_json()
+                total += len(data["tickets"])
+                offset += 500
+                if offset >= data["total"]:
+                    return range(total)
+
+        rate("GET /api/v1/tickets (JSON, 500/Seite)", via_http, repeat=1)
+        rate("GET /api/v1/tickets?fields=id,status", lambda: via_http("&fields=id,status"), repeat=1)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
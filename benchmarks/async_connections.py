@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+HelpDesk Pro - Benchmark: viele offene Dashboard-Verbindungen, sync vs. ASGI
+Hält ``--clients`` Dashboard-Verbindungen offen, die ``/api/stats/overview``
+beobachten; nach der Hälfte der Laufzeit wird ein Ticket angelegt. Gemessen
+werden Threads, Speicher (RSS), Anzahl der Anfragen an die App und die Zeit,
+bis alle Clients die Änderung gesehen haben.
+
+  sync   – ein Thread je Verbindung (wie ein Thread-Server), Polling im
+           Intervall ``--interval`` mit If-None-Match
+  async  – ``app.asgi`` auf einer Event-Loop, Long-Polling (``?wait=``)
+
+    python benchmarks/async_connections.py --clients 1000 --seconds 10
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def rss_mb():
+    with open("/proc/self/status") as fh:
+        for line in fh:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+# Von der App bearbeitete Anfragen (nach der Vorbereitung zurückgesetzt)
+REQUESTS = [0]
+
+
+def setup(workdir):
+    os.environ["HELPDESK_DATABASE_URI"] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    from app.main import create_app
+
+    app = create_app()
+    app.before_request(lambda: REQUESTS.__setitem__(0, REQUESTS[0] + 1))
+    client = app.test_client()
+    client.post("/login", data={"username": "technik1", "password": "tech123"})
+    cookie = client.get_cookie("session").value
+    etag = client.get("/api/stats/overview").headers["ETag"]
+    REQUESTS[0] = 0
+    return app, cookie, etag
+
+
+def create_ticket(app):
+    from app.models import db, Ticket
+
+    with app.app_context():
+        db.session.add(Ticket(title="Benchmark", description="x", created_by_id=4))
+        db.session.commit()
+
+
+def run_sync(app, cookie, etag, args):
+    seen = []
+    lock = threading.Lock()
+    stop = threading.Event()
+    changed_at = [None]
+
+    def client_loop():
+        client = app.test_client()
+        client.set_cookie("session", cookie)
+        headers = {"If-None-Match": etag}
+        while not stop.is_set():
+            resp = client.get("/api/stats/overview", headers=headers)
+            if resp.status_code == 200:
+                with lock:
+                    seen.append(time.perf_counter())
+                return
+            stop.wait(args.interval)
+
+    threads = [threading.Thread(target=client_loop, daemon=True) for _ in range(args.clients)]
+    for thread in threads:
+        thread.start()
+    time.sleep(args.seconds / 2)
+    peak = (threading.active_count(), rss_mb())
+    changed_at[0] = time.perf_counter()
+    create_ticket(app)
+    deadline = time.perf_counter() + args.seconds / 2
+    while len(seen) < args.clients and time.perf_counter() < deadline:
+        time.sleep(0.05)
+    stop.set()
+    return peak, seen, changed_at[0]
+
+
+def run_async(app, cookie, etag, args):
+    from app import asgi
+
+    asgi_app = asgi.AsgiApp(app, workers=app.config["ASYNC_WORKERS"],
+                            poll_seconds=app.config["ASYNC_POLL_SECONDS"])
+    seen = []
+    headers = [(b"cookie", f"session={cookie}".encode()), (b"if-none-match", etag.encode())]
+    scope = {"type": "http", "method": "GET", "path": "/api/stats/overview",
+             "query_string": f"wait={args.seconds}".encode(), "headers": headers}
+
+    async def one_client():
+        status = []
+
+        async def receive():
+            return {"type": "http.request", "body": b""}
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                status.append(message["status"])
+
+        await asgi_app(scope, receive, send)
+        if status[0] == 200:
+            seen.append(time.perf_counter())
+
+    async def scenario():
+        tasks = [asyncio.create_task(one_client()) for _ in range(args.clients)]
+        await asyncio.sleep(args.seconds / 2)
+        peak = (threading.active_count(), rss_mb())
+        changed_at = time.perf_counter()
+        await asyncio.get_running_loop().run_in_executor(None, create_ticket, app)
+        await asyncio.wait(tasks, timeout=args.seconds / 2)
+        return peak, changed_at
+
+    peak, changed_at = asyncio.run(scenario())
+    asgi_app.executor.shutdown()
+    return peak, seen, changed_at
+
+
+def measure(mode, args):
+    workdir = tempfile.mkdtemp(prefix="helpdesk-async-")
+    try:
+        app, cookie, etag = setup(workdir)
+        base = rss_mb()
+        runner = run_sync if mode == "sync" else run_async
+        (threads, rss), seen, changed_at = runner(app, cookie, etag, args)
+        delays = sorted(t - changed_at for t in seen)
+        print(json.dumps({
+            "mode": mode,
+            "clients": args.clients,
+            "threads": threads,
+            "rss_mb": round(rss - base, 1),
+            "requests": REQUESTS[0],
+            "notified": len(seen),
+            "p50_ms": round(delays[len(delays) // 2] * 1000) if delays else None,
+            "max_ms": round(delays[-1] * 1000) if delays else None,
+        }))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[2])
+    parser.add_argument("--clients", type=int, default=1000)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--interval", type=float, default=1.0,
+                        help="Polling-Intervall der sync-Clients in Sekunden")
+    parser.add_argument("--mode", choices=["sync", "async"], default=None)
+    args = parser.parse_args()
+
+    if args.mode:
+        measure(args.mode, args)
+        return
+
+    # Jeder Modus in einem eigenen Prozess, damit RSS und Threads vergleichbar sind
+    print(f"{'Modus':<6} {'Clients':>7} {'Threads':>8} {'RSS +MB':>8} {'Anfragen':>9} "
+          f"{'benachr.':>9} {'p50 ms':>7} {'max ms':>7}")
+    for mode in ("sync", "async"):
+        out = subprocess.run(
+            [sys.executable, __file__, "--mode", mode, "--clients", str(args.clients),
+             "--seconds", str(args.seconds), "--interval", str(args.interval)],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip().splitlines()[-1]
+        r = json.loads(out)
+        print(f"{r['mode']:<6} {r['clients']:>7} {r['threads']:>8} {r['rss_mb']:>8} "
+              f"{r['requests']:>9} {r['notified']:>9} {r['p50_ms']!s:>7} {r['max_ms']!s:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+HelpDesk Pro - Benchmark: parallele Datei-Uploads
+Startet die App mit temporärer Datenbank und Ablage in einem Thread-Server
+und lädt mehrere große Dateien gleichzeitig als Kommentar-Anhang hoch.
+Gemessen werden Laufzeit, Durchsatz und der Spitzen-Speicherverbrauch des
+Prozesses (RSS) – bei gestreamten Uploads bleibt dieser nahezu konstant.
+
+    python benchmarks/attachment_upload.py --clients 8 --size-mb 50
+"""
+
+import argparse
+import http.client
+import logging
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from http.cookies import SimpleCookie
+from urllib.parse import urlencode
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+CHUNK = 1024 * 1024
+
+
+def start_server(workdir):
+    os.environ["HELPDESK_DATABASE_URI"] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ["HELPDESK_ATTACHMENT_DIR"] = os.path.join(workdir, "attachments")
+    os.environ.setdefault("HELPDESK_ATTACHMENT_QUOTA_MB", "100000")
+
+    from werkzeug.serving import make_server
+    from app.main import create_app
+
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+
+    app = create_app()
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def login(port, username, password):
+    conn = http.client.HTTPConnection("127.0.0.1", port)
+    body = urlencode({"username": username, "password": password})
+    conn.request("POST", "/login", body,
+                 {"Content-Type": "application/x-www-form-urlencoded"})
+    resp = conn.getresponse()
+    resp.read()
+    cookie = SimpleCookie(resp.headers["Set-Cookie"])
+    return f"session={cookie['session'].value}"
+
+
+def upload(port, cookie, ticket_id, size, seed):
+    """Sendet einen Multipart-Body blockweise, ohne ihn im Speicher aufzubauen."""
+    boundary = f"bench{seed:08d}"
+    head = (
+        f"--{boundary}\r\n"
+        'Content-Disposition: form-data; name="content"\r\n\r\n'
+        f"Upload {seed}\r\n"
+        f"--{boundary}\r\n"
+        f'Content-Disposition: form-data; name="attachments"; filename="bench-{seed}.bin"\r\n'
+        "Content-Type: application/octet-stream\r\n\r\n"
+    ).encode()
+    tail = f"\r\n--{boundary}--\r\n".encode()
+    # Unterschiedlicher Inhalt je Client, damit nicht dedupliziert wird
+    block = (seed.to_bytes(4, "big") * (CHUNK // 4))
+
+    def body():
+        yield head
+        remaining = size
+        while remaining > 0:
+            part = block[:min(CHUNK, remaining)]
+            remaining -= len(part)
+            yield part
+        yield tail
+
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=600)
+    conn.request("POST", f"/tickets/{ticket_id}/comment", body(), {
+        "Content-Type": f"multipart/form-data; boundary={boundary}",
+        "Content-Length": str(len(head) + size + len(tail)),
+        "Cookie": cookie,
+    })
+    resp = conn.getresponse()
+    resp.read()
+    return resp.status
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[2])
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--size-mb", type=int, default=50)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="helpdesk-bench-")
+    try:
+        server = start_server(workdir)
+        port = server.server_port
+        cookie = login(port, "admin", "admin123")
+        size = args.size_mb * 1024 * 1024
+        rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+        statuses = []
+        threads = [
+            threading.Thread(target=lambda i=i: statuses.append(upload(port, cookie, 1, size, i)))
+            for i in range(args.clients)
+        ]
+        started = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - started
+
+        rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        total_mb = args.clients * args.size_mb
+        print(f"Uploads:        {args.clients} × {args.size_mb} MB (Status: {sorted(set(statuses))})")
+        print(f"Laufzeit:       {elapsed:.2f} s")
+        print(f"Durchsatz:      {total_mb / elapsed:.1f} MB/s")
+        print(f"Max. RSS:       {rss_before / 1024:.0f} MB → {rss_after / 1024:.0f} MB")
+        server.shutdown()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
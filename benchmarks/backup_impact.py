@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+HelpDesk Pro - Benchmark: Schreiblatenz während einer Online-Sicherung
+Füllt eine temporäre Datenbank auf die gewünschte Größe, misst die Latenz von
+``ticket_update`` (Statuswechsel als Techniker) zunächst ohne und dann während
+einer laufenden ``backup.backup_database`` und gibt Perzentile, Durchsatz und
+Sicherungsdauer aus – wahlweise im WAL- oder im Rollback-Journal-Modus.
+
+    python benchmarks/backup_impact.py --tickets 100000 --payload 4000
+    python benchmarks/backup_impact.py --tickets 600000 --payload 4000 --journal-mode delete
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+STATUSES = ["offen", "in_bearbeitung", "wartend"]
+
+
+def fill(path, tickets, payload):
+    """Tickets direkt per sqlite3 einfügen (schneller als über das ORM).
+
+    Status, Priorität und Kategorie als Codes: offen, mittel, software.
+    """
+    conn = sqlite3.connect(path)
+    now = datetime.utcnow().isoformat(sep=" ")
+    description = "x" * payload
+    rows = (
+        ("default", f"Last-Ticket {i}", description, 0, 1, 1, 4, now, now)
+        for i in range(tickets)
+    )
+    conn.executemany(
+        "INSERT INTO tickets (tenant, title, description, status, priority, category, "
+        "created_by_id, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        rows,
+    )
+    conn.commit()
+    conn.close()
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))] * 1000
+
+
+def update_loop(client, max_id, stop, latencies):
+    rng = random.Random(7)
+    while not stop():
+        ticket_id = rng.randint(1, max_id)
+        started = time.perf_counter()
+        resp = client.post(f"/tickets/{ticket_id}/update", data={"status": rng.choice(STATUSES)})
+        latencies.append(time.perf_counter() - started)
+        if resp.status_code != 302:
+            raise RuntimeError(f"ticket_update: HTTP {resp.status_code}")
+
+
+def report(label, latencies, seconds):
+    print(f"{label:<16} {len(latencies):>6} Updates  {len(latencies) / seconds:>7.1f}/s  "
+          f"p50 {percentile(latencies, 50):6.2f} ms  p95 {percentile(latencies, 95):6.2f} ms  "
+          f"p99 {percentile(latencies, 99):7.2f} ms  max {max(latencies) * 1000:7.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[2])
+    parser.add_argument("--tickets", type=int, default=100000)
+    parser.add_argument("--payload", type=int, default=4000, help="Bytes je Beschreibung")
+    parser.add_argument("--journal-mode", choices=["wal", "delete"], default="wal")
+    parser.add_argument("--pages", type=int, default=1024)
+    parser.add_argument("--baseline-seconds", type=float, default=5.0)
+    parser.add_argument("--gzip", action="store_true")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="helpdesk-backup-")
+    db_path = os.path.join(workdir, "bench.db")
+    os.environ["HELPDESK_DATABASE_URI"] = f"sqlite:///{db_path}"
+    os.environ["HELPDESK_SQLITE_WAL"] = "true" if args.journal_mode == "wal" else "false"
+    try:
+        from app.main import create_app
+        from app import backup
+
+        app = create_app()
+        fill(db_path, args.tickets, args.payload)
+        max_id = sqlite3.connect(db_path).execute("SELECT max(id) FROM tickets").fetchone()[0]
+        size_mb = os.path.getsize(db_path) / 1024 / 1024
+        print(f"Datenbank: {size_mb:.0f} MB, {max_id} Tickets, Journal: {args.journal_mode}")
+
+        client = app.test_client()
+        client.post("/login", data={"username": "technik1", "password": "tech123"})
+
+        baseline = []
+        deadline = time.perf_counter() + args.baseline_seconds
+        update_loop(client, max_id, lambda: time.perf_counter() > deadline, baseline)
+        report("ohne Sicherung", baseline, args.baseline_seconds)
+
+        result = {}
+        worker = threading.Thread(target=lambda: result.update(
+            backup.backup_database(db_path, os.path.join(workdir, "backups"),
+                                   pages=args.pages, compress=args.gzip)._asdict()
+        ))
+        during = []
+        started = time.perf_counter()
+        worker.start()
+        update_loop(client, max_id, lambda: not worker.is_alive(), during)
+        worker.join()
+        report("mit Sicherung", during, time.perf_counter() - started)
+
+        print(f"Sicherung: {result['size'] / 1024 / 1024:.0f} MB in {result['seconds']} s "
+              f"({'Snapshot' if result['snapshot'] else 'ohne WAL'})")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
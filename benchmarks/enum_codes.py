@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+HelpDesk Pro - Benchmark: Status/Priorität/Kategorie als Text vs. Integer-Code
+Legt eine Ticket-Tabelle im alten Schema (Texte) an, füllt sie mit
+``--tickets`` Zeilen und stellt eine Kopie mit der Schema-Aktualisierung auf
+Integer-Codes um. Verglichen werden Dateigröße (nach ``VACUUM``), Größe der
+Indizes und die Laufzeit typischer Statistik- und Filterabfragen.
+
+    python benchmarks/enum_codes.py --tickets 1000000
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+TENANTS = ["default", "nord", "sued", "west"]
+
+# Schema vor der Umstellung (Texte, gleiche Indizes)
+OLD_SCHEMA = """
+CREATE TABLE users (id INTEGER PRIMARY KEY);
+CREATE TABLE tickets (
+    id INTEGER NOT NULL PRIMARY KEY,
+    tenant VARCHAR(40) DEFAULT 'default' NOT NULL,
+    title VARCHAR(200) NOT NULL,
+    description TEXT NOT NULL,
+    status VARCHAR(20) NOT NULL,
+    priority VARCHAR(20) NOT NULL,
+    category VARCHAR(50) NOT NULL,
+    created_by_id INTEGER NOT NULL REFERENCES users (id),
+    assigned_to_id INTEGER REFERENCES users (id),
+    created_at DATETIME,
+    updated_at DATETIME,
+    closed_at DATETIME
+);
+CREATE INDEX ix_tickets_tenant_status ON tickets (tenant, status);
+CREATE INDEX ix_tickets_tenant_created_at ON tickets (tenant, created_at);
+CREATE INDEX ix_tickets_tenant_updated_at ON tickets (tenant, updated_at);
+CREATE INDEX ix_tickets_tenant_assigned ON tickets (tenant, assigned_to_id);
+CREATE INDEX ix_tickets_created_at ON tickets (created_at);
+CREATE INDEX ix_tickets_updated_at ON tickets (updated_at);
+CREATE INDEX ix_tickets_closed_at ON tickets (closed_at);
+"""
+
+# Name -> (SQL, Parameter-Funktion: Wert -> gespeicherte Form)
+QUERIES = {
+    "Statistik (GROUP BY)": (
+        "SELECT status, priority, category, count(*) FROM tickets "
+        "WHERE tenant = ? GROUP BY status, priority, category",
+        lambda enc: ("default",),
+    ),
+    "Zählung Status+Prio": (
+        "SELECT count(*) FROM tickets WHERE tenant = ? AND status = ? AND priority IN (?, ?)",
+        lambda enc: ("default", enc("status", "offen"),
+                     enc("priority", "hoch"), enc("priority", "kritisch")),
+    ),
+    "Liste Status (50)": (
+        "SELECT id, title, status, priority, category FROM tickets "
+        "WHERE tenant = ? AND status = ? ORDER BY id DESC LIMIT 50",
+        lambda enc: ("default", enc("status", "wartend")),
+    ),
+    "offene je Kategorie": (
+        "SELECT category, count(*) FROM tickets WHERE tenant = ? AND status != ? "
+        "GROUP BY category",
+        lambda enc: ("default", enc("status", "geschlossen")),
+    ),
+}
+
+
+def fill(path, tickets, payload, seed):
+    from app.models import Ticket
+
+    rng = random.Random(seed)
+    conn = sqlite3.connect(path)
+    conn.executescript(OLD_SCHEMA)
+    conn.executemany("INSERT INTO users (id) VALUES (?)", [(i,) for i in range(1, 51)])
+    start = datetime(2024, 1, 1)
+    description = "x" * payload
+    rows = []
+    for i in range(tickets):
+        created = start + timedelta(minutes=i)
+        status = rng.choice(Ticket.STATUSES)
+        rows.append((
+            rng.choice(TENANTS), f"Ticket {i}", description, status,
+            rng.choice(Ticket.PRIORITIES), rng.choice(Ticket.CATEGORIES),
+            rng.randint(1, 50), rng.choice([None, rng.randint(1, 50)]),
+            created, created, created if status == "geschlossen" else None,
+        ))
+        if len(rows) == 50000:
+            _insert(conn, rows)
+    _insert(conn, rows)
+    conn.commit()
+    conn.close()
+
+
+def _insert(conn, rows):
+    conn.executemany(
+        "INSERT INTO tickets (tenant, title, description, status, priority, category, "
+        "created_by_id, assigned_to_id, created_at, updated_at, closed_at) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        [(*row[:8], *(str(v) if v else None for v in row[8:])) for row in rows],
+    )
+    rows.clear()
+
+
+def sizes(path):
+    """Dateigröße sowie Tabelle und Indizes in MB (``dbstat``, falls verfügbar)."""
+    conn = sqlite3.connect(path)
+    conn.execute("VACUUM")
+    conn.execute("ANALYZE")
+    try:
+        rows = dict(conn.execute(
+            "SELECT name, sum(pgsize) FROM dbstat WHERE name LIKE '%tickets%' GROUP BY name"
+        ).fetchall())
+        table = rows.pop("tickets", 0) / 1024 / 1024
+        indexes = sum(rows.values()) / 1024 / 1024
+    except sqlite3.OperationalError:
+        table = indexes = None
+    conn.close()
+    return os.path.getsize(path) / 1024 / 1024, table, indexes
+
+
+def time_query(path, sql, params, repeat):
+    conn = sqlite3.connect(path)
+    conn.execute(sql, params).fetchall()  # Cache wärmen
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        conn.execute(sql, params).fetchall()
+        timings.append(time.perf_counter() - started)
+    conn.close()
+    timings.sort()
+    return timings[len(timings) // 2] * 1000
+
+
+def main():
+    from sqlalchemy import create_engine
+    from app.models import Ticket
+    from app import migrations
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[2])
+    parser.add_argument("--tickets", type=int, default=1000000)
+    parser.add_argument("--payload", type=int, default=200, help="Bytes je Beschreibung")
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="helpdesk-enum-")
+    try:
+        text_db = os.path.join(workdir, "text.db")
+        code_db = os.path.join(workdir, "codes.db")
+        started = time.perf_counter()
+        fill(text_db, args.tickets, args.payload, args.seed)
+        print(f"{args.tickets} Tickets erzeugt in {time.perf_counter() - started:.1f} s")
+
+        shutil.copy(text_db, code_db)
+        engine = create_engine(f"sqlite:///{code_db}")
+        started = time.perf_counter()
+        migrations._convert_enum_columns(Ticket.__table__, engine)
+        engine.dispose()
+        print(f"Umstellung auf Codes: {time.perf_counter() - started:.1f} s\n")
+
+        types = {column: Ticket.__table__.c[column].type
+                 for column in ("status", "priority", "category")}
+        encoders = {
+            "Text": lambda column, value: value,
+            "Code": lambda column, value: types[column].process_bind_param(value, None),
+        }
+        paths = {"Text": text_db, "Code": code_db}
+
+        print(f"{'':<22} {'Text':>10} {'Code':>10} {'Änderung':>9}")
+        measured = {name: sizes(path) for name, path in paths.items()}
+        for i, label in enumerate(("Datei MB", "Tabelle MB", "Indizes MB")):
+            old, new = measured["Text"][i], measured["Code"][i]
+            if old is None:
+                continue
+            print(f"{label:<22} {old:>10.1f} {new:>10.1f} {(new / old - 1) * 100:>+8.1f}%")
+
+        for label, (sql, params) in QUERIES.items():
+            old, new = (
+                time_query(paths[name], sql, params(encoders[name]), args.repeat)
+                for name in ("Text", "Code")
+            )
+            print(f"{label + ' ms':<22} {old:>10.2f} {new:>10.2f} {(new / old - 1) * 100:>+8.1f}%")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
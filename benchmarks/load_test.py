@@ -0,0 +1,398 @@
+#!/usr/bin/env python3
+"""
+HelpDesk Pro - Lasttest: gemischter Helpdesk-Verkehr nach Rollen
+Simuliert Mitarbeiter (Tickets anlegen, eigene Liste abrufen), Techniker
+(filtern, ansehen, aktualisieren, kommentieren) und Admins (Benutzerliste)
+mit den Konten aus ``seed.py``. Anfragen treffen offen (Poisson-verteilt)
+mit der je Rolle eingestellten Rate ein; die Latenz zählt ab dem geplanten
+Ankunftszeitpunkt, Wartezeiten in einer überlasteten App gehen also mit ein.
+
+Ausgabe je Route: Anzahl, Fehlerquote, Durchsatz und Latenz-Perzentile.
+``--save-baseline`` speichert das Ergebnis, ``--baseline`` vergleicht damit
+und endet mit Status 1, wenn eine Route langsamer oder fehlerhafter wurde.
+
+    python benchmarks/load_test.py --duration 30                    # In-Process
+    python benchmarks/load_test.py --url http://localhost:5000 --rate techniker=5
+    python benchmarks/load_test.py --save-baseline baseline.json
+    python benchmarks/load_test.py --baseline baseline.json --tolerance 0.25
+"""
+
+import argparse
+import http.client
+import json
+import os
+import queue
+import random
+import re
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from http.cookies import SimpleCookie
+from urllib.parse import urlencode, urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Konten aus seed.py
+ACCOUNTS = {
+    "mitarbeiter": [("mueller", "user123"), ("fischer", "user123"), ("becker", "user123")],
+    "techniker": [("technik1", "tech123"), ("technik2", "tech123")],
+    "admin": [("admin", "admin123")],
+}
+DEFAULT_RATES = {"mitarbeiter": 4.0, "techniker": 6.0, "admin": 0.5}
+DEFAULT_SESSIONS = {"mitarbeiter": 6, "techniker": 4, "admin": 1}
+
+STATUSES = ["offen", "in_bearbeitung", "wartend", "geschlossen"]
+PRIORITIES = ["niedrig", "mittel", "hoch", "kritisch"]
+CATEGORIES = ["hardware", "software", "netzwerk", "zugang", "sonstiges"]
+TICKET_LINK = re.compile(r"/tickets/(\d+)['\"]")
+
+
+# ── Transport ────────────────────────────────────
+
+class ClientSession:
+    """Sitzung über den Flask-Test-Client (ohne Netzwerk)."""
+
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, data=None):
+        resp = self.client.open(path, method=method, data=data)
+        return resp.status_code, resp.headers.get("Location", ""), resp.get_data(as_text=True)
+
+
+class HttpSession:
+    """Sitzung gegen einen laufenden Server (z.B. ``python run.py``)."""
+
+    def __init__(self, base_url):
+        parts = urlsplit(base_url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.cookies = {}
+
+    def request(self, method, path, data=None):
+        headers = {}
+        body = None
+        if self.cookies:
+            headers["Cookie"] = "; ".join(f"{k}={v}" for k, v in self.cookies.items())
+        if data is not None:
+            body = urlencode(data)
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+        conn = http.client.HTTPConnection(self.host, self.port, timeout=30)
+        try:
+            conn.request(method, path, body, headers)
+            resp = conn.getresponse()
+            text = resp.read().decode("utf-8", "replace")
+            for header in resp.headers.get_all("Set-Cookie") or []:
+                for name, morsel in SimpleCookie(header).items():
+                    self.cookies[name] = morsel.value
+            return resp.status, resp.headers.get("Location", ""), text
+        finally:
+            conn.close()
+
+
+# ── Virtuelle Benutzer ───────────────────────────
+
+class VirtualUser:
+    """Angemeldete Sitzung eines Seed-Kontos samt bekannter Ticket-IDs."""
+
+    def __init__(self, session, role, username, password):
+        self.session = session
+        self.role = role
+        self.rng = random.Random(f"{role}-{username}-{id(self)}")
+        self.ticket_ids = []
+        status, location, _ = session.request(
+            "POST", "/login", {"username": username, "password": password}
+        )
+        if status != 302 or "/login" in location:
+            raise RuntimeError(f"Anmeldung als {username} fehlgeschlagen (HTTP {status})")
+
+    def remember(self, html):
+        ids = [int(i) for i in TICKET_LINK.findall(html)]
+        if ids:
+            self.ticket_ids = ids[:200]
+
+    def some_ticket(self):
+        return self.rng.choice(self.ticket_ids) if self.ticket_ids else None
+
+
+def _employee(user):
+    rng = user.rng
+    action = rng.choices(["create", "list", "view"], weights=[1, 4, 2])[0]
+    if action == "create" or not user.ticket_ids:
+        data = {
+            "title": f"Lasttest {rng.randint(1, 10 ** 6)}",
+            "description": "Drucker im 2. OG druckt nur leere Seiten. " * 4,
+            "priority": rng.choice(PRIORITIES),
+            "category": rng.choice(CATEGORIES),
+        }
+        return "POST /tickets/new", "POST", "/tickets/new", data, 302
+    if action == "list":
+        return "GET /tickets (eigene)", "GET", "/tickets", None, 200
+    return "GET /tickets/<id>", "GET", f"/tickets/{user.some_ticket()}", None, 200
+
+
+def _technician(user):
+    rng = user.rng
+    action = rng.choices(["filter", "view", "update", "comment", "dashboard"],
+                         weights=[4, 3, 2, 2, 1])[0]
+    ticket_id = user.some_ticket()
+    if action == "filter" or ticket_id is None:
+        args = {"status": rng.choice(STATUSES[:3]), "priority": rng.choice(["alle", *PRIORITIES])}
+        if rng.random() < 0.3:
+            args["q"] = rng.choice(["Drucker", "VPN", "Passwort", "Lasttest"])
+        return "GET /tickets?filter", "GET", f"/tickets?{urlencode(args)}", None, 200
+    if action == "view":
+        return "GET /tickets/<id>", "GET", f"/tickets/{ticket_id}", None, 200
+    if action == "update":
+        data = {"status": rng.choice(STATUSES), "priority": rng.choice(PRIORITIES)}
+        return "POST /tickets/<id>/update", "POST", f"/tickets/{ticket_id}/update", data, 302
+    if action == "comment":
+        data = {"content": "Habe mir das angesehen, melde mich gleich."}
+        return "POST /tickets/<id>/comment", "POST", f"/tickets/{ticket_id}/comment", data, 302
+    return "GET / (Dashboard)", "GET", "/", None, 200
+
+
+def _admin(user):
+    if user.rng.random() < 0.7:
+        return "GET /users", "GET", "/users", None, 200
+    return "GET / (Dashboard)", "GET", "/", None, 200
+
+
+SCENARIOS = {"mitarbeiter": _employee, "techniker": _technician, "admin": _admin}
+
+
+def act(user):
+    """Führt eine Aktion aus; gibt (Route, erfolgreich) zurück."""
+    route, method, path, data, expected = SCENARIOS[user.role](user)
+    try:
+        status, location, body = user.session.request(method, path, data)
+    except (OSError, http.client.HTTPException):
+        return route, False
+    ok = status == expected and "/login" not in location
+    if ok and (path == "/tickets" or path.startswith("/tickets?")):
+        user.remember(body)
+    if ok and route == "POST /tickets/new":
+        match = re.search(r"/tickets/(\d+)$", location)
+        if match:
+            user.ticket_ids.append(int(match.group(1)))
+    return route, ok
+
+
+# ── Lastgenerator ────────────────────────────────
+
+class Recorder:
+    def __init__(self):
+        self.samples = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.lock = threading.Lock()
+
+    def add(self, route, seconds, ok):
+        with self.lock:
+            self.samples[route].append(seconds)
+            if not ok:
+                self.errors[route] += 1
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+
+def run_load(new_session, rates, sessions, duration, concurrency, seed=1):
+    pools = {}
+    for role, count in sessions.items():
+        if not rates.get(role):
+            continue
+        pools[role] = queue.Queue()
+        for i in range(count):
+            username, password = ACCOUNTS[role][i % len(ACCOUNTS[role])]
+            pools[role].put(VirtualUser(new_session(), role, username, password))
+
+    recorder = Recorder()
+    executor = ThreadPoolExecutor(max_workers=concurrency)
+    started = time.perf_counter()
+    deadline = started + duration
+
+    def task(role, scheduled):
+        user = pools[role].get()
+        try:
+            route, ok = act(user)
+        finally:
+            pools[role].put(user)
+        recorder.add(route, time.perf_counter() - scheduled, ok)
+
+    def arrivals(role, rate, rng):
+        # Offenes Modell: Ankünfte unabhängig von laufenden Anfragen
+        scheduled = started
+        while True:
+            scheduled += rng.expovariate(rate)
+            if scheduled >= deadline:
+                return
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            executor.submit(task, role, scheduled)
+
+    generators = [
+        threading.Thread(target=arrivals, args=(role, rates[role], random.Random(seed + n)))
+        for n, role in enumerate(pools)
+    ]
+    for thread in generators:
+        thread.start()
+    for thread in generators:
+        thread.join()
+    executor.shutdown(wait=True)
+    elapsed = time.perf_counter() - started
+    return summarize(recorder, elapsed)
+
+
+def summarize(recorder, elapsed):
+    routes = {}
+    for route, samples in sorted(recorder.samples.items()):
+        routes[route] = {
+            "count": len(samples),
+            "errors": recorder.errors[route],
+            "error_rate": round(recorder.errors[route] / len(samples), 4),
+            "rps": round(len(samples) / elapsed, 2),
+            "p50_ms": round(percentile(samples, 50) * 1000, 1),
+            "p90_ms": round(percentile(samples, 90) * 1000, 1),
+            "p99_ms": round(percentile(samples, 99) * 1000, 1),
+            "max_ms": round(max(samples) * 1000, 1),
+        }
+    total = sum(r["count"] for r in routes.values())
+    errors = sum(r["errors"] for r in routes.values())
+    return {
+        "elapsed_s": round(elapsed, 2),
+        "total": {"count": total, "errors": errors, "rps": round(total / elapsed, 2)},
+        "routes": routes,
+    }
+
+
+def print_report(result):
+    print(f"{'Route':<30} {'Anz.':>6} {'Fehler':>7} {'req/s':>7} "
+          f"{'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for route, r in result["routes"].items():
+        print(f"{route:<30} {r['count']:>6} {r['error_rate']:>7.1%} {r['rps']:>7.2f} "
+              f"{r['p50_ms']:>8} {r['p90_ms']:>8} {r['p99_ms']:>8} {r['max_ms']:>8}")
+    total = result["total"]
+    print(f"{'Gesamt':<30} {total['count']:>6} {total['errors']:>7} {total['rps']:>7.2f}")
+
+
+def compare(result, baseline, tolerance, min_samples=20, slack_ms=5.0):
+    """Regressionen gegenüber der Baseline (p90 und Fehlerquote je Route)."""
+    problems = []
+    for route, base in baseline["routes"].items():
+        current = result["routes"].get(route)
+        if current is None or min(current["count"], base["count"]) < min_samples:
+            continue
+        limit = base["p90_ms"] * (1 + tolerance) + slack_ms
+        if current["p90_ms"] > limit:
+            problems.append(f"{route}: p90 {current['p90_ms']} ms > {limit:.1f} ms "
+                            f"(Baseline {base['p90_ms']} ms)")
+        if current["error_rate"] > base["error_rate"] + 0.01:
+            problems.append(f"{route}: Fehlerquote {current['error_rate']:.1%} "
+                            f"(Baseline {base['error_rate']:.1%})")
+    return problems
+
+
+def fill(path, tickets, rng):
+    """Zusätzliche Tickets direkt per sqlite3 (verteilt auf die Seed-Mitarbeiter).
+
+    Status, Priorität und Kategorie werden als Code (Listenposition) gespeichert.
+    """
+    conn = sqlite3.connect(path)
+    creators = [row[0] for row in conn.execute(
+        "SELECT id FROM users WHERE role = 'mitarbeiter'"
+    )]
+    now = datetime.utcnow().isoformat(sep=" ")
+    conn.executemany(
+        "INSERT INTO tickets (tenant, title, description, status, priority, category, "
+        "created_by_id, created_at, updated_at) VALUES ('default', ?, ?, ?, ?, ?, ?, ?, ?)",
+        (
+            (f"Bestand {i}", "Beschreibung " * 20, rng.randrange(len(STATUSES)),
+             rng.randrange(len(PRIORITIES)), rng.randrange(len(CATEGORIES)),
+             rng.choice(creators), now, now)
+            for i in range(tickets)
+        ),
+    )
+    conn.commit()
+    conn.close()
+
+
+def _role_values(pairs, defaults, cast):
+    values = dict(defaults)
+    for pair in pairs or []:
+        role, _, value = pair.partition("=")
+        if role not in defaults:
+            raise SystemExit(f"Unbekannte Rolle: {role} (erlaubt: {', '.join(defaults)})")
+        values[role] = cast(value)
+    return values
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[2])
+    parser.add_argument("--url", default=None,
+                        help="Laufender Server; ohne Angabe In-Process mit temporärer Datenbank")
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--rate", action="append", metavar="ROLLE=N",
+                        help="Anfragen pro Sekunde je Rolle (mehrfach angebbar)")
+    parser.add_argument("--sessions", action="append", metavar="ROLLE=N",
+                        help="Gleichzeitige Sitzungen je Rolle")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--tickets", type=int, default=2000,
+                        help="Zusätzliche Bestandstickets (nur In-Process)")
+    parser.add_argument("--save-baseline", metavar="DATEI")
+    parser.add_argument("--baseline", metavar="DATEI")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Erlaubte p90-Verschlechterung gegenüber der Baseline")
+    args = parser.parse_args()
+
+    rates = _role_values(args.rate, DEFAULT_RATES, float)
+    sessions = _role_values(args.sessions, DEFAULT_SESSIONS, int)
+
+    workdir = None
+    try:
+        if args.url:
+            new_session = lambda: HttpSession(args.url)  # noqa: E731
+        else:
+            workdir = tempfile.mkdtemp(prefix="helpdesk-load-")
+            db_path = os.path.join(workdir, "load.db")
+            os.environ["HELPDESK_DATABASE_URI"] = f"sqlite:///{db_path}"
+            os.environ["HELPDESK_ATTACHMENT_DIR"] = os.path.join(workdir, "attachments")
+            from app.main import create_app
+
+            app = create_app()
+            fill(db_path, args.tickets, random.Random(3))
+            new_session = lambda: ClientSession(app)  # noqa: E731
+
+        result = run_load(new_session, rates, sessions, args.duration, args.concurrency)
+        result["config"] = {
+            "target": args.url or "in-process", "duration_s": args.duration,
+            "rates": rates, "sessions": sessions, "concurrency": args.concurrency,
+        }
+        print_report(result)
+
+        if args.save_baseline:
+            with open(args.save_baseline, "w") as fh:
+                json.dump(result, fh, indent=2, ensure_ascii=False)
+            print(f"Baseline gespeichert: {args.save_baseline}")
+        if args.baseline:
+            with open(args.baseline) as fh:
+                problems = compare(result, json.load(fh), args.tolerance)
+            for problem in problems:
+                print(f"REGRESSION {problem}")
+            if problems:
+                sys.exit(1)
+            print("Keine Regression gegenüber der Baseline.")
+    finally:
+        if workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+HelpDesk Pro - Benchmark: E-Mail-Eingang
+Erzeugt einen Maildir-Spool mit neuen Meldungen und Antworten auf bestehende
+Tickets (Verhältnis wie bei einem Störungs-Ansturm) und misst den Durchsatz
+von ``mailgate.ingest`` in Nachrichten pro Minute.
+
+    python benchmarks/mail_ingest.py --messages 5000 --workers 4
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SENDERS = ["s.mueller@firma.de", "t.fischer@firma.de", "a.becker@firma.de",
+           "technik1@firma.de", "unbekannt@extern.de"]
+
+
+def build_spool(path, count, reply_ratio, max_ticket):
+    for sub in ("new", "cur", "tmp"):
+        os.makedirs(os.path.join(path, sub), exist_ok=True)
+    rng = random.Random(42)
+    for i in range(count):
+        if rng.random() < reply_ratio:
+            subject = f"Re: Störung [#{rng.randint(1, max_ticket)}]"
+        else:
+            subject = f"E-Mail-Server nicht erreichbar ({i})"
+        body = "Seit 9 Uhr kein Zugriff auf das Postfach.\n" * 5
+        raw = (
+            f"From: {rng.choice(SENDERS)}\n"
+            "To: helpdesk@firma.de\n"
+            f"Subject: {subject}\n"
+            f"Message-ID: <bench-{i}@firma.de>\n"
+            "Content-Type: text/plain; charset=utf-8\n\n"
+            f"{body}\n> Zitat der vorherigen Nachricht\n"
+        )
+        with open(os.path.join(path, "new", f"{i:08d}.mail"), "w") as fh:
+            fh.write(raw)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[2])
+    parser.add_argument("--messages", type=int, default=5000)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--batch-size", type=int, default=200)
+    parser.add_argument("--reply-ratio", type=float, default=0.5)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="helpdesk-mail-")
+    os.environ["HELPDESK_DATABASE_URI"] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    try:
+        from app.main import create_app
+        from app import mailgate
+
+        app = create_app()
+        spool = os.path.join(workdir, "Maildir")
+        build_spool(spool, args.messages, args.reply_ratio, max_ticket=8)
+
+        with app.app_context():
+            stats = mailgate.ingest(spool, batch_size=args.batch_size, workers=args.workers)
+
+        print(f"Nachrichten:  {stats['messages']}")
+        print(f"Tickets:      {stats['tickets']}")
+        print(f"Kommentare:   {stats['comments']}")
+        print(f"Abgelehnt:    {stats['rejected']}")
+        print(f"Laufzeit:     {stats['seconds']} s")
+        print(f"Durchsatz:    {stats['per_minute']} Nachrichten/min")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+HelpDesk Pro - Benchmark: Übertragene Bytes pro Dashboard-Aufruf
+Lädt das Dashboard samt eigener Assets wie ein Browser – einmal ohne
+Kompression, einmal mit ``Accept-Encoding: br, gzip`` – und zählt die
+übertragenen Bytes beim ersten und beim wiederholten Aufruf (Assets aus dem
+Browser-Cache, da ``immutable``). Externe Skripte (CDN) sind nicht enthalten.
+
+    python benchmarks/page_weight.py
+"""
+
+import argparse
+import gzip
+import os
+import re
+import shutil
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+ASSET_PATTERN = re.compile(rb'(?:href|src)="(/(?:assets|static)/[^"]+)"')
+
+
+def visit(client, encoding, cache):
+    """Ein Seitenaufruf; ``cache`` enthält bereits geladene, unveränderliche URLs."""
+    headers = {"Accept-Encoding": encoding} if encoding else {}
+    page = client.get("/", headers=headers)
+    total = len(page.data)
+    html = page.data
+    if page.headers.get("Content-Encoding") == "gzip":
+        html = gzip.decompress(html)
+
+    for url in ASSET_PATTERN.findall(html):
+        url = url.decode()
+        if url in cache:
+            continue
+        resp = client.get(url, headers=headers)
+        total += len(resp.data)
+        if "immutable" in resp.headers.get("Cache-Control", ""):
+            cache.add(url)
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[2])
+    parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="helpdesk-assets-")
+    os.environ["HELPDESK_DATABASE_URI"] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ["HELPDESK_ASSET_DIR"] = os.path.join(workdir, "assets")
+    try:
+        from app.main import create_app
+
+        app = create_app()
+        client = app.test_client()
+        client.post("/login", data={"username": "admin", "password": "admin123"})
+
+        print(f"{'Variante':<28} {'erster Aufruf':>14} {'Folgeaufruf':>14}")
+        for label, encoding in (("unkomprimiert", ""), ("br, gzip", "br, gzip")):
+            cache = set()
+            first = visit(client, encoding, cache)
+            repeat = visit(client, encoding, cache)
+            print(f"{label:<28} {first:>12,} B {repeat:>12,} B")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+// HelpDesk Pro - Dashboard-Diagramme (Daten aus #stats-data)
+(function () {
+    const statsData = JSON.parse(document.getElementById('stats-data').textContent);
+
+    // Status-Diagramm
+    const statusChart = new Chart(document.getElementById('statusChart'), {
+        type: 'doughnut',
+        data: {
+            labels: ['Offen', 'In Bearbeitung', 'Wartend', 'Geschlossen'],
+            datasets: [{
+                data: [statsData.offen, statsData.in_bearbeitung, statsData.wartend, statsData.geschlossen],
+                backgroundColor: ['#3b82f6', '#f59e0b', '#f97316', '#10b981'],
+                borderWidth: 0,
+            }]
+        },
+        options: {
+            responsive: true,
+            maintainAspectRatio: false,
+            cutout: '65%',
+            plugins: {
+                legend: { position: 'bottom', labels: { padding: 16, usePointStyle: true, font: { size: 12 } } }
+            }
+        }
+    });
+
+    // Kategorie-Diagramm
+    const cats = statsData.categories;
+    const categoryChart = new Chart(document.getElementById('categoryChart'), {
+        type: 'bar',
+        data: {
+            labels: ['Hardware', 'Software', 'Netzwerk', 'Zugang', 'Sonstiges'],
+            datasets: [{
+                data: [cats.hardware || 0, cats.software || 0, cats.netzwerk || 0, cats.zugang || 0, cats.sonstiges || 0],
+                backgroundColor: ['#6366f1', '#3b82f6', '#06b6d4', '#10b981', '#8b5cf6'],
+                borderRadius: 6,
+            }]
+        },
+        options: {
+            responsive: true,
+            maintainAspectRatio: false,
+            plugins: { legend: { display: false } },
+            scales: {
+                y: { beginAtZero: true, ticks: { stepSize: 1 }, grid: { color: '#f0f0f0' } },
+                x: { grid: { display: false } }
+            }
+        }
+    });
+
+    // Live-Aktualisierung: Long-Polling mit ETag. Unter ASGI wartet der Server
+    // bis zur nächsten Änderung; ein sofortiges 304 (WSGI) führt zu Intervall-Polling.
+    const statuses = ['offen', 'in_bearbeitung', 'wartend', 'geschlossen'];
+    const categories = ['hardware', 'software', 'netzwerk', 'zugang', 'sonstiges'];
+    let etag = null;
+
+    async function poll() {
+        const started = Date.now();
+        try {
+            const resp = await fetch('/api/stats/overview?wait=55', {
+                headers: etag ? { 'If-None-Match': etag } : {},
+                cache: 'no-store',
+            });
+            if (resp.status === 200) {
+                etag = resp.headers.get('ETag');
+                const data = await resp.json();
+                statusChart.data.datasets[0].data = statuses.map(s => data.by_status[s] || 0);
+                categoryChart.data.datasets[0].data = categories.map(c => data.by_category[c] || 0);
+                statusChart.update();
+                categoryChart.update();
+            } else if (resp.status !== 304) {
+                return;
+            }
+        } catch (e) {
+            // Netzwerkfehler: später erneut versuchen
+        }
+        const elapsed = Date.now() - started;
+        setTimeout(poll, elapsed < 5000 ? 30000 - elapsed : 0);
+    }
+    setTimeout(poll, 30000);
+})();
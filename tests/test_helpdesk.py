@@ -4,23 +4,50 @@ Testet Authentifizierung, Ticket-Verwaltung und API.
 """
 
 import unittest
+import asyncio
+import gzip
+import json
+import re
+import shutil
 import sys
 import os
+import tempfile
+from datetime import datetime, timedelta
+from io import BytesIO
+from unittest import mock
+
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from app.main import create_app
-from app.models import db, User, Ticket, Comment
+from app.migrations import upgrade_schema
+from app.models import (
+    db, User, Ticket, Comment, TicketEvent, Attachment, SavedView, ArchivedTicket, ArchivedComment,
+    ArchiveCount,
+)
+from app import archive, asgi, backup, history, mailgate, reports, saved_views, tenancy, tokens
 
 
 class TestBase(unittest.TestCase):
     """Basis-Klasse mit Test-Konfiguration."""
 
     def setUp(self):
+        # Eigene Datenbanken je Test – nie die helpdesk.db im Projektverzeichnis
+        self.db_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.db_dir, True)
+        env = mock.patch.dict(os.environ, {
+            "HELPDESK_DATABASE_URI": f"sqlite:///{os.path.join(self.db_dir, 'helpdesk.db')}",
+            "HELPDESK_ARCHIVE_URI": f"sqlite:///{os.path.join(self.db_dir, 'archive.db')}",
+        })
+        env.start()
+        self.addCleanup(env.stop)
+
         self.app = create_app()
-        self.app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///:memory:"
         self.app.config["TESTING"] = True
         self.app.config["WTF_CSRF_ENABLED"] = False
+        self.app.config["ATTACHMENT_DIR"] = tempfile.mkdtemp()
         self.client = self.app.test_client()
 
         with self.app.app_context():
@@ -59,6 +86,9 @@ class TestBase(unittest.TestCase):
         with self.app.app_context():
             db.session.remove()
             db.drop_all()
+            for engine in db.engines.values():
+                engine.dispose()
+        shutil.rmtree(self.app.config["ATTACHMENT_DIR"], ignore_errors=True)
 
 
 class TestAuth(TestBase):
@@ -130,6 +160,16 @@ class TestTickets(TestBase):
         }, follow_redirects=True)
         self.assertIn(b"erforderlich", resp.data)
 
+    def test_create_ticket_invalid_priority(self):
+        self.login("user", "user123")
+        resp = self.client.post("/tickets/new", data={
+            "title": "Neues Problem", "description": "Text",
+            "priority": "dringend", "category": "hardware",
+        }, follow_redirects=True)
+        self.assertIn("Ungültige Priorität".encode(), resp.data)
+        with self.app.app_context():
+            self.assertEqual(Ticket.query.count(), 1)
+
     def test_ticket_detail(self):
         self.login("admin", "admin123")
         resp = self.client.get("/tickets/1")
@@ -234,6 +274,1143 @@ class TestModels(TestBase):
             self.assertEqual(ticket.status_label, "Offen")
             self.assertEqual(ticket.category_label, "Software")
 
+    def test_enum_columns_store_codes(self):
+        with self.app.app_context():
+            row = db.session.execute(db.text(
+                "SELECT status, priority, category FROM tickets WHERE id = 1"
+            )).one()
+            self.assertEqual(tuple(row), (0, 1, 1))
+            self.assertEqual(Ticket.query.filter_by(priority="mittel").count(), 1)
+            self.assertEqual(Ticket.query.filter_by(status="unbekannt").count(), 0)
+
+            ticket = db.session.get(Ticket, 1)
+            ticket.category = "unbekannt"
+            with self.assertRaises(IntegrityError):
+                db.session.commit()
+            db.session.rollback()
+
+    def test_upgrade_converts_text_columns(self):
+        with self.app.app_context():
+            db.session.remove()
+            with db.engine.begin() as conn:
+                conn.exec_driver_sql("DROP TABLE tickets")
+                conn.exec_driver_sql(
+                    "CREATE TABLE tickets (id INTEGER PRIMARY KEY, tenant VARCHAR(40) NOT NULL, "
+                    "title VARCHAR(200) NOT NULL, description TEXT NOT NULL, "
+                    "status VARCHAR(20) NOT NULL, priority VARCHAR(20) NOT NULL, "
+                    "category VARCHAR(50) NOT NULL, created_by_id INTEGER NOT NULL, "
+                    "assigned_to_id INTEGER, created_at DATETIME, updated_at DATETIME, "
+                    "closed_at DATETIME)"
+                )
+                conn.exec_driver_sql(
+                    "CREATE INDEX ix_tickets_tenant_status ON tickets (tenant, status)"
+                )
+                conn.exec_driver_sql(
+                    "INSERT INTO tickets (id, tenant, title, description, status, priority, "
+                    "category, created_by_id) VALUES "
+                    "(1, 'default', 'A', 'x', 'geschlossen', 'Hoch', 'netzwerk', 3), "
+                    "(2, 'default', 'B', 'x', 'wartend', 'mittel', 'drucker', 3)"
+                )
+            upgrade_schema()
+
+            tickets = Ticket.query.order_by(Ticket.id).all()
+            self.assertEqual(
+                [(t.status, t.priority, t.category) for t in tickets],
+                [("geschlossen", "hoch", "netzwerk"), ("wartend", "mittel", "sonstiges")],
+            )
+            self.assertEqual(db.session.execute(db.text(
+                "SELECT typeof(status) FROM tickets WHERE id = 1"
+            )).scalar(), "integer")
+            names = {ix["name"] for ix in db.inspect(db.engine).get_indexes("tickets")}
+            self.assertIn("ix_tickets_tenant_status", names)
+            self.assertIn("ix_tickets_tenant_created_at", names)
+            comments_sql = db.session.execute(db.text(
+                "SELECT sql FROM sqlite_master WHERE name = 'comments'"
+            )).scalar()
+            self.assertIn("REFERENCES tickets (id)", comments_sql)
+
+
+class TestHistory(TestBase):
+    """Tests für den Ticket-Verlauf."""
+
+    def test_update_records_changes(self):
+        self.login("tech", "tech123")
+        self.client.post("/tickets/1/update", data={
+            "status": "wartend", "priority": "hoch",
+        })
+        with self.app.app_context():
+            entry = TicketEvent.query.filter_by(ticket_id=1, kind="geaendert").one()
+            self.assertEqual(entry.change_dict["status"], ["offen", "wartend"])
+            self.assertEqual(entry.change_dict["priority"], ["mittel", "hoch"])
+            self.assertNotIn("assigned_to_id", entry.change_dict)
+            self.assertEqual(entry.changes, '{"s":["offen","wartend"],"p":["mittel","hoch"]}')
+
+    def test_comment_and_timeline(self):
+        self.login("tech", "tech123")
+        self.client.post("/tickets/1/comment", data={
+            "content": "Geheim", "is_internal": "on",
+        })
+        resp = self.client.get("/tickets/1")
+        self.assertIn("Interner Kommentar hinzugefügt".encode(), resp.data)
+
+        self.client.get("/logout")
+        self.login("user", "user123")
+        resp = self.client.get("/tickets/1")
+        self.assertIn(b"Verlauf", resp.data)
+        self.assertNotIn("Interner Kommentar hinzugefügt".encode(), resp.data)
+
+    def test_events_are_append_only(self):
+        with self.app.app_context():
+            ticket = Ticket.query.first()
+            entry = history.record_event(ticket, "geaendert", {"status": ("offen", "wartend")})
+            db.session.commit()
+            entry.kind = "erstellt"
+            with self.assertRaises(ValueError):
+                db.session.commit()
+            db.session.rollback()
+
+    def test_status_durations(self):
+        from datetime import timedelta
+        with self.app.app_context():
+            ticket = Ticket.query.first()
+            start = ticket.created_at
+            history.record_event(ticket, "erstellt", {"status": (None, "offen")}, created_at=start)
+            history.record_event(ticket, "geaendert", {"status": ("offen", "wartend")},
+                                 created_at=start + timedelta(hours=1))
+            history.record_event(ticket, "geaendert", {"status": ("wartend", "geschlossen")},
+                                 created_at=start + timedelta(hours=4))
+            db.session.commit()
+            durations = history.status_durations(history.ticket_timeline(ticket.id))
+            self.assertEqual(durations["offen"], 3600)
+            self.assertEqual(durations["wartend"], 3 * 3600)
+
+
+class TestReports(TestBase):
+    """Tests für Reporting-Rollups und Report-API."""
+
+    def _bucket_totals(self):
+        from app.models import ReportBucket
+        rows = ReportBucket.query.all()
+        return sum(b.opened for b in rows), sum(b.closed for b in rows)
+
+    def test_upgrade_backfills_empty_rollups(self):
+        from app import migrations
+        from app.models import ReportBucket
+        with self.app.app_context():
+            # Bestandsdatenbank: Ticket 1 ohne Rollup, Tabelle gerade angelegt
+            self.assertEqual(self._bucket_totals(), (0, 0))
+            upgrade_schema()
+            self.assertEqual(self._bucket_totals(), (1, 0))
+            # Bereits gefüllte Rollups bleiben unangetastet
+            rebuild = mock.Mock()
+            with mock.patch.dict(migrations.DERIVED_TABLES, {
+                ReportBucket.__table__: (rebuild, (Ticket, ArchivedTicket)),
+            }):
+                upgrade_schema()
+            rebuild.assert_not_called()
+
+    def test_rollups_follow_writes(self):
+        self.login("tech", "tech123")
+        self.client.post("/tickets/new", data={
+            "title": "Rollup", "description": "Test",
+            "priority": "hoch", "category": "hardware",
+        })
+        self.client.post("/tickets/2/update", data={"status": "geschlossen"})
+        with self.app.app_context():
+            self.assertEqual(self._bucket_totals(), (1, 1))
+
+        self.client.post("/tickets/2/update", data={"status": "offen"})
+        with self.app.app_context():
+            self.assertEqual(self._bucket_totals(), (1, 0))
+
+    def _bucket_snapshot(self):
+        from app.models import ReportBucket
+        return {
+            (b.day, b.category, b.priority, b.assignee_id): (b.opened, b.closed)
+            for b in ReportBucket.query.all() if b.opened or b.closed
+        }
+
+    def test_reassignment_matches_rebuild(self):
+        self.login("user", "user123")
+        self.client.post("/tickets/new", data={
+            "title": "Umzug", "description": "Test",
+            "priority": "mittel", "category": "hardware",
+        })
+        self.client.get("/logout")
+        self.login("tech", "tech123")
+        self.client.post("/tickets/2/update", data={"assigned_to_id": "2", "priority": "hoch"})
+
+        for query, expected in (("priority=mittel", 0), ("priority=hoch", 1),
+                                ("assignee_id=2", 1)):
+            resp = self.client.get(f"/api/reports/backlog?category=hardware&{query}")
+            self.assertEqual(resp.get_json()["days"][-1]["backlog"], expected, query)
+
+        self.client.post("/tickets/2/update", data={"status": "geschlossen"})
+        self.client.post("/tickets/2/update", data={"priority": "kritisch"})
+        with self.app.app_context():
+            incremental = self._bucket_snapshot()
+            db.session.delete(db.session.get(Ticket, 1))
+            db.session.commit()
+            reports.rebuild()
+            self.assertEqual(incremental, self._bucket_snapshot())
+
+    def test_rebuild_matches_tickets(self):
+        with self.app.app_context():
+            reports.rebuild()
+            self.assertEqual(self._bucket_totals(), (Ticket.query.count(), 0))
+
+    def test_quantile_sketch(self):
+        sketch = reports.QuantileSketch()
+        for value in range(1, 10001):
+            sketch.add(value)
+        median = sketch.quantile(0.5)
+        self.assertAlmostEqual(median, 5000, delta=5000 * 0.02)
+        restored = reports.QuantileSketch.from_json(sketch.to_json())
+        self.assertEqual(restored.count, 10000)
+
+    def test_report_endpoints(self):
+        self.login("tech", "tech123")
+        self.client.post("/tickets/1/update", data={"status": "geschlossen"})
+        with self.app.app_context():
+            reports.rebuild()
+
+        resp = self.client.get("/api/reports/volume?start=2000-01-01&end=2000-01-03")
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(len(resp.get_json()["days"]), 3)
+
+        resp = self.client.get("/api/reports/resolution")
+        groups = resp.get_json()["groups"]
+        self.assertEqual(groups["software"]["closed"], 1)
+        self.assertIn("p90_hours", groups["software"])
+
+        resp = self.client.get("/api/reports/backlog")
+        self.assertEqual(resp.get_json()["days"][-1]["backlog"], 0)
+
+        resp = self.client.get("/api/reports/volume?start=kaputt")
+        self.assertEqual(resp.status_code, 400)
+
+    def test_reports_require_techniker(self):
+        self.login("user", "user123")
+        resp = self.client.get("/api/reports/volume")
+        self.assertEqual(resp.status_code, 403)
+
+
+class TestAnalytics(TestBase):
+    """Tests für den spaltenorientierten Analyse-Snapshot."""
+
+    def test_pivot_requires_admin(self):
+        self.login("tech", "tech123")
+        resp = self.client.get("/api/analytics/pivot")
+        self.assertEqual(resp.status_code, 403)
+
+    def test_pivot_and_incremental_refresh(self):
+        self.login("admin", "admin123")
+        resp = self.client.get("/api/analytics/pivot?rows=category&cols=priority")
+        self.assertEqual(resp.status_code, 200)
+        data = resp.get_json()
+        row = data["rows"].index("software")
+        col = data["cols"].index("mittel")
+        self.assertEqual(data["values"][row][col], 1)
+        self.assertGreater(data["memory_bytes"]["columns"], 0)
+
+        self.client.post("/tickets/1/update", data={"priority": "hoch"})
+        self.client.post("/tickets/new", data={
+            "title": "Neu", "description": "x",
+            "priority": "hoch", "category": "software",
+        })
+        data = self.client.get(
+            "/api/analytics/pivot?rows=department&cols=priority&category=software"
+        ).get_json()
+        self.assertEqual(data["tickets"], 2)
+        col = data["cols"].index("hoch")
+        self.assertEqual(sum(r[col] for r in data["values"]), 2)
+        self.assertEqual(sum(map(sum, data["values"])), 2)
+
+    def test_pivot_by_week(self):
+        self.login("admin", "admin123")
+        data = self.client.get("/api/analytics/pivot?rows=week").get_json()
+        self.assertEqual(len(data["rows"]), 1)
+        self.assertEqual(data["values"], [[1]])
+
+    def test_deleted_tickets_leave_snapshot(self):
+        self.login("admin", "admin123")
+        self.client.post("/tickets/new", data={"title": "Weg", "description": "x"})
+        data = self.client.get("/api/analytics/pivot?rows=status").get_json()
+        self.assertEqual(data["tickets"], 2)
+        self.client.delete("/api/v1/tickets/1")
+        data = self.client.get("/api/analytics/pivot?rows=status").get_json()
+        self.assertEqual(data["tickets"], 1)
+        self.assertEqual(sum(map(sum, data["values"])), 1)
+
+    def test_department_of_creator_in_other_tenant(self):
+        with self.app.app_context():
+            creator = User(username="neu", email="neu@test.de", full_name="Neu")
+            creator.set_password("neu123")
+            db.session.add(creator)
+            db.session.flush()
+            db.session.add(Ticket(title="Alt", description="x", created_by_id=creator.id))
+            creator.tenant = "tochter"
+            db.session.commit()
+        self.login("admin", "admin123")
+        data = self.client.get("/api/analytics/pivot?rows=department").get_json()
+        self.assertEqual(data["tickets"], 2)
+        self.assertEqual(data["values"][data["rows"].index("")], [2])
+
+    def test_unknown_dimension(self):
+        self.login("admin", "admin123")
+        resp = self.client.get("/api/analytics/pivot?rows=farbe")
+        self.assertEqual(resp.status_code, 400)
+
+
+class TestAttachments(TestBase):
+    """Tests für Dateianhänge."""
+
+    def _upload(self, data, name="log.txt", internal=False):
+        form = {"content": "Mit Anhang", "attachments": (BytesIO(data), name)}
+        if internal:
+            form["is_internal"] = "on"
+        return self.client.post("/tickets/1/comment", data=form,
+                                content_type="multipart/form-data")
+
+    def test_upload_dedup_and_download(self):
+        self.login("user", "user123")
+        payload = b"0123456789" * 1000
+        self._upload(payload)
+        self._upload(payload, name="kopie.txt")
+
+        with self.app.app_context():
+            files = Attachment.query.order_by(Attachment.id).all()
+            self.assertEqual(len(files), 2)
+            self.assertEqual(files[0].sha256, files[1].sha256)
+            attachment_id = files[0].id
+        blobs = [f for _, _, names in os.walk(self.app.config["ATTACHMENT_DIR"]) for f in names]
+        self.assertEqual(len(blobs), 1)
+
+        url = f"/attachments/{attachment_id}/log.txt"
+        resp = self.client.get(url)
+        self.assertEqual(resp.data, payload)
+        self.assertIn("immutable", resp.headers["Cache-Control"])
+        etag = resp.headers["ETag"]
+
+        resp = self.client.get(url, headers={"Range": "bytes=10-19"})
+        self.assertEqual(resp.status_code, 206)
+        self.assertEqual(resp.data, payload[10:20])
+
+        resp = self.client.get(url, headers={"If-None-Match": etag})
+        self.assertEqual(resp.status_code, 304)
+
+    def test_quota(self):
+        self.app.config["ATTACHMENT_QUOTA_BYTES"] = 1000
+        self.login("user", "user123")
+        resp = self._upload(b"x" * 2000)
+        self.assertEqual(resp.status_code, 302)
+        with self.app.app_context():
+            self.assertEqual(Attachment.query.count(), 0)
+        leftovers = [f for _, _, names in os.walk(self.app.config["ATTACHMENT_DIR"]) for f in names]
+        self.assertEqual(leftovers, [])
+
+    def test_unstored_uploads_removed(self):
+        self.login("user", "user123")
+        # Ohne Kommentartext werden beide Dateien nicht übernommen
+        resp = self.client.post("/tickets/1/comment", data={
+            "content": "",
+            "attachments": [(BytesIO(b"a" * 100), "eins.txt"), (BytesIO(b"b" * 100), "zwei.txt")],
+        }, content_type="multipart/form-data")
+        self.assertEqual(resp.status_code, 302)
+        leftovers = [f for _, _, names in os.walk(self.app.config["ATTACHMENT_DIR"]) for f in names]
+        self.assertEqual(leftovers, [])
+
+    def test_internal_attachment_hidden_from_user(self):
+        self.login("tech", "tech123")
+        self._upload(b"geheim", internal=True)
+        self.client.get("/logout")
+        self.login("user", "user123")
+        resp = self.client.get("/attachments/1/log.txt")
+        self.assertEqual(resp.status_code, 403)
+
+
+class TestMailGateway(TestBase):
+    """Tests für den E-Mail-Eingang."""
+
+    def _maildir(self, messages):
+        path = tempfile.mkdtemp()
+        for sub in ("new", "cur", "tmp"):
+            os.mkdir(os.path.join(path, sub))
+        for i, (sender, subject, body) in enumerate(messages):
+            raw = (f"From: {sender}\nTo: helpdesk@test.de\nSubject: {subject}\n"
+                   f"Content-Type: text/plain; charset=utf-8\n\n{body}\n")
+            with open(os.path.join(path, "new", f"{i:04d}.mail"), "w") as fh:
+                fh.write(raw)
+        self.addCleanup(shutil.rmtree, path, True)
+        return path
+
+    def test_ingest_tickets_and_replies(self):
+        path = self._maildir([
+            ("Normal User <user@test.de>", "Maus defekt", "Die Maus klickt nicht."),
+            ("user@test.de", "Re: Test Ticket [#1]", "Noch da?\n> alter Text"),
+            ("fremd@example.com", "Spam", "Kaufen!"),
+        ])
+        with self.app.app_context():
+            stats = mailgate.ingest(path, batch_size=2, workers=0)
+            self.assertEqual(stats["messages"], 3)
+            self.assertEqual(stats["tickets"], 1)
+            self.assertEqual(stats["comments"], 1)
+            self.assertEqual(stats["rejected"], 1)
+
+            ticket = Ticket.query.filter_by(title="Maus defekt").one()
+            self.assertEqual(ticket.creator.username, "user")
+            comment = Comment.query.filter_by(ticket_id=1).one()
+            self.assertEqual(comment.content, "Noch da?")
+            self.assertEqual(TicketEvent.query.filter_by(kind="kommentar").count(), 1)
+
+        self.assertEqual(os.listdir(os.path.join(path, "new")), [])
+        self.assertEqual(len(os.listdir(os.path.join(path, "cur"))), 3)
+
+    def test_oversized_ticket_tag_is_untagged(self):
+        path = self._maildir([
+            ("user@test.de", "Re: [#99999999999999999999]", "Welches Ticket?"),
+            ("user@test.de", "Re: Test Ticket [#1]", "Noch da?"),
+        ])
+        with self.app.app_context():
+            stats = mailgate.ingest(path, batch_size=10, workers=0)
+            self.assertEqual((stats["tickets"], stats["comments"]), (1, 1))
+            self.assertEqual(
+                Ticket.query.filter(Ticket.id != 1).one().description, "Welches Ticket?"
+            )
+
+    def test_mbox_ingested_once(self):
+        workdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, workdir, True)
+        path = os.path.join(workdir, "helpdesk.mbox")
+        with open(path, "w") as fh:
+            fh.write("From user@test.de Mon Jan  1 00:00:00 2024\n"
+                     "From: user@test.de\nSubject: Drucker\nMessage-ID: <1@test.de>\n\n"
+                     "Papierstau\n\n"
+                     "From user@test.de Mon Jan  1 00:01:00 2024\n"
+                     "From: user@test.de\nSubject: Monitor\n\nFlackert\n\n")
+        with self.app.app_context():
+            first = mailgate.ingest(path, workers=0)
+            second = mailgate.ingest(path, workers=0)
+            self.assertEqual(first["tickets"], 2)
+            self.assertEqual(second["tickets"], 0)
+            self.assertEqual(second["duplicates"], 2)
+            self.assertEqual(Ticket.query.filter_by(title="Drucker").count(), 1)
+
+    def test_reply_to_closed_ticket_opens_new_one(self):
+        with self.app.app_context():
+            Ticket.query.get(1).status = "geschlossen"
+            db.session.commit()
+        path = self._maildir([("user@test.de", "AW: [#1] Test", "Wieder kaputt")])
+        with self.app.app_context():
+            stats = mailgate.ingest(path, workers=0)
+            self.assertEqual(stats["tickets"], 1)
+            ticket = Ticket.query.filter_by(title="Test").one()
+            self.assertTrue(ticket.description.startswith("Bezug: Ticket #1"))
+
+
+class TestApiV1(TestBase):
+    """Tests für die REST-API v1."""
+
+    def test_requires_auth(self):
+        resp = self.client.get("/api/v1/tickets")
+        self.assertEqual(resp.status_code, 401)
+
+    def test_list_with_fields_and_etag(self):
+        self.login("tech", "tech123")
+        resp = self.client.get("/api/v1/tickets?fields=status,priority")
+        self.assertEqual(resp.status_code, 200)
+        data = resp.get_json()
+        self.assertEqual(data["total"], 1)
+        self.assertEqual(data["tickets"][0], {"id": 1, "status": "offen", "priority": "mittel"})
+
+        etag = resp.headers["ETag"]
+        resp = self.client.get("/api/v1/tickets?fields=status,priority",
+                               headers={"If-None-Match": etag})
+        self.assertEqual(resp.status_code, 304)
+
+        self.client.patch("/api/v1/tickets/1", json={"status": "wartend"})
+        resp = self.client.get("/api/v1/tickets?fields=status,priority",
+                               headers={"If-None-Match": etag})
+        self.assertEqual(resp.status_code, 200)
+
+    def test_batch_get(self):
+        self.login("tech", "tech123")
+        resp = self.client.get("/api/v1/tickets?ids=1,99&fields=title")
+        data = resp.get_json()
+        self.assertEqual(data["tickets"], [{"id": 1, "title": "Test Ticket"}])
+        self.assertEqual(data["missing"], [99])
+
+    def test_unknown_field(self):
+        self.login("tech", "tech123")
+        resp = self.client.get("/api/v1/tickets?fields=passwort")
+        self.assertEqual(resp.status_code, 400)
+
+    def test_list_rejects_invalid_numbers(self):
+        self.login("tech", "tech123")
+        for query in ("limit=-1", "limit=0", "offset=-5", "assigned_to_id=abc",
+                      "assigned_to_id=99999999999999999999", "ids=99999999999999999999",
+                      "ids=1,x"):
+            resp = self.client.get(f"/api/v1/tickets?{query}")
+            self.assertEqual(resp.status_code, 400, query)
+            self.assertIn("error", resp.get_json())
+        resp = self.client.get("/api/v1/tickets?limit=1000&assigned_to_id=2")
+        self.assertEqual((resp.status_code, resp.get_json()["limit"]), (200, 500))
+
+    def test_create_update_delete(self):
+        self.login("user", "user123")
+        resp = self.client.post("/api/v1/tickets", json={
+            "title": "API-Ticket", "description": "Per API", "priority": "hoch",
+        })
+        self.assertEqual(resp.status_code, 201)
+        ticket_id = resp.get_json()["id"]
+        self.assertTrue(resp.headers["Location"].endswith(f"/api/v1/tickets/{ticket_id}"))
+
+        resp = self.client.patch(f"/api/v1/tickets/{ticket_id}", json={"status": "geschlossen"})
+        self.assertEqual(resp.status_code, 403)
+
+        self.client.get("/logout")
+        self.login("admin", "admin123")
+        etag = self.client.get(f"/api/v1/tickets/{ticket_id}").headers["ETag"]
+        resp = self.client.patch(f"/api/v1/tickets/{ticket_id}", json={"status": "geschlossen"},
+                                 headers={"If-Match": etag})
+        self.assertEqual(resp.status_code, 200)
+        self.assertIsNotNone(resp.get_json()["closed_at"])
+
+        resp = self.client.patch(f"/api/v1/tickets/{ticket_id}", json={"priority": "niedrig"},
+                                 headers={"If-Match": etag})
+        self.assertEqual(resp.status_code, 412)
+
+        resp = self.client.delete(f"/api/v1/tickets/{ticket_id}")
+        self.assertEqual(resp.status_code, 204)
+        self.assertEqual(self.client.get(f"/api/v1/tickets/{ticket_id}").status_code, 404)
+        # Rollups: das gelöschte Ticket zählt weder als eröffnet noch als geschlossen
+        from app.models import ReportBucket
+        with self.app.app_context():
+            totals = db.session.execute(db.select(
+                func.sum(ReportBucket.opened), func.sum(ReportBucket.closed)
+            )).one()
+            self.assertEqual(tuple(totals), (0, 0))
+
+    def test_patch_rejects_malformed_payload(self):
+        self.login("admin", "admin123")
+        for body in ([1, 2], "text", {"assigned_to_id": "zwei"}, {"assigned_to_id": [2]}):
+            resp = self.client.patch("/api/v1/tickets/1", json=body)
+            self.assertEqual(resp.status_code, 400, body)
+        resp = self.client.post("/api/v1/tickets", json=["x"])
+        self.assertEqual(resp.status_code, 400)
+
+    def test_user_sees_only_own_tickets(self):
+        with self.app.app_context():
+            tech = User.query.filter_by(username="tech").first()
+            db.session.add(Ticket(title="Fremd", description="x", created_by_id=tech.id))
+            db.session.commit()
+        self.login("user", "user123")
+        data = self.client.get("/api/v1/tickets").get_json()
+        self.assertEqual([t["title"] for t in data["tickets"]], ["Test Ticket"])
+        self.assertEqual(self.client.get("/api/v1/tickets/2").status_code, 404)
+
+
+class TestApiTokens(TestBase):
+    """Tests für API-Tokens."""
+
+    def _issue(self, scope):
+        self.login("tech", "tech123")
+        resp = self.client.post("/api/v1/tokens", json={"name": "Monitoring", "scope": scope})
+        self.assertEqual(resp.status_code, 201)
+        self.client.get("/logout")
+        data = resp.get_json()
+        return data["id"], {"Authorization": f"Bearer {data['token']}"}
+
+    def test_bearer_token_without_user_query(self):
+        from sqlalchemy import event
+        _, headers = self._issue("read")
+        client = self.app.test_client()
+        self.assertEqual(client.get("/api/v1/tickets", headers=headers).status_code, 200)
+
+        statements = []
+        with self.app.app_context():
+            engine = db.engine
+        listener = lambda conn, cursor, stmt, *a: statements.append(stmt)
+        event.listen(engine, "before_cursor_execute", listener)
+        try:
+            resp = client.get("/api/v1/tickets", headers=headers)
+        finally:
+            event.remove(engine, "before_cursor_execute", listener)
+        self.assertEqual(resp.status_code, 200)
+        self.assertFalse([s for s in statements if "FROM users" in s or "api_tokens" in s])
+        self.assertNotIn("Set-Cookie", resp.headers)
+
+    def test_read_scope_cannot_write(self):
+        _, headers = self._issue("read")
+        resp = self.client.post("/api/v1/tickets", json={"title": "x", "description": "y"},
+                                headers=headers)
+        self.assertEqual(resp.status_code, 403)
+
+    def test_write_scope_and_revocation(self):
+        token_id, headers = self._issue("write")
+        resp = self.client.patch("/api/v1/tickets/1", json={"status": "wartend"}, headers=headers)
+        self.assertEqual(resp.status_code, 200)
+
+        self.login("tech", "tech123")
+        self.assertEqual(self.client.delete(f"/api/v1/tokens/{token_id}").status_code, 204)
+        self.client.get("/logout")
+        self.assertEqual(self.client.get("/api/v1/tickets", headers=headers).status_code, 401)
+
+    def test_create_rejects_malformed_payload(self):
+        from app.models import ApiToken
+        self.login("tech", "tech123")
+        for payload in (["read"], {"name": ["x"]}, {"scope": 1}, {"scope": "admin"}):
+            resp = self.client.post("/api/v1/tokens", json=payload)
+            self.assertEqual(resp.status_code, 400, payload)
+        with self.app.app_context():
+            self.assertEqual(ApiToken.query.count(), 0)
+
+    def test_invalid_token_and_html_routes(self):
+        _, headers = self._issue("write")
+        bad = {"Authorization": headers["Authorization"][:-2] + "xx"}
+        self.assertEqual(self.client.get("/api/v1/tickets", headers=bad).status_code, 401)
+        # Das Geheimnis darf selbst Unterstriche enthalten
+        self.assertEqual(tokens.split_token("hdp_abc123_x_y-z"), "abc123")
+        self.assertIsNone(tokens.split_token("abc123_xyz"))
+        # Tokens gelten nicht für die HTML-Oberfläche
+        self.assertEqual(self.client.get("/tickets", headers=headers).status_code, 302)
+
+
+class TestSavedViews(TestBase):
+    """Tests für gespeicherte Ansichten."""
+
+    def _save(self, name, **filters):
+        data = {"name": name, "status": "alle", "priority": "alle", "category": "alle", "q": ""}
+        data.update(filters)
+        return self.client.post("/views", data=data, follow_redirects=True)
+
+    def test_save_and_show_with_count(self):
+        self.login("tech", "tech123")
+        resp = self._save("Offene Software", status="offen", category="software")
+        self.assertIn("Offene Software".encode(), resp.data)
+        self.assertIn(b"Ansicht l\xc3\xb6schen", resp.data)
+
+        with self.app.app_context():
+            tech = User.query.filter_by(username="tech").first()
+            entries = saved_views.get_cache(self.app).entries(tech)
+        self.assertEqual([(e.name, e.count) for e in entries], [("Offene Software", 1)])
+        self.assertEqual(entries[0].args, {"status": "offen", "category": "software"})
+
+    def test_counts_in_one_query(self):
+        from sqlalchemy import event
+        with self.app.app_context():
+            tech = User.query.filter_by(username="tech").first()
+            for name, status in [("A", "offen"), ("B", "geschlossen"), ("C", None)]:
+                db.session.add(SavedView(user_id=tech.id, name=name, status=status))
+            db.session.commit()
+            views = SavedView.query.filter_by(user_id=tech.id).all()
+
+            statements = []
+            listener = lambda conn, cursor, stmt, *a: statements.append(stmt)
+            event.listen(db.engine, "before_cursor_execute", listener)
+            try:
+                counts = saved_views.count_views(tech, views)
+            finally:
+                event.remove(db.engine, "before_cursor_execute", listener)
+        self.assertEqual(len(statements), 1)
+        self.assertEqual(sorted(counts.values()), [0, 1, 1])
+
+    def test_cache_invalidated_by_ticket_write(self):
+        self.login("tech", "tech123")
+        self._save("Wartend", status="wartend")
+        with self.app.app_context():
+            tech = User.query.filter_by(username="tech").first()
+            cache = saved_views.get_cache(self.app)
+            self.assertEqual(cache.entries(tech)[0].count, 0)
+            first = cache.entries(tech)
+            self.assertIs(cache.entries(tech), first)
+
+        self.client.post("/tickets/1/update", data={"status": "wartend"})
+        with self.app.app_context():
+            tech = User.query.filter_by(username="tech").first()
+            self.assertEqual(saved_views.get_cache(self.app).entries(tech)[0].count, 1)
+
+    def test_scope_and_delete(self):
+        self.login("user", "user123")
+        self._save("Alle offenen", status="offen")
+        with self.app.app_context():
+            view = SavedView.query.filter_by(name="Alle offenen").first()
+            admin = User.query.filter_by(username="admin").first()
+            other = SavedView(user_id=admin.id, name="Admin", status="offen")
+            db.session.add(other)
+            db.session.commit()
+            view_id, other_id = view.id, other.id
+
+        self.assertEqual(self.client.post(f"/views/{other_id}/delete").status_code, 403)
+        self.client.post(f"/views/{view_id}/delete")
+        with self.app.app_context():
+            self.assertIsNone(db.session.get(SavedView, view_id))
+
+
+class TestAssets(TestBase):
+    """Tests für Asset-Fingerprinting und Kompression."""
+
+    def _stylesheet_url(self):
+        resp = self.client.get("/login")
+        match = re.search(rb'href="(/assets/css/style\.[0-9a-f]{12}\.css)"', resp.data)
+        self.assertIsNotNone(match)
+        return match.group(1).decode()
+
+    def test_fingerprinted_precompressed_asset(self):
+        url = self._stylesheet_url()
+        with open(os.path.join(self.app.static_folder, "css", "style.css"), "rb") as fh:
+            original = fh.read()
+
+        resp = self.client.get(url, headers={"Accept-Encoding": "gzip"})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.headers["Content-Encoding"], "gzip")
+        self.assertIn("immutable", resp.headers["Cache-Control"])
+        self.assertIn("Accept-Encoding", resp.headers["Vary"])
+        self.assertEqual(gzip.decompress(resp.data), original)
+
+        plain = self.client.get(url)
+        self.assertNotIn("Content-Encoding", plain.headers)
+        self.assertEqual(plain.data, original)
+
+        again = self.client.get(url, headers={"If-None-Match": plain.headers["ETag"]})
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(self.client.get("/assets/css/style.000000000000.css").status_code, 404)
+
+    def test_dynamic_gzip_threshold(self):
+        self.login("admin", "admin123")
+        resp = self.client.get("/", headers={"Accept-Encoding": "gzip"})
+        self.assertEqual(resp.headers.get("Content-Encoding"), "gzip")
+        self.assertIn(b"stats-data", gzip.decompress(resp.data))
+
+        # Kleine Antworten bleiben unkomprimiert
+        resp = self.client.get("/api/health", headers={"Accept-Encoding": "gzip"})
+        self.assertNotIn("Content-Encoding", resp.headers)
+        resp = self.client.get("/")
+        self.assertNotIn("Content-Encoding", resp.headers)
+
+    def test_gzip_etag_per_encoding(self):
+        self.app.config["COMPRESS_MIN_BYTES"] = 0
+        self.login("tech", "tech123")
+        plain = self.client.get("/api/v1/tickets")
+        self.assertIn("Accept-Encoding", plain.headers["Vary"])
+        packed = self.client.get("/api/v1/tickets", headers={"Accept-Encoding": "gzip"})
+        self.assertEqual(packed.headers["Content-Encoding"], "gzip")
+        self.assertEqual(packed.headers["ETag"], plain.headers["ETag"][:-1] + '-gzip"')
+
+        # Der gzip-ETag validiert weiter und kommt in der 304 zurück
+        resp = self.client.get("/api/v1/tickets", headers={
+            "Accept-Encoding": "gzip", "If-None-Match": packed.headers["ETag"],
+        })
+        self.assertEqual(resp.status_code, 304)
+        self.assertEqual(resp.headers["ETag"], packed.headers["ETag"])
+        self.assertIn("Accept-Encoding", resp.headers["Vary"])
+        resp = self.client.get("/api/v1/tickets", headers={"If-None-Match": plain.headers["ETag"]})
+        self.assertEqual(resp.status_code, 304)
+        self.assertEqual(resp.headers["ETag"], plain.headers["ETag"])
+
+
+class TestTenancy(TestBase):
+    """Tests für die Mandantentrennung."""
+
+    def setUp(self):
+        super().setUp()
+        with self.app.app_context():
+            other = User(username="tech2", email="tech2@tochter.de", full_name="Tech Tochter",
+                         role="techniker", tenant="tochter")
+            other.set_password("tech123")
+            db.session.add(other)
+            db.session.flush()
+            ticket = Ticket(tenant="tochter", title="Fremdes Ticket", description="x",
+                            priority="kritisch", category="netzwerk", created_by_id=other.id)
+            db.session.add(ticket)
+            db.session.flush()
+            reports.record_creation(ticket)
+            db.session.commit()
+            self.foreign_id = ticket.id
+
+    def test_queries_scoped_to_tenant(self):
+        self.login("tech", "tech123")
+        resp = self.client.get("/tickets")
+        self.assertIn(b"Test Ticket", resp.data)
+        self.assertNotIn(b"Fremdes Ticket", resp.data)
+        self.assertEqual(self.client.get(f"/tickets/{self.foreign_id}").status_code, 404)
+        self.assertEqual(self.client.get(f"/api/v1/tickets/{self.foreign_id}").status_code, 404)
+
+        overview = self.client.get("/api/stats/overview").get_json()
+        self.assertEqual(overview["by_priority"]["kritisch"], 0)
+        self.assertEqual(sum(overview["by_status"].values()), 1)
+        ids = [t["id"] for t in self.client.get("/api/v1/tickets").get_json()["tickets"]]
+        self.assertEqual(ids, [1])
+
+        # Nur das fremde Ticket steht im Rollup – für "default" bleibt es leer
+        volume = self.client.get("/api/reports/volume").get_json()
+        self.assertEqual(sum(day["opened"] for day in volume["days"]), 0)
+
+    def test_new_ticket_inherits_tenant(self):
+        self.client.post("/login", data={"username": "tech2", "password": "tech123"})
+        self.client.post("/tickets/new", data={"title": "Drucker", "description": "leer"})
+        with self.app.app_context():
+            self.assertEqual(Ticket.query.filter_by(title="Drucker").one().tenant, "tochter")
+            self.assertEqual(
+                [u.username for u in tenancy.colleagues(User.query.filter_by(username="tech2").one())],
+                ["tech2"],
+            )
+
+    def test_form_assignment_checks_tenant(self):
+        self.login("tech", "tech123")
+        with self.app.app_context():
+            foreign_tech = User.query.filter_by(username="tech2").one().id
+        for value in (str(foreign_tech), "3", "abc", "999"):
+            resp = self.client.post("/tickets/1/update", data={"assigned_to_id": value})
+            self.assertEqual(resp.status_code, 302)
+        self.client.post("/tickets/1/update", data={"assigned_to_id": "2"})
+        with self.app.app_context():
+            self.assertEqual(db.session.get(Ticket, 1).assigned_to_id, 2)
+        self.client.post("/tickets/1/update", data={"assigned_to_id": str(foreign_tech)})
+        with self.app.app_context():
+            self.assertEqual(db.session.get(Ticket, 1).assigned_to_id, 2)
+
+    def test_user_tenant_command(self):
+        result = self.app.test_cli_runner().invoke(args=["user-tenant", "user", "tochter"])
+        self.assertEqual(result.exit_code, 0, result.output)
+        with self.app.app_context():
+            self.assertEqual(User.query.filter_by(username="user").one().tenant, "tochter")
+        result = self.app.test_cli_runner().invoke(args=["user-tenant", "niemand", "tochter"])
+        self.assertNotEqual(result.exit_code, 0)
+
+    def test_export_tenant(self):
+        from sqlalchemy import create_engine
+        workdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, workdir, True)
+        uri = f"sqlite:///{os.path.join(workdir, 'tochter.db')}"
+        with self.app.app_context():
+            copied = tenancy.export_tenant("tochter", uri)
+            self.assertEqual(copied["users"], 1)
+            self.assertEqual(copied["tickets"], 1)
+            with self.assertRaises(ValueError):
+                tenancy.export_tenant("tochter", uri)
+
+        engine = create_engine(uri)
+        with engine.connect() as conn:
+            titles = conn.exec_driver_sql("SELECT title, tenant FROM tickets").all()
+        engine.dispose()
+        self.assertEqual(titles, [("Fremdes Ticket", "tochter")])
+
+    def test_export_archived_events_in_batches(self):
+        workdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, workdir, True)
+        with self.app.app_context():
+            tech2 = User.query.filter_by(username="tech2").one().id
+            for ticket_id in (100, 101, 102):
+                db.session.add(ArchivedTicket(
+                    id=ticket_id, tenant="tochter", title="Alt", description="x",
+                    status="geschlossen", priority="mittel", category="software",
+                    created_by_id=tech2,
+                ))
+                db.session.add(TicketEvent(ticket_id=ticket_id, user_id=None, kind="archived"))
+            # Passt auf beide Bedingungen und darf nur einmal kopiert werden
+            db.session.add(TicketEvent(ticket_id=101, user_id=tech2, kind="updated"))
+            db.session.commit()
+            with mock.patch.object(tenancy, "ID_BATCH_SIZE", 2):
+                copied = tenancy.export_tenant(
+                    "tochter", f"sqlite:///{os.path.join(workdir, 'tochter.db')}"
+                )
+        self.assertEqual(copied["ticket_events"], 4)
+
+
+class TestArchive(TestBase):
+    """Tests für das Archiv geschlossener Tickets."""
+
+    def setUp(self):
+        super().setUp()
+        # Ticket 1 bekommt einen internen Anhang und wird vor zwei Jahren geschlossen
+        self.login("tech", "tech123")
+        self.client.post("/tickets/1/comment", data={
+            "content": "Intern", "is_internal": "on",
+            "attachments": (BytesIO(b"geheim"), "log.txt"),
+        }, content_type="multipart/form-data")
+        self.client.get("/logout")
+        with self.app.app_context():
+            long_ago = datetime.utcnow() - timedelta(days=730)
+            ticket = db.session.get(Ticket, 1)
+            ticket.status, ticket.closed_at = "geschlossen", long_ago
+            db.session.commit()
+
+    def _archive(self):
+        with self.app.app_context():
+            return archive.archive_closed(365, batch_size=10)
+
+    def test_archive_moves_rows(self):
+        self.assertEqual(self._archive(), {"tickets": 1, "comments": 1, "batches": 1})
+        with self.app.app_context():
+            self.assertIsNone(db.session.get(Ticket, 1))
+            self.assertEqual(Comment.query.filter_by(ticket_id=1).count(), 0)
+            archived = db.session.get(ArchivedTicket, 1)
+            self.assertEqual([c.content for c in archived.comments], ["Intern"])
+            self.assertEqual(archived.creator.username, "user")
+            self.assertEqual(ArchiveCount.query.one().count, 1)
+        # Zweiter Lauf findet nichts mehr
+        self.assertEqual(self._archive()["tickets"], 0)
+
+    def test_archived_ids_not_reused(self):
+        self._archive()
+        with self.app.app_context():
+            ticket = Ticket(title="Neues Ticket", description="x", created_by_id=3)
+            db.session.add(ticket)
+            db.session.flush()
+            comment = Comment(content="Neu", ticket_id=ticket.id, user_id=3)
+            db.session.add(comment)
+            db.session.commit()
+            self.assertEqual(ticket.id, 2)
+            self.assertGreater(comment.id, db.session.get(ArchivedTicket, 1).comments[0].id)
+
+    def test_upgrade_adds_autoincrement(self):
+        with self.app.app_context():
+            db.session.remove()
+            with db.engine.begin() as conn:
+                conn.exec_driver_sql("DROP TABLE comments")
+                conn.exec_driver_sql(
+                    "CREATE TABLE comments (id INTEGER PRIMARY KEY, content TEXT NOT NULL, "
+                    "is_internal BOOLEAN, ticket_id INTEGER NOT NULL REFERENCES tickets (id), "
+                    "user_id INTEGER NOT NULL, created_at DATETIME)"
+                )
+                conn.exec_driver_sql(
+                    "INSERT INTO comments (id, content, ticket_id, user_id) VALUES (4, 'Alt', 1, 3)"
+                )
+            db.session.add(ArchivedComment(id=9, content="Archiv", ticket_id=7, user_id=3))
+            db.session.commit()
+            upgrade_schema()
+
+            comments_sql = db.session.execute(db.text(
+                "SELECT sql FROM sqlite_master WHERE name = 'comments'"
+            )).scalar()
+            self.assertIn("AUTOINCREMENT", comments_sql)
+            self.assertEqual(Comment.query.one().content, "Alt")
+            comment = Comment(content="Neu", ticket_id=1, user_id=3)
+            db.session.add(comment)
+            db.session.commit()
+            self.assertEqual(comment.id, 10)
+
+    def test_counts_unchanged(self):
+        self.login("user", "user123")
+        before = self.client.get("/api/stats/overview").get_json()
+        self._archive()
+        after = self.client.get("/api/stats/overview").get_json()
+        self.assertEqual(before, after)
+        self.assertEqual(after["by_status"]["geschlossen"], 1)
+
+    def test_saved_view_counts_follow_archive(self):
+        with self.app.app_context():
+            tech = User.query.filter_by(username="tech").first()
+            db.session.add_all([
+                SavedView(user_id=tech.id, name="Geschlossen", status="geschlossen"),
+                SavedView(user_id=tech.id, name="Suche", search="Test Ticket"),
+            ])
+            db.session.commit()
+            cache = saved_views.get_cache(self.app)
+            counts = lambda: {e.name: e.count for e in cache.entries(tech)}
+            self.assertEqual(counts(), {"Geschlossen": 1, "Suche": 1})
+        self._archive()
+        with self.app.app_context():
+            tech = User.query.filter_by(username="tech").first()
+            # Wie die Liste: ohne Suche nur aktive Tickets, mit Suche auch das Archiv
+            self.assertEqual(counts(), {"Geschlossen": 0, "Suche": 1})
+
+    def test_detail_and_search_read_through(self):
+        self._archive()
+        self.login("user", "user123")
+        resp = self.client.get("/tickets/1")
+        self.assertEqual(resp.status_code, 200)
+        self.assertIn(b"Archiviert", resp.data)
+        self.assertNotIn(b"Intern", resp.data)
+
+        self.assertIn(b"Test Ticket", self.client.get("/tickets?q=Test").data)
+        self.assertNotIn(b"Test Ticket", self.client.get("/tickets?q=Test&status=offen").data)
+        self.assertNotIn(b"Test Ticket", self.client.get("/tickets").data)
+        self.assertEqual(self.client.get("/attachments/1/log.txt").status_code, 403)
+
+        self.client.get("/logout")
+        self.login("tech", "tech123")
+        resp = self.client.get("/tickets/1")
+        self.assertIn(b"Intern", resp.data)
+        self.assertNotIn(b"Ticket bearbeiten", resp.data)
+        self.assertEqual(self.client.post("/tickets/1/update", data={"status": "offen"}).status_code, 404)
+        self.assertEqual(self.client.get("/attachments/1/log.txt").data, b"geheim")
+
+
+class TestBackup(TestBase):
+    """Tests für Online-Sicherung und Wiederherstellung."""
+
+    def setUp(self):
+        super().setUp()
+        self.backup_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.backup_dir, True)
+        with self.app.app_context():
+            self.source = backup.database_path(db.engine)
+
+    def test_backup_verify_restore(self):
+        result = backup.backup_database(self.source, self.backup_dir, pages=2, compress=True)
+        self.assertTrue(result.path.endswith(".db.gz"))
+        self.assertEqual(backup.verify_backup(result.path)["tickets"], 1)
+
+        with self.app.app_context():
+            db.session.delete(db.session.get(Ticket, 1))
+            db.session.commit()
+            backup.restore_database(result.path, self.source)
+            db.engine.dispose()
+            self.assertEqual(db.session.get(Ticket, 1).title, "Test Ticket")
+
+    def test_rotation_and_corrupt_backup(self):
+        stem = os.path.splitext(os.path.basename(self.source))[0]
+        for day in (1, 2, 3):
+            backup.backup_database(self.source, self.backup_dir, now=datetime(2024, 1, day))
+        self.assertEqual(backup.rotate(self.backup_dir, stem, keep=0), [])
+        removed = backup.rotate(self.backup_dir, stem, keep=2)
+        self.assertEqual(len(removed), 1)
+        self.assertIn("20240101", removed[0])
+        self.assertEqual(len(backup.list_backups(self.backup_dir, stem)), 2)
+
+        broken = os.path.join(self.backup_dir, f"{stem}-20240104-000000.db")
+        with open(broken, "wb") as fh:
+            fh.write(b"kein sqlite" * 100)
+        with self.assertRaises(ValueError):
+            backup.verify_backup(broken)
+
+
+class TestAsgi(TestBase):
+    """Tests für den ASGI-Betrieb mit Long-Polling."""
+
+    async def _get(self, app, path, query=b"", headers=(), disconnect_after=None):
+        messages, requested = [], []
+
+        async def receive():
+            # Nach dem Body meldet der Server nur noch das Trennen der Verbindung
+            if requested:
+                await asyncio.sleep(1000 if disconnect_after is None else disconnect_after)
+                return {"type": "http.disconnect"}
+            requested.append(True)
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        async def send(message):
+            messages.append(message)
+
+        cookie = self.client.get_cookie("session")
+        scope = {
+            "type": "http", "method": "GET", "path": path, "query_string": query,
+            "headers": [(b"cookie", f"session={cookie.value}".encode()), *headers],
+        }
+        await app(scope, receive, send)
+        if not messages:
+            return None
+        response_headers = dict(messages[0]["headers"])
+        return messages[0]["status"], response_headers, b"".join(m.get("body", b"") for m in messages[1:])
+
+    def test_overview_matches_sync(self):
+        self.login("tech", "tech123")
+        expected = self.client.get("/api/stats/overview").get_json()
+        app = asgi.AsgiApp(self.app, workers=2)
+        self.addCleanup(app.executor.shutdown)
+
+        async def scenario():
+            status, headers, body = await self._get(app, "/api/stats/overview")
+            self.assertEqual((status, json.loads(body)), (200, expected))
+            etag = headers[b"etag"]
+            status, _, _ = await self._get(app, "/api/stats/overview", b"wait=0.2",
+                                           [(b"if-none-match", etag)])
+            self.assertEqual(status, 304)
+            return etag
+
+        etag = asyncio.run(scenario())
+        self.assertEqual(
+            self.client.get("/api/stats/overview", headers={"If-None-Match": etag.decode()}).status_code,
+            304,
+        )
+
+    def test_long_poll_wakes_on_change(self):
+        self.login("tech", "tech123")
+        etag = self.client.get("/api/stats/overview").headers["ETag"]
+        app = asgi.AsgiApp(self.app, workers=2, poll_seconds=0.05)
+        self.addCleanup(app.executor.shutdown)
+
+        def create_ticket():
+            with self.app.app_context():
+                db.session.add(Ticket(title="Neu", description="x", created_by_id=3))
+                db.session.commit()
+
+        async def scenario():
+            waiter = asyncio.create_task(self._get(
+                app, "/api/stats/overview", b"wait=10", [(b"if-none-match", etag.encode())]
+            ))
+            await asyncio.sleep(0.3)
+            self.assertFalse(waiter.done())
+            await asyncio.get_running_loop().run_in_executor(None, create_ticket)
+            return await asyncio.wait_for(waiter, 5)
+
+        status, _, body = asyncio.run(scenario())
+        self.assertEqual(status, 200)
+        self.assertEqual(json.loads(body)["by_status"]["offen"], 2)
+
+    def test_long_poll_ends_on_disconnect(self):
+        self.login("tech", "tech123")
+        etag = self.client.get("/api/stats/overview").headers["ETag"]
+        app = asgi.AsgiApp(self.app, workers=2, poll_seconds=0.05)
+        self.addCleanup(app.executor.shutdown)
+
+        async def scenario():
+            started = asyncio.get_running_loop().time()
+            result = await self._get(app, "/api/stats/overview", b"wait=10",
+                                     [(b"if-none-match", etag.encode())], disconnect_after=0.2)
+            return result, asyncio.get_running_loop().time() - started
+
+        result, elapsed = asyncio.run(scenario())
+        self.assertIsNone(result)
+        self.assertLess(elapsed, 5)
+        self.assertEqual(app._waiters, 0)
+
+    def test_repeated_cookie_headers(self):
+        environ = asgi._environ({
+            "type": "http", "method": "GET", "path": "/",
+            "headers": [(b"cookie", b"a=1"), (b"cookie", b"b=2"), (b"accept", b"text/html"),
+                        (b"accept", b"application/json")],
+        }, BytesIO(), 0)
+        self.assertEqual(environ["HTTP_COOKIE"], "a=1; b=2")
+        self.assertEqual(environ["HTTP_ACCEPT"], "text/html,application/json")
+
+    def test_request_body_spooled_and_limited(self):
+        self.login("tech", "tech123")
+        self.app.config["MAX_CONTENT_LENGTH"] = 200
+        app = asgi.AsgiApp(self.app, workers=2)
+        self.addCleanup(app.executor.shutdown)
+        cookie = self.client.get_cookie("session")
+
+        async def post(chunks, headers=()):
+            messages, pending = [], list(chunks)
+
+            async def receive():
+                self.assertTrue(pending, "Body wurde nach dem Limit weitergelesen")
+                chunk = pending.pop(0)
+                return {"type": "http.request", "body": chunk, "more_body": bool(pending)}
+
+            async def send(message):
+                messages.append(message)
+
+            await app({
+                "type": "http", "method": "POST", "path": "/api/v1/tickets", "query_string": b"",
+                "headers": [(b"cookie", f"session={cookie.value}".encode()),
+                            (b"content-type", b"application/json"), *headers],
+            }, receive, send)
+            return messages[0]["status"], b"".join(m.get("body", b"") for m in messages[1:]), pending
+
+        # Ohne Content-Length (chunked): Body wird vollständig übergeben
+        status, body, _ = asyncio.run(post([b'{"title": "ASGI", ', b'"description": "x"}']))
+        self.assertEqual(status, 201, body)
+        self.assertEqual(json.loads(body)["title"], "ASGI")
+        # Zu groß: abgewiesen, ohne den Rest zu lesen
+        status, _, pending = asyncio.run(post([b"x" * 150, b"x" * 150, b"nie gelesen"]))
+        self.assertEqual((status, pending), (413, [b"nie gelesen"]))
+        status, _, _ = asyncio.run(post([], [(b"content-length", b"1000")]))
+        self.assertEqual(status, 413)
+
 
 if __name__ == "__main__":
     unittest.main(verbosity=2)